@@ -0,0 +1,99 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+import logging
+from time import time
+
+from django.conf import settings
+
+from metax_api.services.redis_cache_service import RedisClient
+
+_logger = logging.getLogger(__name__)
+
+
+class OAIMetadataCache:
+
+    """
+    Stores rendered OAI-PMH metadata of catalog records in redis, so that harvests do not
+    have to convert every dataset to oai_dc or datacite xml on every request.
+
+    An entry is valid only as long as the date_modified (or date_created) of the record
+    matches the stamp stored in the entry, so stale entries are never served even if an
+    update of the cache was missed. The number of entries is bounded by evicting the oldest
+    entries, tracked in a sorted set. Redis errors are logged and otherwise ignored: the
+    metadata is then rendered as if the cache did not exist.
+    """
+
+    KEY_PREFIX = "oai_metadata"
+    INDEX_KEY = "oai_metadata_index"
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @staticmethod
+    def enabled():
+        return settings.OAI.get("METADATA_CACHE", {}).get("ENABLED", False)
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = RedisClient()
+        return self._client
+
+    @classmethod
+    def get_key(cls, record_id, metadata_prefix):
+        return "%s:%s:%d" % (cls.KEY_PREFIX, metadata_prefix, record_id)
+
+    @staticmethod
+    def get_stamp(record):
+        timestamp = record.date_modified or record.date_created
+        return timestamp.timestamp()
+
+    def get(self, record, metadata_prefix):
+        """
+        Return the cached entry of record as dict {"metadata": ..., "error": ...}, or None if
+        the record has no valid entry.
+        """
+        try:
+            entry = self.client.get(self.get_key(record.id, metadata_prefix))
+        except Exception as e:
+            _logger.warning("event='oai_metadata_cache_get_failed',error=%s" % e)
+            return None
+        if entry is None or entry.get("stamp") != self.get_stamp(record):
+            return None
+        return entry
+
+    def set(self, record, metadata_prefix, metadata=None, error=None):
+        """
+        Store rendered metadata of record. error is the message of a CannotDisseminateFormatError,
+        so that records which can not be converted to the format are not retried on every harvest.
+        """
+        cache_settings = settings.OAI["METADATA_CACHE"]
+        key = self.get_key(record.id, metadata_prefix)
+        entry = {"stamp": self.get_stamp(record), "metadata": metadata, "error": error}
+        try:
+            self.client.set(key, entry, ex=cache_settings["TTL"])
+            self._evict_oldest(key, cache_settings["MAX_ENTRIES"])
+        except Exception as e:
+            _logger.warning("event='oai_metadata_cache_set_failed',key=%s,error=%s" % (key, e))
+
+    def delete(self, record_id, metadata_prefixes):
+        keys = [self.get_key(record_id, prefix) for prefix in metadata_prefixes]
+        try:
+            self.client.delete(*keys)
+            self.client.get_master().zrem(self.INDEX_KEY, *keys)
+        except Exception as e:
+            _logger.warning("event='oai_metadata_cache_delete_failed',error=%s" % e)
+
+    def _evict_oldest(self, key, max_entries):
+        master = self.client.get_master()
+        master.zadd(self.INDEX_KEY, {key: time()})
+        excess = master.zcard(self.INDEX_KEY) - max_entries
+        if excess > 0:
+            evicted = [evicted_key for evicted_key, _ in master.zpopmin(self.INDEX_KEY, excess)]
+            self.client.delete(*evicted)
+            _logger.debug("event='oai_metadata_cache_evicted',count=%d" % len(evicted))
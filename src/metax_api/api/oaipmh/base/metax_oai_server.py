@@ -15,11 +15,14 @@ from oaipmh import common
 from oaipmh.common import ResumptionOAIPMH
 from oaipmh.error import (
     BadArgumentError,
+    BadResumptionTokenError,
     CannotDisseminateFormatError,
     IdDoesNotExistError,
     NoRecordsMatchError,
 )
+from oaipmh.server import BatchingResumption, decodeResumptionToken, encodeResumptionToken
 
+from metax_api.api.oaipmh.base.metadata_cache import OAIMetadataCache
 from metax_api.models.catalog_record import CatalogRecord, DataCatalog
 from metax_api.services import CatalogRecordService as CRS
 from metax_api.services.datacite_service import DataciteException, convert_cr_to_datacite_cr_json
@@ -32,6 +35,8 @@ OAI_DC_MDPREFIX = "oai_dc"
 OAI_DATACITE_MDPREFIX = "oai_datacite"
 OAI_FAIRDATA_DATACITE_MDPREFIX = "oai_fairdata_datacite"
 OAI_DC_URNRESOLVER_MDPREFIX = "oai_dc_urnresolver"
+# metadata formats of datasets which are stored in OAIMetadataCache once rendered
+CACHED_MDPREFIXES = (OAI_DC_MDPREFIX, OAI_DATACITE_MDPREFIX, OAI_FAIRDATA_DATACITE_MDPREFIX)
 
 
 class MetaxOAIServer(ResumptionOAIPMH):
@@ -63,7 +68,9 @@ class MetaxOAIServer(ResumptionOAIPMH):
             catalog_urns.extend(v)
         return catalog_urns
 
-    def _get_urnresolver_record_data(self, set, cursor, batch_size, from_=None, until=None):
+    def _get_urnresolver_record_data(
+        self, set, cursor, batch_size, from_=None, until=None, offset=0
+    ):
         # Use unfiltered objects for fetching catalog records for urn resolver, since otherwise deleted objects
         # won't appear in the result. Get only active objects.
         records = CatalogRecord.objects_unfiltered.filter(active=True, state="published")
@@ -77,6 +84,7 @@ class MetaxOAIServer(ResumptionOAIPMH):
 
         # Fetch only needed values as dict to increase performance.
         records = records.values(
+            "id",
             "identifier",
             "date_created",
             "date_modified",
@@ -84,11 +92,9 @@ class MetaxOAIServer(ResumptionOAIPMH):
             "research_dataset",
         )
 
-        data = []
-        for record in records:
-            metadatas = self._get_oai_dc_urnresolver_metadatas_for_record(record)
-            for md in metadatas:
-                item = (
+        def get_items(record):
+            return [
+                (
                     common.Header(
                         "",
                         self._get_record_identifier(record, set),
@@ -99,13 +105,13 @@ class MetaxOAIServer(ResumptionOAIPMH):
                     common.Metadata("", md),
                     None,
                 )
-                data.append(item)
+                for md in self._get_oai_dc_urnresolver_metadatas_for_record(record)
+            ]
 
-        cursor_end = cursor + batch_size if cursor + batch_size < len(data) else len(data)
-        return data[cursor:cursor_end]
+        return self._get_page(records, get_items, cursor, offset, batch_size)
 
     def _get_filtered_records_data(
-        self, verb, metadata_prefix, set, cursor, batch_size, from_=None, until=None
+        self, verb, metadata_prefix, set, cursor, batch_size, from_=None, until=None, offset=0
     ):
         query_set: QuerySet
         if set == DATACATALOGS_SET:
@@ -133,8 +139,7 @@ class MetaxOAIServer(ResumptionOAIPMH):
                 data_catalog__catalog_json__identifier__in=self._get_default_set_filter()
             )
 
-        data = []
-        for record in query_set:
+        def get_items(record):
             if verb == "ListRecords":
                 try:
                     oai_item = self._get_oai_item(
@@ -142,18 +147,18 @@ class MetaxOAIServer(ResumptionOAIPMH):
                         record,
                         metadata_prefix,
                     )
-                    data.append(oai_item)
+                    return [oai_item]
                 except CannotDisseminateFormatError as e:
                     if (
                         metadata_prefix == OAI_FAIRDATA_DATACITE_MDPREFIX
                         or metadata_prefix == OAI_DATACITE_MDPREFIX
                     ):
-                        pass
+                        return []
                     else:
                         raise e
             elif verb == "ListIdentifiers":
                 identifier = self._get_record_identifier(record, set)
-                data.append(
+                return [
                     common.Header(
                         "",
                         identifier,
@@ -161,12 +166,52 @@ class MetaxOAIServer(ResumptionOAIPMH):
                         ["metax"],
                         False,
                     )
-                )
+                ]
             else:
                 raise Exception("OAI-PMH bad code error")
 
-        cursor_end = cursor + batch_size if cursor + batch_size < len(data) else len(data)
-        return data[cursor:cursor_end]
+        return self._get_page(query_set, get_items, cursor, offset, batch_size)
+
+    @staticmethod
+    def _get_page(query_set, get_items, cursor, offset, batch_size):
+        """
+        Return the OAI items of one page of a harvest, and the position where the next page starts.
+
+        Records are read in the order of their ids, batch_size + 1 records at a time, so that only
+        the records of the requested page are read from the database and converted to OAI items,
+        regardless of how far along the harvest is.
+
+        cursor: id of the first record of the page
+        offset: number of items of the first record already returned on the previous page. A record
+                may produce several items (urn resolver), or none at all (datacite conversion failed)
+        get_items: function returning a list of OAI items for a record
+
+        Returns a tuple (items, position), where position is a (cursor, offset) tuple pointing to
+        the start of the next page, or None when there are no more items.
+        """
+        cursor = cursor or 0
+        offset = offset or 0
+        query_set = query_set.order_by("id")
+        items = []
+        chunk_filter = {"id__gte": cursor}
+
+        while True:
+            records = list(query_set.filter(**chunk_filter)[: batch_size + 1])
+
+            for record in records:
+                record_id = record["id"] if isinstance(record, dict) else record.id
+                skip = offset if record_id == cursor else 0
+                record_items = get_items(record)[skip:]
+                room = batch_size - len(items)
+                if len(record_items) > room:
+                    items.extend(record_items[:room])
+                    return items, (record_id, skip + room)
+                items.extend(record_items)
+
+            if len(records) <= batch_size:
+                return items, None
+
+            chunk_filter = {"id__gt": record_id}
 
     def _get_syke_urnresolver_metadata_for_record(self, record):
         metadatas = []
@@ -345,6 +390,46 @@ class MetaxOAIServer(ResumptionOAIPMH):
         return meta
 
     def _get_metadata_for_record(self, record, metadataPrefix):
+        if not (
+            isinstance(record, CatalogRecord)
+            and metadataPrefix in CACHED_MDPREFIXES
+            and OAIMetadataCache.enabled()
+        ):
+            return self._render_metadata_for_record(record, metadataPrefix)
+
+        cache = self._get_metadata_cache()
+        entry = cache.get(record, metadataPrefix)
+        if entry is None:
+            entry = self._cache_metadata_for_record(cache, record, metadataPrefix)
+        if entry["error"] is not None:
+            raise CannotDisseminateFormatError(entry["error"])
+        return entry["metadata"]
+
+    def _get_metadata_cache(self):
+        if not hasattr(self, "_metadata_cache"):
+            self._metadata_cache = OAIMetadataCache()
+        return self._metadata_cache
+
+    def _cache_metadata_for_record(self, cache, record, metadataPrefix):
+        entry = {"metadata": None, "error": None}
+        try:
+            entry["metadata"] = self._render_metadata_for_record(record, metadataPrefix)
+        except CannotDisseminateFormatError as e:
+            entry["error"] = str(e)
+        cache.set(record, metadataPrefix, **entry)
+        return entry
+
+    def update_metadata_cache(self, record, refresh=False):
+        """
+        Render and cache metadata of a catalog record in all cached formats. Unless refresh is
+        True, formats which already have a valid entry are skipped.
+        """
+        cache = self._get_metadata_cache()
+        for metadata_prefix in CACHED_MDPREFIXES:
+            if refresh or cache.get(record, metadata_prefix) is None:
+                self._cache_metadata_for_record(cache, record, metadata_prefix)
+
+    def _render_metadata_for_record(self, record, metadataPrefix):
         meta = {}
         if isinstance(record, CatalogRecord):
             json = record.research_dataset
@@ -471,6 +556,7 @@ class MetaxOAIServer(ResumptionOAIPMH):
         from_=None,
         until=None,
         batch_size=None,
+        offset=0,
     ):
         """Implement OAI-PMH verb listIdentifiers."""
         if metadataPrefix == OAI_DC_URNRESOLVER_MDPREFIX:
@@ -480,7 +566,7 @@ class MetaxOAIServer(ResumptionOAIPMH):
 
         self._validate_mdprefix_and_set(metadataPrefix, set)
         return self._get_filtered_records_data(
-            "ListIdentifiers", metadataPrefix, set, cursor, batch_size, from_, until
+            "ListIdentifiers", metadataPrefix, set, cursor, batch_size, from_, until, offset
         )
 
     def listRecords(
@@ -491,17 +577,15 @@ class MetaxOAIServer(ResumptionOAIPMH):
         from_=None,
         until=None,
         batch_size=None,
+        offset=0,
     ):
         """Implement OAI-PMH verb ListRecords."""
         self._validate_mdprefix_and_set(metadataPrefix, set)
-        data = []
         if metadataPrefix == OAI_DC_URNRESOLVER_MDPREFIX:
-            data = self._get_urnresolver_record_data(set, cursor, batch_size, from_, until)
-        else:
-            data = self._get_filtered_records_data(
-                "ListRecords", metadataPrefix, set, cursor, batch_size, from_, until
-            )
-        return data
+            return self._get_urnresolver_record_data(set, cursor, batch_size, from_, until, offset)
+        return self._get_filtered_records_data(
+            "ListRecords", metadataPrefix, set, cursor, batch_size, from_, until, offset
+        )
 
     def getRecord(self, metadataPrefix, identifier):
         """Implement OAI-PMH verb GetRecord."""
@@ -534,3 +618,44 @@ class MetaxOAIServer(ResumptionOAIPMH):
             common.Metadata("", metadata),
             None,
         )
+
+
+class MetaxBatchingResumption(BatchingResumption):
+    """
+    Resumption tokens for ListIdentifiers and ListRecords point to a position in the harvested
+    records instead of an offset into the results: the cursor of the token is the id of the first
+    record of the next page, and offset (when present) the number of that record's items already
+    returned. Each page is then fetched from the database with a range query of the page's
+    size, instead of building the whole result set and slicing it on every request.
+
+    Tokens handed out by the earlier offset-based implementation stay usable: their cursor is
+    interpreted as a record id, which never skips records, since ids start from 1 and the record
+    at offset N always has an id greater than N.
+    """
+
+    def handleVerb(self, verb, kw):
+        if verb not in ["ListIdentifiers", "ListRecords"]:
+            return super().handleVerb(verb, kw)
+
+        cursor = 0
+        if "resumptionToken" in kw:
+            kw, cursor = decodeResumptionToken(kw["resumptionToken"])
+
+        kw = kw.copy()
+        # present in tokens of the earlier implementation
+        kw.pop("batch_size", None)
+        try:
+            offset = int(kw.pop("offset", 0))
+        except ValueError:
+            raise BadResumptionTokenError("Unable to decode resumption token (bad offset)")
+
+        method = common.getMethodForVerb(self._server, verb)
+        result, position = method(cursor=cursor, offset=offset, batch_size=self._batch_size, **kw)
+
+        if position is None:
+            return result, None
+
+        next_cursor, next_offset = position
+        if next_offset:
+            kw["offset"] = next_offset
+        return result, encodeResumptionToken(kw, next_cursor)
@@ -17,6 +17,7 @@ from .metax_oai_server import (
     OAI_DC_MDPREFIX,
     OAI_DC_URNRESOLVER_MDPREFIX,
     OAI_FAIRDATA_DATACITE_MDPREFIX,
+    MetaxBatchingResumption,
     MetaxOAIServer,
 )
 
@@ -117,10 +118,9 @@ def oaipmh_view(request):
     metadata_registry.registerWriter(OAI_FAIRDATA_DATACITE_MDPREFIX, oai_fairdata_datacite_writer)
     metadata_registry.registerWriter(OAI_DATACITE_MDPREFIX, oai_datacite_writer)
 
-    server = oaiserver.BatchingServer(
-        metax_server,
+    server = oaiserver.ServerBase(
+        MetaxBatchingResumption(metax_server, settings.OAI["BATCH_SIZE"]),
         metadata_registry=metadata_registry,
-        resumption_batch_size=settings.OAI["BATCH_SIZE"],
     )
     xml = server.handleRequest(request.GET.dict())
 
@@ -5,7 +5,6 @@
 # :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
 # :license: MIT
 
-import copy
 import logging
 from os import path
 
@@ -659,18 +658,24 @@ class CatalogRecordSerializer(CommonSerializer):
 
         if self._migration_override_requested():
             # Don't require source_organization when ?migration_override is set
-            schema = copy.deepcopy(schema)
-            if project_def := schema["definitions"].get("Project"):
-                project_def["required"] = [
-                    p for p in project_def["required"] if p != "source_organization"
-                ]
-                project_def["properties"]["source_organization"]["minItems"] = 0
+            schema = CommonService.get_derived_json_schema(
+                schema, "migration_override", self._get_migration_override_schema
+            )
 
         validate_json(value, schema)
 
         if self._operation_is_create and value["preferred_identifier"] == "temp":
             value.pop("preferred_identifier")
 
+    @staticmethod
+    def _get_migration_override_schema(schema):
+        if project_def := schema["definitions"].get("Project"):
+            project_def["required"] = [
+                p for p in project_def["required"] if p != "source_organization"
+            ]
+            project_def["properties"]["source_organization"]["minItems"] = 0
+        return schema
+
     def _validate_org_name_is_set(self, obj):
         """
         Organization 'name' field is not madatory in the schema, but that is only because it does
@@ -786,7 +791,7 @@ class CatalogRecordSerializer(CommonSerializer):
         - takes into account data_catalog when searching by preferred_identifier
         - does not use select_related() to also fetch relations, since they are not needed.
         """
-        params = {"research_dataset__contains": {field_name: identifier}}
+        params = {"rd_%s" % field_name: identifier}
 
         if field_name == "preferred_identifier" and not self._data_catalog_supports_versioning():
 
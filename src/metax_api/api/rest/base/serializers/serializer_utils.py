@@ -7,11 +7,13 @@
 
 import re
 
-from jsonschema import FormatChecker, validate as json_validate
+from jsonschema import FormatChecker
 from jsonschema.compat import str_types
 from jsonschema.exceptions import ValidationError as JsonValidationError
 from rest_framework.serializers import ValidationError
 
+from metax_api.services import CommonService as CS
+
 date_re = re.compile(r"^\d{4}-\d{2}-\d{2}$")
 
 datetime_re = re.compile(
@@ -23,9 +25,11 @@ def validate_json(value, schema):
     """
     Since RFC3339 dependency was removed, date and datetime formats have to be validated
     by hand. Helper methods below does the trick.
+
+    Schemas loaded with CommonService.get_json_schema() are validated with a cached validator.
     """
     try:
-        json_validate(value, schema, format_checker=FormatChecker())
+        CS.get_json_schema_validator(schema).validate(value)
     except JsonValidationError as e:
         # use parent class for output messages if possible, because jsonschema 3.2.0 introduced errors in more depth
         # which caused the error messages to be too spesific
@@ -6,10 +6,13 @@
 # :license: MIT
 
 import logging
+from itertools import islice
+from json import dumps as json_dumps
 from os import path
 
 from django.conf import settings
-from django.http import Http404, HttpResponse
+from django.db.models import prefetch_related_objects
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from rest_framework import status
 from rest_framework.exceptions import APIException, MethodNotAllowed, PermissionDenied
 from rest_framework.generics import get_object_or_404
@@ -26,12 +29,16 @@ from metax_api.services import (
     RabbitMQService as rabbitmq,
     RedisCacheService,
 )
+from metax_api.services.pagination import KeysetPagination
 
 _logger = logging.getLogger(__name__)
 
 RESPONSE_SUCCESS_CODES = (200, 201, 204)
 WRITE_OPERATIONS = ("PUT", "PATCH", "POST")
 
+# number of objects fetched from the db and serialized at a time when streaming a list response
+STREAM_CHUNK_SIZE = 1000
+
 
 class CommonViewSet(ModelViewSet):
 
@@ -85,7 +92,9 @@ class CommonViewSet(ModelViewSet):
                 set_rollback()
             else:
                 try:
-                    CallableService.run_post_request_callables()
+                    # messages published by the callables are sent together once all succeeded
+                    with rabbitmq.batch():
+                        CallableService.run_post_request_callables()
                 except Exception as e:
                     res = self.handle_exception(e)
                     # normally .dispatch() does this. sets response.accepted_renderer among other things
@@ -152,19 +161,61 @@ class CommonViewSet(ModelViewSet):
 
         return response
 
+    @property
+    def paginator(self):
+        if not hasattr(self, "_paginator") and "cursor" in self.request.query_params:
+            self._paginator = KeysetPagination()
+        return super(CommonViewSet, self).paginator
+
     # TODO: supporting both parameters over a transition period and eventually will get rid of no_pagination.
-    def paginate_queryset(self, queryset):
+    def _pagination_enabled(self):
         keys = self.request.query_params.keys()
         if "pagination" in keys:
-            if not CS.get_boolean_query_param(self.request, "pagination"):
-                return None
-            return super(CommonViewSet, self).paginate_queryset(queryset)
+            return CS.get_boolean_query_param(self.request, "pagination")
         elif "no_pagination" in keys:
-            if CS.get_boolean_query_param(self.request, "no_pagination"):
-                return None
-            return super(CommonViewSet, self).paginate_queryset(queryset)
-        else:
-            return super(CommonViewSet, self).paginate_queryset(queryset)
+            return not CS.get_boolean_query_param(self.request, "no_pagination")
+        return True
+
+    def paginate_queryset(self, queryset):
+        if not self._pagination_enabled():
+            return None
+        return super(CommonViewSet, self).paginate_queryset(queryset)
+
+    def list(self, request, *args, **kwargs):
+        if not self._pagination_enabled() and CS.get_boolean_query_param(request, "stream"):
+            return self._stream_list(self.filter_queryset(self.get_queryset()))
+        return super(CommonViewSet, self).list(request, *args, **kwargs)
+
+    def _stream_list(self, queryset):
+        """
+        Stream the unpaginated list of objects as a json array, without first loading the
+        entire list into memory. The objects are read from the db using a server-side cursor,
+        and serialized STREAM_CHUNK_SIZE objects at a time.
+        """
+        count = queryset.count()
+        response = StreamingHttpResponse(
+            self._stream_list_content(queryset), content_type="application/json"
+        )
+        response["X-Count"] = str(count)
+        return response
+
+    def _stream_list_content(self, queryset):
+        # prefetch_related() is ignored by iterator(), so prefetches are done separately per chunk
+        prefetch_lookups = queryset._prefetch_related_lookups
+        objects = queryset.iterator(chunk_size=STREAM_CHUNK_SIZE)
+
+        yield "["
+        first = True
+        while True:
+            chunk = list(islice(objects, STREAM_CHUNK_SIZE))
+            if not chunk:
+                break
+            if prefetch_lookups:
+                prefetch_related_objects(chunk, *prefetch_lookups)
+            for item in self.get_serializer(chunk, many=True).data:
+                yield ("%s" if first else ",%s") % json_dumps(item)
+                first = False
+        yield "]"
 
     def get_queryset(self):
         """
@@ -232,25 +232,22 @@ class DatasetViewSet(CommonViewSet):
     def get_all_metadata_version_identifiers(self, request):
         # todo probably remove at some point
         self.queryset_search_params = self.service_class.get_queryset_search_params(request)
-        q = self.get_queryset().values("research_dataset")
-        identifiers = [item["research_dataset"]["metadata_version_identifier"] for item in q]
-        return Response(identifiers)
+        identifiers = self.get_queryset().values_list("rd_metadata_version_identifier", flat=True)
+        return Response(list(identifiers))
 
     @action(detail=False, methods=["get"], url_path="unique_preferred_identifiers")
     def get_all_unique_preferred_identifiers(self, request):
         self.queryset_search_params = self.service_class.get_queryset_search_params(request)
 
+        queryset = self.get_queryset()
+
         if CS.get_boolean_query_param(request, "latest"):
-            queryset = (
-                self.get_queryset().filter(next_dataset_version_id=None).values("research_dataset")
-            )
-        else:
-            queryset = self.get_queryset().values("research_dataset")
+            queryset = queryset.filter(next_dataset_version_id=None)
 
-        unique_pref_ids = list(
-            set(item["research_dataset"]["preferred_identifier"] for item in queryset)
+        unique_pref_ids = (
+            queryset.order_by().values_list("rd_preferred_identifier", flat=True).distinct()
         )
-        return Response(unique_pref_ids)
+        return Response(list(unique_pref_ids))
 
     def _search_using_dataset_identifiers(self):
         """
@@ -267,7 +264,7 @@ class DatasetViewSet(CommonViewSet):
             # note: cant use get_object(), because get_object() will throw an error if there are multiple results
             obj = (
                 self.get_queryset()
-                .filter(research_dataset__contains={"preferred_identifier": lookup_value})
+                .filter(rd_preferred_identifier=lookup_value)
                 .order_by("data_catalog_id", "date_created")
                 .first()
             )
@@ -280,9 +277,7 @@ class DatasetViewSet(CommonViewSet):
             # todo probably remove this at some point. for now, doesnt do harm and does not instantly break
             # services using this...
             return super(DatasetViewSet, self).get_object(
-                search_params={
-                    "research_dataset__contains": {"metadata_version_identifier": lookup_value}
-                }
+                search_params={"rd_metadata_version_identifier": lookup_value}
             )
         except Http404:
             pass
@@ -9,7 +9,6 @@ import logging
 from copy import deepcopy
 from os import path
 
-from jsonschema import Draft4Validator, RefResolver
 from jsonschema.exceptions import ValidationError as JsonValidationError
 from rest_framework.serializers import ValidationError
 
@@ -96,30 +95,15 @@ class CatalogRecordSerializerV2(CatalogRecordSerializer):
         - validate and populate ref data
         - validate received file and dir entries against schema
             - there is a special schema file dataset_files_schema.json, which uses
-              objects defined in ida dataset schema. the RefResolver object is necessary
-              to make the json schema external file links work.
+              objects defined in ida dataset schema. the validator resolves the json schema
+              external file links relative to the schema file.
         """
         self._populate_file_and_dir_titles(value)
 
         CRS.validate_reference_data(value, cache, request=self.context.get("request"))
 
         rd_files_schema = CS.get_json_schema(self._schemas_directory_path, "dataset_files")
-
-        resolver = RefResolver(
-            # at some point when jsonschema package is updated, probably need to switch to
-            # using the below commented out parameter names instead
-            # schema_path='file:{}'.format(path.dirname(path.dirname(__file__)) + '/schemas/dataset_files_schema.json'),
-            # schema=rd_files_schema
-            base_uri="file:{}".format(
-                path.join(self._schemas_directory_path, "dataset_files_schema.json")
-            ),
-            referrer=rd_files_schema,
-        )
-
-        # for debugging, below may be useful
-        # Draft4Validator.check_schema(rd_files_schema)
-
-        validator = Draft4Validator(rd_files_schema, resolver=resolver, format_checker=None)
+        validator = CS.get_json_schema_validator(rd_files_schema, format_checker=False)
 
         if not value:
             _logger.info(
@@ -40,7 +40,18 @@ def redis_check():
         redis = RedisClient()
         refdata = redis.get("reference_data")
         if len(refdata) > 0:
-            return {"redis": [{"key: reference_data": {"ok": True}}]}
+            from metax_api.services.reference_data_mixin import ReferenceDataMixin
+
+            return {
+                "redis": [
+                    {
+                        "key: reference_data": {
+                            "ok": True,
+                            "process_cache": ReferenceDataMixin.get_reference_data_cache_stats(),
+                        }
+                    }
+                ]
+            }
     except Exception as e:
         logger.error(f"error in redis_check: {e}")
         return {"redis": {"ok": False, "error": str(e), "traceback": str(e.__traceback__)}}
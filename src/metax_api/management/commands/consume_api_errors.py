@@ -0,0 +1,55 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+import logging
+from time import sleep
+
+from django.core.management.base import BaseCommand
+
+from metax_api.services import RabbitMQService
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+
+    help = """Consume ApiErrors from RabbitMQ queue metax-apierrors and write them into files in
+    ERROR_FILES_PATH. With --loop, keeps draining the queue until stopped."""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep consuming, waiting --interval seconds whenever the queue is empty",
+        )
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=10,
+            help="Seconds to wait between draining the queue when using --loop",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Max number of ApiErrors written into one file",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                # consumes until the queue is empty
+                RabbitMQService.consume_api_errors(batch_size=options["batch_size"])
+            except Exception:
+                if not options["loop"]:
+                    raise
+                logger.exception("Consuming ApiErrors failed")
+
+            if not options["loop"]:
+                break
+
+            sleep(options["interval"])
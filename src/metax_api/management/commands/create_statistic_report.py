@@ -1,19 +1,17 @@
 import logging
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.db.models import Sum
-from django.db.models.expressions import RawSQL
+from django.db import transaction
 
 from metax_api.models import (
     CatalogRecordV2,
-    DataCatalog,
     File,
     FileStorage,
     OrganizationStatistics,
     ProjectStatistics,
 )
-from metax_api.api.rest.base.views import FileViewSet
-from metax_api.services import FileService, StatisticService
+from metax_api.services import StatisticService
 
 logger = logging.getLogger(__name__)
 
@@ -23,9 +21,22 @@ class Command(BaseCommand):
 
         logger.info("Creating statistic summary")
 
-        OrganizationStatistics.objects.all().delete()
-        ProjectStatistics.objects.all().delete()
+        project_stats = self.get_project_statistics()
+        organization_stats = self.get_organization_statistics()
 
+        # readers see the previous snapshot until the new one is committed
+        with transaction.atomic():
+            OrganizationStatistics.objects.all().delete()
+            ProjectStatistics.objects.all().delete()
+            ProjectStatistics.objects.bulk_create(project_stats)
+            OrganizationStatistics.objects.bulk_create(organization_stats)
+
+        logger.info(
+            f"Statistic summary created for {len(project_stats)} projects "
+            f"and {len(organization_stats)} organizations"
+        )
+
+    def get_project_statistics(self):
         ida_file_storage = FileStorage.objects.get(
             file_storage_json__icontains="urn:nbn:fi:att:file-storage-ida"
         )
@@ -33,45 +44,38 @@ class Command(BaseCommand):
             file_storage_json__icontains="urn:nbn:fi:att:file-storage-pas"
         )
 
-        all_projects = File.objects.all().values("project_identifier").distinct()
+        file_stats = {
+            (row["project_identifier"], row["file_storage_id"]): row
+            for row in StatisticService.count_files_by_project_and_storage(
+                [ida_file_storage, pas_file_storage]
+            )
+        }
 
-        for project in all_projects:
-            logger.info(f"all_project: {project}")
-            project_id = project["project_identifier"]
+        all_projects = (
+            File.objects.all().order_by().values_list("project_identifier", flat=True).distinct()
+        )
 
-            ida_files_stats = StatisticService.count_files(
-                [project_id], removed="false", include_pids=True, file_storage=ida_file_storage, ignore_removed_crs=True
-            )
-            ida_count = ida_files_stats[0]["count"]
-            ida_size = ida_files_stats[0]["byte_size"]
-            ida_file_pids = ida_files_stats[1]
-            ida_published_catalog_record_pids = self.get_published_cr_pids(ida_file_pids)
+        project_stats = []
+        for project_id in all_projects:
+            stats = {}
+            for prefix, file_storage in (("ida", ida_file_storage), ("pas", pas_file_storage)):
+                row = file_stats.get((project_id, file_storage.id))
+                stats[f"{prefix}_count"] = row["count"] if row else 0
+                stats[f"{prefix}_byte_size"] = row["byte_size"] if row else 0
+                stats[f"{prefix}_published_datasets"] = (
+                    str(row["published_datasets"]) if row else ""
+                )
 
-            pas_files_stats = StatisticService.count_files(
-                [project_id], removed="false", include_pids=True, file_storage=pas_file_storage, ignore_removed_crs=True
-            )
-            pas_count = pas_files_stats[0]["count"]
-            pas_size = pas_files_stats[0]["byte_size"]
-            pas_file_pids = pas_files_stats[1]
-            pas_published_catalog_record_pids = self.get_published_cr_pids(pas_file_pids)
-
-            stat = ProjectStatistics(
-                project_id,
-                ida_count,
-                ida_size,
-                ida_published_catalog_record_pids,
-                pas_count,
-                pas_size,
-                pas_published_catalog_record_pids,
-            )
-            stat.save()
+            project_stats.append(ProjectStatistics(project_identifier=project_id, **stats))
+
+        return project_stats
 
+    def get_organization_statistics(self):
         organizations = (
             CatalogRecordV2.objects.all().order_by().values("metadata_provider_org").distinct()
         )
         organizations_list = [d["metadata_provider_org"] for d in list(organizations)]
 
-
         harvested_organizations = {
             "syke.fi": "urn:nbn:fi:att:data-catalog-harvest-syke",
             "fsd.tuni.fi": "urn:nbn:fi:att:data-catalog-harvest-fsd",
@@ -86,29 +90,41 @@ class Command(BaseCommand):
         if "fairdata.fi" in organizations_list:
             organizations_list.remove("fairdata.fi")
 
+        # {org_id: {data_catalog: (count, byte_size)}}
+        dataset_stats = {}
+        for row in StatisticService.count_datasets_by_organization_and_catalog(
+            removed=False, legacy=False
+        ):
+            dataset_stats.setdefault(row["metadata_provider_org"], {})[row["data_catalog"]] = (
+                row["count"],
+                row["ida_byte_size"],
+            )
 
+        organization_stats = []
         for org_id in organizations_list:
-            ida_ret = StatisticService.count_datasets(metadata_provider_org=org_id, data_catalog="urn:nbn:fi:att:data-catalog-ida", removed=False, legacy=False)
-            pas_ret = StatisticService.count_datasets(metadata_provider_org=org_id, data_catalog="urn:nbn:fi:att:data-catalog-pas", removed=False, legacy=False)
-            att_ret = StatisticService.count_datasets(metadata_provider_org=org_id, data_catalog="urn:nbn:fi:att:data-catalog-att", removed=False, legacy=False)
-            total_ret = StatisticService.count_datasets(metadata_provider_org=org_id, removed=False, legacy=False)
+            org_dataset_stats = dataset_stats.get(org_id, {})
 
-            total_count = total_ret["count"]
-            ida_count = ida_ret["count"]
-            pas_count = pas_ret["count"]
-            att_count = att_ret["count"]
+            total_count = sum(count for count, byte_size in org_dataset_stats.values())
+            ida_count, ida_byte_size = org_dataset_stats.get(
+                settings.IDA_DATA_CATALOG_IDENTIFIER, (0, 0)
+            )
+            pas_count, pas_byte_size = org_dataset_stats.get(
+                settings.PAS_DATA_CATALOG_IDENTIFIER, (0, 0)
+            )
+            att_count, att_byte_size = org_dataset_stats.get(
+                settings.ATT_DATA_CATALOG_IDENTIFIER, (0, 0)
+            )
 
             # If organization is harvested, check the stats from corresponding catalog, and add them to the total_count
             if org_id in harvested_organizations.keys():
-                if DataCatalog.objects.filter(catalog_json__identifier=harvested_organizations[org_id]).exists():
-                    harvested_ret = StatisticService.count_datasets(data_catalog=harvested_organizations[org_id], removed=False, legacy=False)
-                    total_count += harvested_ret["count"]
+                total_count += sum(
+                    stats.get(harvested_organizations[org_id], (0, 0))[0]
+                    for stats in dataset_stats.values()
+                )
 
             other_count = total_count - ida_count - pas_count - att_count
 
-            total_byte_size = total_ret["ida_byte_size"]
-            ida_byte_size = ida_ret["ida_byte_size"]
-            pas_byte_size = pas_ret["ida_byte_size"]
+            total_byte_size = sum(byte_size for count, byte_size in org_dataset_stats.values())
 
             if total_count > 0:
 
@@ -121,23 +137,8 @@ class Command(BaseCommand):
                     other_count,
                     total_byte_size,
                     ida_byte_size,
-                    pas_byte_size
+                    pas_byte_size,
                 )
-                stat.save()
-
-        logger.info("Statistic summary created")
-
-    def get_published_cr_pids(self, file_pids):
+                organization_stats.append(stat)
 
-        if len(file_pids) == 0:
-            return ""
-        else:
-            all_catalog_records = FileService.get_identifiers(file_pids, "noparams", True).data
-            published_catalog_records = CatalogRecordV2.objects.filter(
-                identifier__in=all_catalog_records, state="published"
-            )
-            return list(
-                published_catalog_records.values_list(
-                    "research_dataset__preferred_identifier", flat=True
-                ).distinct()
-            )
+        return organization_stats
@@ -1,6 +1,9 @@
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from itertools import count
 
 from django.core.management.base import BaseCommand
+from django.db import connection
 
 from metax_api.models import Directory
 
@@ -8,16 +11,75 @@ logger = logging.getLogger(__name__)
 
 
 class Command(BaseCommand):
+    help = """Re-calculate byte sizes and file counts of all directories, one project at a time"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print directories with incorrect byte size or file count, without fixing them",
+        )
+        parser.add_argument(
+            "--parallel",
+            type=int,
+            default=1,
+            help="Number of projects processed in parallel",
+        )
+
     def handle(self, *args, **options):
-        dirs_with_no_files = Directory.objects_unfiltered.all()
-        dir_sum = dirs_with_no_files.count()
-        logger.info(f"fix_file_counts command found {dir_sum} directories")
-        i = 0
-        for dir in dirs_with_no_files:
-            i += 1
+        self.dry_run = options["dry_run"]
+        root_dirs = list(
+            Directory.objects_unfiltered.filter(parent_directory_id=None).order_by(
+                "project_identifier"
+            )
+        )
+        self.project_sum = len(root_dirs)
+        self.processed = count(1)
+        logger.info(f"fix_file_counts command found {self.project_sum} projects")
+
+        parallel = options["parallel"]
+        if parallel > 1:
+            with ThreadPoolExecutor(max_workers=parallel) as executor:
+                corrected_sum = sum(
+                    executor.map(
+                        self._fix_projects_in_thread,
+                        [root_dirs[i::parallel] for i in range(parallel)],
+                    )
+                )
+        else:
+            corrected_sum = self._fix_projects(root_dirs)
+
+        logger.info(
+            f"fix_file_counts command executed successfully. "
+            f"{'Found' if self.dry_run else 'Corrected'} {corrected_sum} directories "
+            f"with incorrect byte size or file count"
+        )
+
+    def _fix_projects(self, root_dirs):
+        corrected_sum = 0
+        for root_dir in root_dirs:
             try:
-                dir.calculate_byte_size_and_file_count()
-            except Exception as e:
-                logger.error(f"can't fix filecount for directory {i}/{dir_sum}")
-            logger.info(f"folder {i}/{dir_sum} has {dir.file_count} files after recalculation")
-        logger.info(f"fix_file_counts command executed successfully")
+                corrections = root_dir.calculate_byte_size_and_file_count(dry_run=self.dry_run)
+            except Exception:
+                logger.exception(f"can't fix file counts for project {root_dir.project_identifier}")
+                corrections = []
+
+            corrected_sum += len(corrections)
+            for id, path, old_byte_size, byte_size, old_file_count, file_count in corrections:
+                self.stdout.write(
+                    f"{root_dir.project_identifier} {path}: byte_size {old_byte_size} -> "
+                    f"{byte_size}, file_count {old_file_count} -> {file_count}"
+                )
+
+            i = next(self.processed)
+            if i % 100 == 0 or i == self.project_sum:
+                logger.info(f"fix_file_counts processed {i}/{self.project_sum} projects")
+
+        return corrected_sum
+
+    def _fix_projects_in_thread(self, root_dirs):
+        try:
+            return self._fix_projects(root_dirs)
+        finally:
+            # every thread opens its own database connection
+            connection.close()
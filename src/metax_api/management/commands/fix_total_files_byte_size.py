@@ -1,6 +1,8 @@
 import logging
 
 from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Max, Min
 
 from metax_api.models import CatalogRecord
 
@@ -10,12 +12,88 @@ logger = logging.getLogger(__name__)
 class Command(BaseCommand):
     """Update research_dataset.total_files_byte_size for all datasets."""
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only print datasets with incorrect total_files_byte_size, without fixing them",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=10000,
+            help="Number of consecutive dataset ids updated in a single statement",
+        )
+
     def handle(self, *args, **options):
-        CRS = CatalogRecord.objects_unfiltered.all()
-        crs_sum = CRS.count()
-        i = 1
-        for catalog_record in CRS:
-            logger.info(f"Calculating {i}/{crs_sum} {catalog_record.identifier} ")
-            catalog_record._calculate_total_files_byte_size(save_cr=True)
-            i += 1
-        logger.info(f"fix_total_files_byte_size command executed successfully")
+        dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+
+        # total_files_byte_size is only added to datasets which have, or have had, files.
+        # the total includes only files which are not removed.
+        sql_corrections = """
+            with totals as (
+                select
+                    cr.id,
+                    coalesce(sum(f.byte_size) filter (where f.active and not f.removed), 0)
+                        as byte_size
+                from metax_api_catalogrecord cr
+                left join metax_api_catalogrecord_files cr_f on cr_f.catalogrecord_id = cr.id
+                left join metax_api_file f on f.id = cr_f.file_id
+                where cr.id >= %s and cr.id < %s
+                group by cr.id
+                having cr.research_dataset ? 'total_files_byte_size' or count(f.id) > 0
+            ),
+            corrections as (
+                select
+                    cr.id,
+                    cr.identifier,
+                    cr.research_dataset->'total_files_byte_size' as old_byte_size,
+                    totals.byte_size
+                from metax_api_catalogrecord cr
+                join totals on totals.id = cr.id
+                where cr.research_dataset->'total_files_byte_size'
+                    is distinct from to_jsonb(totals.byte_size)
+            )
+            """
+
+        if dry_run:
+            sql_corrections += "select * from corrections"
+        else:
+            sql_corrections += """
+                update metax_api_catalogrecord as cr set
+                    research_dataset = jsonb_set(
+                        cr.research_dataset, '{total_files_byte_size}', to_jsonb(c.byte_size)
+                    )
+                from corrections c
+                where c.id = cr.id
+                returning c.*
+                """
+
+        ids = CatalogRecord.objects_unfiltered.aggregate(Min("id"), Max("id"))
+        crs_sum = CatalogRecord.objects_unfiltered.count()
+        logger.info(f"fix_total_files_byte_size command found {crs_sum} datasets")
+
+        if not crs_sum:
+            return
+
+        corrected_sum = 0
+        with connection.cursor() as cr:
+            for start in range(ids["id__min"], ids["id__max"] + 1, batch_size):
+                cr.execute(sql_corrections, [start, start + batch_size])
+                for id, identifier, old_byte_size, byte_size in cr.fetchall():
+                    corrected_sum += 1
+                    self.stdout.write(
+                        f"{identifier}: total_files_byte_size {old_byte_size} -> {byte_size}"
+                    )
+
+                logger.info(
+                    f"fix_total_files_byte_size processed datasets up to id "
+                    f"{min(start + batch_size - 1, ids['id__max'])}/{ids['id__max']}"
+                )
+
+        logger.info(
+            f"fix_total_files_byte_size command executed successfully. "
+            f"{'Found' if dry_run else 'Corrected'} {corrected_sum} datasets "
+            f"with incorrect total_files_byte_size"
+        )
@@ -0,0 +1,53 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+import logging
+
+from django.core.management.base import BaseCommand
+
+from metax_api.api.oaipmh.base.metadata_cache import OAIMetadataCache
+from metax_api.api.oaipmh.base.metax_oai_server import MetaxOAIServer
+from metax_api.models import CatalogRecord
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = """Render OAI-PMH metadata of all harvestable datasets into the OAI metadata cache"""
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--refresh",
+            action="store_true",
+            help="Render also datasets which already have valid entries in the cache",
+        )
+
+    def handle(self, *args, **options):
+        if not OAIMetadataCache.enabled():
+            logger.info("OAI metadata cache is disabled, nothing to do")
+            return
+
+        server = MetaxOAIServer()
+        crs = (
+            CatalogRecord.objects.filter(
+                active=True,
+                state="published",
+                data_catalog__catalog_json__identifier__in=server._get_default_set_filter(),
+            )
+            .select_related("data_catalog")
+            .order_by("id")
+        )
+
+        logger.info(f"Warming OAI metadata cache of {crs.count()} datasets")
+        count = 0
+        for cr in crs.iterator(chunk_size=500):
+            server.update_metadata_cache(cr, refresh=options["refresh"])
+            count += 1
+            if count % 1000 == 0:
+                logger.info(f"Warmed OAI metadata cache of {count} datasets")
+
+        logger.info(f"Warmed OAI metadata cache of {count} datasets")
@@ -7,11 +7,16 @@
 
 import json
 import logging
+import threading
 from base64 import b64decode
+from collections import OrderedDict
+from hashlib import sha256
+from time import monotonic, time
 
 import requests
 from django.conf import settings as django_settings
 from django.http import HttpResponseForbidden
+from requests.adapters import HTTPAdapter
 
 from metax_api.exceptions import Http403
 from metax_api.settings.components.access_control import Role
@@ -46,6 +51,109 @@ if not django_settings.TLS_VERIFY:
     requests.packages.urllib3.disable_warnings()
 
 
+class _TokenValidationCache:
+    """
+    Bearer tokens that have been successfully validated by the oidc proxy, shared by all threads
+    of the process. Tokens are stored as hashes, and are considered valid for at most the
+    configured TTL, and never after the exp claim of the token.
+
+    Also keeps counters of cache hits and of the time spent in token validation requests.
+    """
+
+    # how often the counters are logged, as number of looked up tokens
+    STATS_LOG_INTERVAL = 1000
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.validation_count = 0
+        self.validation_time = 0.0
+
+    @staticmethod
+    def _settings():
+        return django_settings.TOKEN_VALIDATION_CACHE
+
+    def is_valid(self, token_hash):
+        now = time()
+
+        with self._lock:
+            expires_at = self._tokens.get(token_hash)
+
+            if expires_at is not None and expires_at <= now:
+                del self._tokens[token_hash]
+                expires_at = None
+
+            if expires_at is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+
+            log_stats = (self.hits + self.misses) % self.STATS_LOG_INTERVAL == 0
+
+        if log_stats:
+            _logger.info("token validation cache: %s" % self.stats())
+
+        return expires_at is not None
+
+    def add(self, token_hash, token):
+        ttl = self._settings()["TTL"]
+
+        if ttl <= 0:
+            return
+
+        expires_at = time() + ttl
+
+        if isinstance(token.get("exp"), (int, float)):
+            expires_at = min(expires_at, token["exp"])
+
+        if expires_at <= time():
+            return
+
+        with self._lock:
+            self._tokens[token_hash] = expires_at
+            self._tokens.move_to_end(token_hash)
+
+            while len(self._tokens) > self._settings()["MAX_ENTRIES"]:
+                self._tokens.popitem(last=False)
+
+    def record_validation(self, elapsed):
+        with self._lock:
+            self.validation_count += 1
+            self.validation_time += elapsed
+
+    def clear(self):
+        with self._lock:
+            self._tokens.clear()
+            self.hits = 0
+            self.misses = 0
+            self.validation_count = 0
+            self.validation_time = 0.0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._tokens),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "validations": self.validation_count,
+                "avg_validation_ms": round(1000 * self.validation_time / self.validation_count, 1)
+                if self.validation_count
+                else 0.0,
+            }
+
+
+token_validation_cache = _TokenValidationCache()
+
+# keeps connections to the oidc proxy open between requests. shared by all threads
+_token_validation_session = requests.Session()
+_token_validation_session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=32))
+_token_validation_session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=32))
+
+
 class _IdentifyApiCaller:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -167,20 +275,11 @@ class _IdentifyApiCaller:
         request.user.is_service = True
 
     def _auth_bearer(self, request, auth_b64):
-        _logger.debug("validating bearer token...")
+        token_hash = sha256(auth_b64.encode("utf-8")).hexdigest()
+        token_is_cached = token_validation_cache.is_valid(token_hash)
 
-        response = requests.get(
-            # url protected by oidc. the proxy is configured to return 200 OK for any valid token
-            django_settings.VALIDATE_TOKEN_URL,
-            headers={"Authorization": request.META.get("HTTP_AUTHORIZATION", None)},
-            verify=False,
-        )
-
-        _logger.debug("response from token validation: %s" % str(response))
-
-        if response.status_code != 200:
-            _logger.warning("Bearer token validation failed")
-            raise Http403({"detail": ["Access denied."]})
+        if not token_is_cached:
+            self._validate_bearer_token(request)
 
         try:
             token = self._extract_id_token(auth_b64)
@@ -190,6 +289,9 @@ class _IdentifyApiCaller:
             _logger.exception("Failed to extract token from id_token string")
             raise Http403({"detail": ["Access denied."]})
 
+        if not token_is_cached:
+            token_validation_cache.add(token_hash, token)
+
         if len(token.get("CSCUserName", "")) > 0:
             request.user.username = token["CSCUserName"]
         else:
@@ -200,6 +302,26 @@ class _IdentifyApiCaller:
         request.user.is_metax_v3 = False
         request.user.token = token
 
+    def _validate_bearer_token(self, request):
+        _logger.debug("validating bearer token...")
+
+        start = monotonic()
+
+        response = _token_validation_session.get(
+            # url protected by oidc. the proxy is configured to return 200 OK for any valid token
+            django_settings.VALIDATE_TOKEN_URL,
+            headers={"Authorization": request.META.get("HTTP_AUTHORIZATION", None)},
+            verify=False,
+        )
+
+        token_validation_cache.record_validation(monotonic() - start)
+
+        _logger.debug("response from token validation: %s" % str(response))
+
+        if response.status_code != 200:
+            _logger.warning("Bearer token validation failed")
+            raise Http403({"detail": ["Access denied."]})
+
     def _extract_id_token(self, id_token_string):
         """
         Extract the interesting part from the dot-separated string that looks something like
@@ -2,6 +2,9 @@ from base64 import b64decode
 from datetime import datetime
 from json import loads as json_loads
 import logging
+import os
+import queue
+import threading
 import requests
 from requests.adapters import HTTPAdapter, Retry
 
@@ -14,6 +17,113 @@ from metax_api.utils import get_tz_aware_now_without_micros
 _logger = logging.getLogger("metax_api")
 
 
+class _MetricsEmitter:
+    """
+    Sends events to the Metrics API from a background thread, so that tracking metrics never
+    adds latency to api requests. Events wait in a bounded queue, and are dropped instead of
+    blocking the request when the queue is full. The worker sends queued events in batches,
+    reusing the connections of a single session.
+    """
+
+    MAX_QUEUE_SIZE = 10000
+    BATCH_SIZE = 100
+    TIMEOUT = 5
+
+    def __init__(self):
+        self._queue = queue.Queue(maxsize=self.MAX_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._worker = None
+        self._worker_pid = None
+        self._session = None
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def emit(self, api, query_params):
+        self._ensure_worker()
+
+        try:
+            self._queue.put_nowait((api, query_params))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+                dropped = self.dropped
+            if dropped == 1 or dropped % 1000 == 0:
+                _logger.warning("Metrics event queue is full. %d events dropped so far" % dropped)
+
+    def stats(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    def flush(self):
+        """
+        Wait until all queued events have been sent.
+        """
+        self._queue.join()
+
+    def _ensure_worker(self):
+        # threads do not survive forking, so also check the worker belongs to this process
+        if self._worker_pid == os.getpid() and self._worker.is_alive():
+            return
+
+        with self._lock:
+            if self._worker_pid == os.getpid() and self._worker.is_alive():
+                return
+
+            self._session = requests.Session()
+            self._session.mount("https://", HTTPAdapter(max_retries=Retry(connect=2, read=0)))
+            self._session.mount("http://", HTTPAdapter(max_retries=Retry(connect=2, read=0)))
+            self._worker = threading.Thread(target=self._run, name="metrics-emitter", daemon=True)
+            self._worker_pid = os.getpid()
+            self._worker.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+
+            while len(batch) < self.BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._send(batch)
+            except Exception:
+                _logger.exception("Failed to publish events")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _send(self, batch):
+        for i, (api, query_params) in enumerate(batch):
+            try:
+                response = self._session.post(
+                    f"{api}/report", params=query_params, timeout=self.TIMEOUT
+                )
+            except requests.exceptions.RequestException as e:
+                # the rest of the batch would most likely fail the same way. drop it instead of
+                # waiting for each to time out
+                _logger.error(f"Connection to {api} not working. Metrics will not be updated.")
+                _logger.error(e)
+                self.failed += len(batch) - i
+                return
+
+            if response.status_code != 200:
+                _logger.error(f"{api} returned status_code: {response.status_code}")
+                _logger.error(response.text)
+                self.failed += 1
+            else:
+                self.sent += 1
+
+
+metrics_emitter = _MetricsEmitter()
+
+
 class MetricsTracking:
     def __init__(self, get_response):
         self.get_response = get_response
@@ -151,19 +261,7 @@ class MetricsTracking:
                 "token": token,
             }
 
-            # Check first that connection to Metrics API is working
-            try:
-                requests.head(api, timeout=1)
-            except TimeoutError as e:
-                _logger.error(f"Connection to {api} not working. Metrics will not be updated.")
-                _logger.error(e)
-                return
-
-            # Send the event to Metrics API
-            response = requests.post(f"{api}/report", params=query_params)
-            if response.status_code != 200:
-                _logger.error(f"{api} returned status_code: {response.status_code}")
-                _logger.error(response.text)
+            metrics_emitter.emit(api, query_params)
 
         except Exception as error:
             _logger.error("Failed to publish event")
@@ -0,0 +1,62 @@
+# Generated by Django 3.2.18 on 2026-10-17 04:41
+
+from django.db import migrations
+import metax_api.models.fields
+
+
+# the value of each column is computed by the database from research_dataset. the expressions
+# match those previously used directly in queries, so that the values do not change.
+GENERATED_COLUMNS = [
+    ('rd_access_type', 'text', "research_dataset->'access_rights'->'access_type'->>'identifier'"),
+    ('rd_metadata_version_identifier', 'text', "research_dataset->>'metadata_version_identifier'"),
+    ('rd_preferred_identifier', 'text', "research_dataset->>'preferred_identifier'"),
+    ('rd_total_files_byte_size', 'bigint', "(research_dataset->>'total_files_byte_size')::bigint"),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('metax_api', '0069_change_metadata_owner'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            database_operations=[
+                # adding a stored generated column rewrites the table, so all columns are added
+                # in a single statement, to rewrite the table only once
+                migrations.RunSQL(
+                    "ALTER TABLE metax_api_catalogrecord %s;" % ", ".join(
+                        "ADD COLUMN %s %s GENERATED ALWAYS AS (%s) STORED"
+                        % (name, db_type, expression)
+                        for name, db_type, expression in GENERATED_COLUMNS
+                    ),
+                    reverse_sql="ALTER TABLE metax_api_catalogrecord %s;" % ", ".join(
+                        "DROP COLUMN %s" % name for name, db_type, expression in GENERATED_COLUMNS
+                    ),
+                ),
+            ],
+            state_operations=[
+                migrations.AddField(
+                    model_name='catalogrecord',
+                    name='rd_access_type',
+                    field=metax_api.models.fields.GeneratedTextField(help_text='Generated from research_dataset.access_rights.access_type.identifier.'),
+                ),
+                migrations.AddField(
+                    model_name='catalogrecord',
+                    name='rd_metadata_version_identifier',
+                    field=metax_api.models.fields.GeneratedTextField(help_text='Generated from research_dataset.metadata_version_identifier.'),
+                ),
+                migrations.AddField(
+                    model_name='catalogrecord',
+                    name='rd_preferred_identifier',
+                    field=metax_api.models.fields.GeneratedTextField(help_text='Generated from research_dataset.preferred_identifier.'),
+                ),
+                migrations.AddField(
+                    model_name='catalogrecord',
+                    name='rd_total_files_byte_size',
+                    field=metax_api.models.fields.GeneratedBigIntegerField(help_text='Generated from research_dataset.total_files_byte_size.'),
+                ),
+            ],
+        ),
+    ]
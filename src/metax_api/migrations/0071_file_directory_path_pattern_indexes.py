@@ -0,0 +1,25 @@
+# Generated by Django 3.2.18 on 2026-10-17 05:05
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # indexes are created concurrently, which is not possible inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('metax_api', '0070_catalogrecord_research_dataset_columns'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='directory',
+            index=models.Index(fields=['project_identifier', 'directory_path'], name='dir_project_path_pattern_idx', opclasses=['varchar_ops', 'text_pattern_ops']),
+        ),
+        AddIndexConcurrently(
+            model_name='file',
+            index=models.Index(fields=['project_identifier', 'file_path'], name='file_project_path_pattern_idx', opclasses=['varchar_ops', 'text_pattern_ops']),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 3.2.18 on 2026-10-17 06:20
+
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    # indexes are created concurrently, which is not possible inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('metax_api', '0071_file_directory_path_pattern_indexes'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='catalogrecord',
+            index=models.Index(fields=['rd_access_type'], name='metax_api_c_rd_acce_1cdfc3_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='catalogrecord',
+            index=models.Index(fields=['rd_metadata_version_identifier'], name='metax_api_c_rd_meta_d6bf89_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='catalogrecord',
+            index=models.Index(fields=['rd_preferred_identifier'], name='metax_api_c_rd_pref_fa3ba3_idx'),
+        ),
+    ]
@@ -15,6 +15,7 @@ from .deleted_object import DeletedObject
 from .directory import Directory
 from .file import File
 from .file_storage import FileStorage
+from .lookups import PathStartsWith
 from .metax_user import MetaxUser
 from .organization_statistics import OrganizationStatistics
 from .project_statistics import ProjectStatistics
@@ -43,7 +43,9 @@ from .common import Common, CommonManager
 from .contract import Contract
 from .data_catalog import DataCatalog
 from .directory import Directory
+from .fields import GeneratedBigIntegerField, GeneratedTextField
 from .file import File
+from .lookups import get_startswith_range
 
 READ_METHODS = ("GET", "HEAD", "OPTIONS")
 DEBUG = settings.DEBUG
@@ -234,11 +236,9 @@ class CatalogRecordManager(CommonManager):
                 "metadata_version_identifier", None
             ):
                 # todo probably remove at some point
-                kwargs["research_dataset__contains"] = {
-                    "metadata_version_identifier": row["research_dataset"][
-                        "metadata_version_identifier"
-                    ]
-                }
+                kwargs["rd_metadata_version_identifier"] = row["research_dataset"][
+                    "metadata_version_identifier"
+                ]
             else:
                 raise ValidationError(
                     "this operation requires an identifying key to be present: id, or identifier"
@@ -253,13 +253,7 @@ class CatalogRecordManager(CommonManager):
             raise ValidationError("metadata_version_identifier is a required keyword argument")
         cr = (
             super(CatalogRecordManager, self)
-            .filter(
-                **{
-                    "research_dataset__contains": {
-                        "metadata_version_identifier": metadata_version_identifier
-                    }
-                }
-            )
+            .filter(rd_metadata_version_identifier=metadata_version_identifier)
             .values("id")
             .first()
         )
@@ -442,6 +436,26 @@ class CatalogRecord(Common):
 
     research_dataset = JSONField()
 
+    # frequently filtered or listed values of research_dataset, computed by the database. see
+    # GeneratedFieldMixin. note that properties preferred_identifier and metadata_version_identifier
+    # read the values from research_dataset of the instance instead.
+
+    rd_access_type = GeneratedTextField(
+        help_text="Generated from research_dataset.access_rights.access_type.identifier.",
+    )
+
+    rd_metadata_version_identifier = GeneratedTextField(
+        help_text="Generated from research_dataset.metadata_version_identifier.",
+    )
+
+    rd_preferred_identifier = GeneratedTextField(
+        help_text="Generated from research_dataset.preferred_identifier.",
+    )
+
+    rd_total_files_byte_size = GeneratedBigIntegerField(
+        help_text="Generated from research_dataset.total_files_byte_size.",
+    )
+
     next_draft = models.OneToOneField(
         "self",
         on_delete=models.SET_NULL,
@@ -551,6 +565,9 @@ class CatalogRecord(Common):
         indexes = [
             models.Index(fields=["data_catalog"]),
             models.Index(fields=["identifier"]),
+            models.Index(fields=["rd_access_type"]),
+            models.Index(fields=["rd_metadata_version_identifier"]),
+            models.Index(fields=["rd_preferred_identifier"]),
         ]
         ordering = ["id"]
 
@@ -850,28 +867,17 @@ class CatalogRecord(Common):
                 """
                 sql_params_copy_dirs = [new_record_id, old_record_id]
 
-                copy_dirs_sql = []
-
-                for project, dir_paths in dirs_to_keep_by_project.items():
-                    for dir_path in dir_paths:
-                        copy_dirs_sql.append(
-                            "(f.project_identifier = %s and f.file_path like (%s || '/%%'))"
-                        )
-                        sql_params_copy_dirs.extend([project, dir_path])
-
+                dirs_sql, dirs_params = self._get_sql_files_with_path_prefixes(
+                    (project, "%s/" % dir_path)
+                    for project, dir_paths in dirs_to_keep_by_project.items()
+                    for dir_path in dir_paths
+                )
+                sql_params_copy_dirs.extend(dirs_params)
                 sql_params_copy_dirs.extend([new_record_id])
 
                 sql_copy_dirs_from_prev_version = sql_copy_dirs_from_prev_version.replace(
-                    "COMPARE_PROJECT_AND_FILE_PATHS", " or ".join(copy_dirs_sql)
+                    "COMPARE_PROJECT_AND_FILE_PATHS", dirs_sql
                 )
-                # ^ generates:
-                # and (
-                #   (f.project_identifier = %s and f.file_path like %s/)
-                #   or
-                #   (f.project_identifier = %s and f.file_path like %s/)
-                #   or
-                #   (f.project_identifier = %s and f.file_path like %s/)
-                # )
 
                 if DEBUG:
                     _logger.debug("Directory paths to keep, by project:")
@@ -900,18 +906,16 @@ class CatalogRecord(Common):
                 """
                 sql_params_insert_dirs = [new_record_id]
 
-                add_dirs_sql = []
-
-                for project, dir_paths in dirs_to_add_by_project.items():
-                    for dir_path in dir_paths:
-                        add_dirs_sql.append(
-                            "(f.project_identifier = %s and f.file_path like (%s || '/%%'))"
-                        )
-                        sql_params_insert_dirs.extend([project, dir_path])
+                dirs_sql, dirs_params = self._get_sql_files_with_path_prefixes(
+                    (project, "%s/" % dir_path)
+                    for project, dir_paths in dirs_to_add_by_project.items()
+                    for dir_path in dir_paths
+                )
+                sql_params_insert_dirs.extend(dirs_params)
 
                 sql_select_and_insert_files_by_dir_path = (
                     sql_select_and_insert_files_by_dir_path.replace(
-                        "COMPARE_PROJECT_AND_FILE_PATHS", " or ".join(add_dirs_sql)
+                        "COMPARE_PROJECT_AND_FILE_PATHS", dirs_sql
                     )
                 )
 
@@ -2017,18 +2021,15 @@ class CatalogRecord(Common):
             )
             returning id
         """
-        sql_params_insert_dirs = [self.id]
-        add_dirs_sql = []
-
-        for project, dir_paths in file_changes["dirs_to_add_by_project"].items():
-            for dir_path in dir_paths:
-                add_dirs_sql.append(
-                    "(f.project_identifier = %s and f.file_path like (%s || '/%%'))"
-                )
-                sql_params_insert_dirs.extend([project, dir_path])
+        dirs_sql, dirs_params = self._get_sql_files_with_path_prefixes(
+            (project, "%s/" % dir_path)
+            for project, dir_paths in file_changes["dirs_to_add_by_project"].items()
+            for dir_path in dir_paths
+        )
+        sql_params_insert_dirs = [self.id] + dirs_params
 
         sql_select_and_insert_files_by_dir_path = sql_select_and_insert_files_by_dir_path.replace(
-            "COMPARE_PROJECT_AND_FILE_PATHS", " or ".join(add_dirs_sql)
+            "COMPARE_PROJECT_AND_FILE_PATHS", dirs_sql
         )
         sql_params_insert_dirs.extend([self.id])
 
@@ -2154,6 +2155,51 @@ class CatalogRecord(Common):
             self.research_dataset
         ) != CRS.get_research_dataset_license_url(self._initial_data["research_dataset"])
 
+    def _copy_files_to(self, cr):
+        """
+        Add the files of this record to record cr, copying the relations in the db instead of
+        loading the files into python. Like self.files, discards removed files. Files which
+        already belong to cr are skipped. Returns the number of added files.
+        """
+        sql_copy_files = """
+            insert into metax_api_catalogrecord_files (catalogrecord_id, file_id)
+            select %s, cr_f.file_id
+            from metax_api_catalogrecord_files as cr_f
+            join metax_api_file as f on f.id = cr_f.file_id
+            where cr_f.catalogrecord_id = %s
+            and f.active = true and f.removed = false
+            on conflict do nothing
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(sql_copy_files, [cr.id, self.id])
+            return cursor.rowcount
+
+    @staticmethod
+    def _get_sql_files_with_path_prefixes(prefixes):
+        """
+        Return an sql condition and its params, which matches the files of table alias f, whose
+        file_path starts with any of the given prefixes within the same project. Parameter
+        prefixes is an iterable of (project_identifier, file_path prefix) tuples.
+
+        Each prefix is compared as a range of paths instead of a LIKE pattern, so that the files
+        of every prefix are looked up from index file_project_path_pattern_idx, regardless of
+        the collation of the database.
+        """
+        sql_prefixes = []
+        params = []
+
+        for project_identifier, path_prefix in prefixes:
+            sql_prefixes.append(
+                "(f.project_identifier = %s and f.file_path ~>=~ %s and f.file_path ~<~ %s)"
+            )
+            params.append(project_identifier)
+            params.extend(get_startswith_range(path_prefix))
+
+        if not sql_prefixes:
+            return "false", []
+
+        return "(%s)" % " or ".join(sql_prefixes), params
+
     def _calculate_total_files_byte_size(self, save_cr=False):
         """Assign total_files_byte_size to research_dataset."""
         rd = self.research_dataset
@@ -2641,67 +2687,14 @@ class CatalogRecord(Common):
         """
         _logger.info("Calculating directory byte_sizes and file_counts...")
 
-        dir_identifiers = file_dir_identifiers = []
+        directory_data = Directory.calculate_byte_sizes_and_file_counts_for_cr(self.id)
 
-        if self.research_dataset.get("directories", None):
-            dir_identifiers = [d["identifier"] for d in self.research_dataset["directories"]]
-
-        file_dir_identifiers = []
-        if self.research_dataset.get("files", None):
-            try:
-                file_dir_identifiers = [
-                    File.objects.get(identifier=f["identifier"]).parent_directory.identifier
-                    for f in self.research_dataset["files"]
-                ]
-            except Exception as e:
-                _logger.error(e)
-
-        if not dir_identifiers and not file_dir_identifiers:
+        if not directory_data and not self._directory_data:
             return
 
-        dir_identifiers = set(dir_identifiers + file_dir_identifiers)
-
-        highest_level_dirs_by_project = self._get_top_level_parent_dirs_by_project(dir_identifiers)
-
-        if len(highest_level_dirs_by_project) == 0:
-            return
-
-        directory_data = {}
-
-        for project_identifier, dir_paths in highest_level_dirs_by_project.items():
-            dirs = Directory.objects.filter(
-                project_identifier=project_identifier, directory_path__in=dir_paths
-            )
-            for dr in dirs:
-                dr.calculate_byte_size_and_file_count_for_cr(self.id, directory_data)
-
-        # assigning dir data to parent directories
-        self.get_dirs_by_parent(dirs, directory_data)
-
         self._directory_data = directory_data
         super(Common, self).save(update_fields=["_directory_data"])
 
-    def get_dirs_by_parent(self, ids, directory_data):
-        dirs = Directory.objects.filter(id__in=ids, parent_directory_id__isnull=False).values_list(
-            "id", "parent_directory_id"
-        )
-        ids = []
-
-        if dirs:
-            for dir in dirs:
-                ids.append(dir[1])
-                if directory_data.get(dir[1]):
-                    children = Directory.objects.get(pk=dir[1]).child_directories.all()
-                    if len(children) == 1 and children.first() == Directory.objects.get(pk=dir[0]):
-                        directory_data[dir[1]] = deepcopy(directory_data[dir[0]])
-                    else:
-                        directory_data[dir[1]][0] += directory_data[dir[0]][0]
-                        directory_data[dir[1]][1] += directory_data[dir[0]][1]
-                else:
-                    directory_data[dir[1]] = deepcopy(directory_data[dir[0]])
-            return self.get_dirs_by_parent(ids, directory_data)
-        return directory_data
-
     def _handle_preferred_identifier_changed(self):
         if self.has_alternate_records():
             self._remove_from_alternate_record_set()
@@ -2880,7 +2873,7 @@ class CatalogRecord(Common):
         # ensure pas dataset contains exactly the same files as origin dataset. clear the result
         # that was achieved by calling save(), which processed research_dataset.files and research_dataset.directories
         pas_version.files.clear()
-        pas_version.files.add(*origin_version.files.filter().values_list("id", flat=True))
+        origin_version._copy_files_to(pas_version)
 
         # link origin_version and pas copy
         origin_version.preservation_dataset_version = pas_version
@@ -2925,7 +2918,7 @@ class CatalogRecord(Common):
         """
         return (
             CatalogRecord.objects.select_related("data_catalog", "alternate_record_set")
-            .filter(research_dataset__contains={"preferred_identifier": self.preferred_identifier})
+            .filter(rd_preferred_identifier=self.preferred_identifier)
             .exclude(Q(data_catalog__id=self.data_catalog_id) | Q(id=self.id))
             .first()
         )
@@ -2990,6 +2983,10 @@ class CatalogRecord(Common):
 
         CallableService.add_post_request_callable(callable)
 
+        if isinstance(callable, RabbitMQPublishRecord):
+            # whatever is published to rabbitmq is also harvested through oai-pmh
+            transaction.on_commit(OAIMetadataCacheUpdate(callable.cr, callable.routing_key))
+
     def __repr__(self):
         return (
             "<%s: %d, removed: %s, data_catalog: %s, metadata_version_identifier: %s, "
@@ -3092,7 +3089,7 @@ class CatalogRecord(Common):
             super(Common, new_version).save()
 
             # add all files from previous version to new version
-            new_version.files.add(*self.files.values_list("id", flat=True))
+            self._copy_files_to(new_version)
 
             self._new_version = new_version
 
@@ -3155,7 +3152,8 @@ class CatalogRecord(Common):
             super(Common, new_version).save()
 
             # add all files from previous version in addition to new ones
-            new_version.files.add(*added_file_ids, *self.files.values_list("id", flat=True))
+            self._copy_files_to(new_version)
+            new_version.files.add(*added_file_ids)
 
             self._new_version = new_version
             self._create_new_dataset_version()
@@ -3293,9 +3291,12 @@ class RabbitMQPublishRecord:
     Callable object to be passed to CommonService.add_post_request_callable(callable).
 
     Handles rabbitmq publishing.
+
+    When publishing many records, they can be serialized together beforehand, and the
+    serialized record passed in cr_json.
     """
 
-    def __init__(self, cr, routing_key):
+    def __init__(self, cr, routing_key, cr_json=None):
         assert routing_key in (
             "create",
             "update",
@@ -3303,6 +3304,7 @@ class RabbitMQPublishRecord:
         ), "invalid value for routing_key"
         self.cr = cr
         self.routing_key = routing_key
+        self.cr_json = cr_json
 
     def __call__(self):
         """
@@ -3353,10 +3355,54 @@ class RabbitMQPublishRecord:
             )
 
     def _to_json(self):
+        if self.cr_json is not None:
+            return self.cr_json
         serializer_class = self.cr.serializer_class
         return serializer_class(self.cr).data
 
 
+class OAIMetadataCacheUpdate:
+
+    """
+    Callable object to be passed to django.db.transaction.on_commit(callable).
+
+    Renders the OAI-PMH metadata of a dataset into OAIMetadataCache once the changes are
+    committed, so that the next harvest does not have to. Failing to update the cache is
+    not an error, since stale entries are never served and missing entries are rendered
+    on demand.
+    """
+
+    def __init__(self, cr, routing_key):
+        self.cr = cr
+        self.routing_key = routing_key
+
+    def __call__(self):
+        from metax_api.api.oaipmh.base.metadata_cache import OAIMetadataCache
+        from metax_api.api.oaipmh.base.metax_oai_server import CACHED_MDPREFIXES, MetaxOAIServer
+
+        if not OAIMetadataCache.enabled():
+            return
+
+        try:
+            if self.routing_key == "delete" or not self._harvestable():
+                OAIMetadataCache().delete(self.cr.id, CACHED_MDPREFIXES)
+            else:
+                MetaxOAIServer().update_metadata_cache(self.cr, refresh=True)
+        except Exception:
+            _logger.exception(
+                "Failed to update OAI-PMH metadata cache of CatalogRecord %s" % self.cr.identifier
+            )
+
+    def _harvestable(self):
+        from metax_api.api.oaipmh.base.metax_oai_server import MetaxOAIServer
+
+        return (
+            self.cr.is_published()
+            and self.cr.data_catalog.catalog_json["identifier"]
+            in MetaxOAIServer._get_default_set_filter()
+        )
+
+
 class REMSUpdate:
 
     """
@@ -8,9 +8,11 @@
 import logging
 from collections import defaultdict
 from copy import deepcopy
+from itertools import groupby
 
 from django.conf import settings
-from django.db.models import Q, Sum
+from django.db import connection
+from django.db.models import Sum
 from rest_framework.serializers import ValidationError
 
 from metax_api.exceptions import Http400, Http403
@@ -422,7 +424,7 @@ class CatalogRecordV2(CatalogRecord):
                 )
 
                 # add all files which were not already part of the original record
-                origin_cr.files.add(*draft_cr.files.all().exclude(id__in=origin_cr.files.all()))
+                draft_cr._copy_files_to(origin_cr)
 
                 # files should now match, so it should be ok to just copy the directory data for file browsing
                 origin_cr._directory_data = draft_cr._directory_data
@@ -925,30 +927,31 @@ class CatalogRecordV2(CatalogRecord):
             if self.cumulative_state == self.CUMULATIVE_STATE_YES:
                 self.date_last_cumulative_addition = self.date_modified
 
-        # for counting changes at the end
-        files_before_set = set(id for id in self.files.all().values_list("id", flat=True))
-
-        files_excluded = False
+        # when files are both added and excluded, the same files may be added and excluded during
+        # the same request, and the net effect can only be counted by comparing to the previous
+        # files of the dataset. otherwise, the effect is counted from the changed rows.
+        excludes = [
+            entry.get("exclude", False)
+            for entry in file_changes.get("directories", []) + file_changes.get("files", [])
+        ]
+        count_changes_from_previous_files = any(excludes) and not all(excludes)
+
+        if count_changes_from_previous_files:
+            with connection.cursor() as cr:
+                cr.execute(
+                    """
+                    create temporary table previous_files on commit drop as
+                    select file_id from metax_api_catalogrecord_files where catalogrecord_id = %s
+                    """,
+                    [self.id],
+                )
 
-        for dr in file_changes.get("directories", []):
+        # directory add and exclude entries are processed in the order they are provided
+        files_added_count, files_excluded_count = self._change_files_in_directories(
+            file_changes.get("directories", [])
+        )
 
-            # process directory add end exclude entries in the order they are provided
-
-            files = self._get_dataset_selected_file_ids(
-                dr["identifier"], "directory", exclude=dr.get("exclude", False)
-            )
-
-            if dr.get("exclude", False) is False:
-                _logger.debug(
-                    "Found %d files to add based on received directory objects" % len(files)
-                )
-                self.files.add(*files)
-            else:
-                _logger.debug(
-                    "Found %d files to exclude based on received directory objects" % len(files)
-                )
-                files_excluded = True
-                self.files.remove(*files)
+        files_excluded = any(dr.get("exclude", False) for dr in file_changes.get("directories", []))
 
         # process individual file add and exclude entries. order does not matter.
 
@@ -964,16 +967,35 @@ class CatalogRecordV2(CatalogRecord):
             if f.get("exclude", False) is True
         ]
 
-        file_ids_add = self._get_dataset_selected_file_ids(files_add, "file", exclude=False)
-        file_ids_exclude = self._get_dataset_selected_file_ids(files_exclude, "file", exclude=True)
+        file_ids_add = self._get_dataset_selected_file_ids(files_add, exclude=False)
+        file_ids_exclude = self._get_dataset_selected_file_ids(files_exclude, exclude=True)
 
         _logger.debug("Found %d files to add based on received file objects" % len(file_ids_add))
         _logger.debug(
             "Found %d files to exclude based on received file objects" % len(file_ids_exclude)
         )
 
-        self.files.add(*file_ids_add)
-        self.files.remove(*file_ids_exclude)
+        with connection.cursor() as cr:
+            if file_ids_add:
+                cr.execute(
+                    """
+                    insert into metax_api_catalogrecord_files (catalogrecord_id, file_id)
+                    select %s, unnest(%s::integer[])
+                    on conflict do nothing
+                    """,
+                    [self.id, file_ids_add],
+                )
+                files_added_count += cr.rowcount
+
+            if file_ids_exclude:
+                cr.execute(
+                    """
+                    delete from metax_api_catalogrecord_files
+                    where catalogrecord_id = %s and file_id = any(%s)
+                    """,
+                    [self.id, file_ids_exclude],
+                )
+                files_excluded_count += cr.rowcount
 
         # do final checking that resulting dataset contains files only from a single project
         projects = (
@@ -1012,14 +1034,30 @@ class CatalogRecordV2(CatalogRecord):
         super(Common, self).save()
 
         # count effect of performed actions: number of files added and excluded
-        file_ids_after = self.files.all().values_list("id", flat=True)
-
-        if operation_is_create:
-            files_added_count = len(file_ids_after)
-        else:
-            files_after_set = set(id for id in file_ids_after)
-            files_added_count = len(files_after_set.difference(files_before_set))
-            files_excluded_count = len(files_before_set.difference(files_after_set))
+        if count_changes_from_previous_files:
+            with connection.cursor() as cr:
+                cr.execute(
+                    """
+                    select
+                        (
+                            select count(*)
+                            from metax_api_catalogrecord_files as cr_f
+                            where cr_f.catalogrecord_id = %s
+                            and not exists (select from previous_files as p where p.file_id = cr_f.file_id)
+                        ),
+                        (
+                            select count(*)
+                            from previous_files as p
+                            where not exists (
+                                select from metax_api_catalogrecord_files as cr_f
+                                where cr_f.catalogrecord_id = %s and cr_f.file_id = p.file_id
+                            )
+                        )
+                    """,
+                    [self.id, self.id],
+                )
+                files_added_count, files_excluded_count = cr.fetchone()
+                cr.execute("drop table previous_files")
 
         ret = {
             "files_added": files_added_count,
@@ -1031,27 +1069,13 @@ class CatalogRecordV2(CatalogRecord):
 
         return ret
 
-    def _get_dataset_selected_file_ids(self, identifier_list, identifier_type, exclude=False):
+    def _get_dataset_selected_file_ids(self, identifier_list, exclude=False):
         """
         Return a list of ids of all unique individual files currently in the db.
         """
-        assert identifier_type in ("file", "directory")
-
-        if type(identifier_list) is not list:
-            # this method can accept a single identifier too
-            identifier_list = [identifier_list]
-
-        file_ids = []
         file_changes = {"changed_projects": defaultdict(set)}
-
-        if identifier_type == "file":
-            file_ids = self._get_file_ids_from_file_list(identifier_list, file_changes, exclude)
-
-        elif identifier_type == "directory":
-            file_ids = self._get_file_ids_from_dir_list(identifier_list, file_changes, exclude)
-
+        file_ids = self._get_file_ids_from_file_list(identifier_list, file_changes, exclude)
         self._check_changed_files_permissions(file_changes)
-
         return file_ids
 
     def _get_file_ids_from_file_list(self, file_identifiers, file_changes, exclude):
@@ -1106,68 +1130,100 @@ class CatalogRecordV2(CatalogRecord):
 
         return [f["id"] for f in files]
 
-    def _get_file_ids_from_dir_list(self, dir_identifiers, file_changes, exclude):
+    def _change_files_in_directories(self, dir_changes):
         """
-        Retrieve file ids for all files in requested directories and their subdirectories.
+        Add or exclude all files in the directories of the given directory entries, and their
+        subdirectories. The files are never loaded into python: consecutive add entries are
+        processed in a single insert statement, and consecutive exclude entries in a single delete
+        statement, so that the order of adds and excludes is preserved.
 
-        Update file_changes dict with affected projects for later permissions checking.
+        Returns a tuple of (number of added files, number of excluded files).
         """
-        if not dir_identifiers:
-            return []
+        if not dir_changes:
+            return 0, 0
 
-        dirs = Directory.objects.filter(identifier__in=dir_identifiers).values(
-            "project_identifier", "directory_path"
-        )
+        dir_identifiers = [dr["identifier"] for dr in dir_changes]
+
+        dirs = {
+            dr["identifier"]: dr
+            for dr in Directory.objects.filter(identifier__in=dir_identifiers).values(
+                "identifier", "project_identifier", "directory_path"
+            )
+        }
 
         if len(dirs) == 0:
             raise Http400("no directories matched given identifiers")
 
-        elif len(dirs) != len(dir_identifiers):
-            missing_identifiers = [
-                pid for pid in dir_identifiers if pid not in set([dr["identifier"] for dr in dirs])
-            ]
+        elif len(dirs) != len(set(dir_identifiers)):
+            missing_identifiers = set(dir_identifiers) - dirs.keys()
 
             raise Http400(
                 {
                     "detail": [
                         "Some requested directories were not found. Directory identifiers not found:"
                     ],
-                    "data": missing_identifiers,
+                    "data": [pid for pid in dir_identifiers if pid in missing_identifiers],
                 }
             )
 
-        project_identifier = dirs[0]["project_identifier"]
-
-        file_filter = Q()
-
-        for dr in dirs:
+        file_changes = {"changed_projects": defaultdict(set)}
+        for dr in dirs.values():
+            file_changes["changed_projects"]["files_added"].add(dr["project_identifier"])
 
-            if dr["project_identifier"] != project_identifier:
-                raise Http400("All added files must be from the same project")
+        self._check_changed_files_permissions(file_changes)
 
-            if dr["directory_path"] == "/":
-                file_filter = Q()
-                break
-            else:
-                file_filter |= Q(file_path__startswith="%s/" % dr["directory_path"])
+        sql_add_files = """
+            insert into metax_api_catalogrecord_files (catalogrecord_id, file_id)
+            select %s, f.id
+            from metax_api_file as f
+            where f.active = true and f.removed = false
+            and FILES_WITH_PATH_PREFIXES
+            on conflict do nothing
+        """
 
-        # results in ((path like x or path like y...) and project = z)
-        file_filter &= Q(project_identifier=project_identifier)
+        sql_exclude_files = """
+            delete from metax_api_catalogrecord_files
+            where catalogrecord_id = %s
+            and file_id in (
+                select f.id
+                from metax_api_file as f
+                where f.active = true and f.removed = false
+                and FILES_WITH_PATH_PREFIXES
+            )
+        """
 
-        file_changes["changed_projects"]["files_added"].add(project_identifier)
+        files_added_count = 0
+        files_excluded_count = 0
+
+        with connection.cursor() as cr:
+            for exclude, entries in groupby(dir_changes, key=lambda dr: dr.get("exclude", False)):
+                # files of a directory entry are matched by project and path prefix. the root
+                # directory matches all files of the project.
+                sql_files, params = self._get_sql_files_with_path_prefixes(
+                    (
+                        dr["project_identifier"],
+                        "/" if dr["directory_path"] == "/" else "%s/" % dr["directory_path"],
+                    )
+                    for dr in (dirs[entry["identifier"]] for entry in entries)
+                )
+                params = [self.id] + params
 
-        if exclude:
-            # retrieve files for the purpose excluding files from the dataset. search only from current dataset files
-            file_ids = self.files.filter(file_filter).values_list("id", flat=True)
-        else:
-            # retrieve files for the purpose of adding new files. search only from files not already part of the dataset
-            file_ids = (
-                File.objects.filter(file_filter)
-                .exclude(id__in=self.files.all())
-                .values_list("id", flat=True)
-            )
+                if exclude is False:
+                    cr.execute(sql_add_files.replace("FILES_WITH_PATH_PREFIXES", sql_files), params)
+                    _logger.debug(
+                        "Added %d files based on received directory objects" % cr.rowcount
+                    )
+                    files_added_count += cr.rowcount
+                else:
+                    cr.execute(
+                        sql_exclude_files.replace("FILES_WITH_PATH_PREFIXES", sql_files), params
+                    )
+                    _logger.debug(
+                        "Excluded %d files based on received directory objects" % cr.rowcount
+                    )
+                    files_excluded_count += cr.rowcount
 
-        return [id for id in file_ids]
+        return files_added_count, files_excluded_count
 
     def _clear_non_included_file_metadata_entries(self, raise_on_not_found=False):
         """
@@ -1338,7 +1394,7 @@ class CatalogRecordV2(CatalogRecord):
 
         if origin_cr.files.exists():
             # note: _directory_data field is already copied when the template is made
-            draft_cr.files.add(*origin_cr.files.all())
+            origin_cr._copy_files_to(draft_cr)
 
         origin_cr.next_draft = draft_cr
 
@@ -1447,7 +1503,7 @@ class CatalogRecordV2(CatalogRecord):
             # copy all files from previous version to new version.
             # note: discards removed files in the process, since the default manager for files
             # already has filter "removed=False"
-            new_version.files.add(*old_version.files.all())
+            old_version._copy_files_to(new_version)
 
             if old_version.deprecated:
                 new_version._clear_non_included_file_metadata_entries()
@@ -1615,26 +1671,3 @@ class CatalogRecordV2(CatalogRecord):
 
         # Handles with drafts
         self.add_post_request_callable(RabbitMQPublishRecord(self, "update"))
-
-    def calculate_directory_byte_sizes_and_file_counts(self):
-        """
-        Calculate directory byte_sizes and file_counts for all dirs selected for this cr.
-        """
-        if not self.files.exists():
-            return
-
-        _logger.info("Calculating directory byte_sizes and file_counts...")
-
-        parent_dir = self.files.first().parent_directory
-
-        while parent_dir.parent_directory is not None:
-            parent_dir = parent_dir.parent_directory
-
-        root_dir = parent_dir
-
-        directory_data = {}
-
-        root_dir.calculate_byte_size_and_file_count_for_cr(self.id, directory_data)
-
-        self._directory_data = directory_data
-        super(Common, self).save(update_fields=["_directory_data"])
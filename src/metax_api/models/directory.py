@@ -8,7 +8,7 @@
 import logging
 
 from django.db import connection, models
-from django.db.models import Count, Prefetch, Sum, Q
+from django.db.models import Count, Prefetch, Sum
 
 from .common import Common
 from .file import File
@@ -40,6 +40,12 @@ class Directory(Common):
             models.Index(fields=["identifier"]),
             models.Index(fields=["parent_directory"]),
             models.Index(fields=["project_identifier"]),
+            # see the equivalent index of File
+            models.Index(
+                fields=["project_identifier", "directory_path"],
+                name="dir_project_path_pattern_idx",
+                opclasses=["varchar_ops", "text_pattern_ops"],
+            ),
         ]
 
         constraints = [
@@ -60,16 +66,20 @@ class Directory(Common):
 
         return self.project_identifier in AuthService.get_user_projects(request)
 
-    def calculate_byte_size_and_file_count(self):
+    def calculate_byte_size_and_file_count(self, dry_run=False):
         """
-        Traverse the entire directory tree and update total byte size and file count
-        for each directory. Intended to be called for the root directory of a project, since it
-        doesnt make sense to update those numbers up to some middlepoint only.
+        Re-calculate total byte size and file count of each directory in the project from
+        scratch, in a single statement. Intended to be called for the root directory of a
+        project, since it doesnt make sense to update those numbers up to some middlepoint only.
+
+        Returns a list of (id, directory_path, old_byte_size, byte_size, old_file_count,
+        file_count) of the directories whose numbers were incorrect, ordered by id. With dry_run=True,
+        the incorrect numbers are only reported, and not updated.
         """
         if self.parent_directory_id:
             raise Exception(
-                "while this is a recursive method, it is intended to be initially called by "
-                "project root directories only."
+                "this method calculates the numbers of an entire project, and is intended to be "
+                "called by project root directories only."
             )
 
         _logger.info(
@@ -77,149 +87,196 @@ class Directory(Common):
             % self.project_identifier
         )
 
-        update_statements = []
-        annotated_root_directory = self._get_project_directory_tree(with_own_sizes=True)
-        annotated_root_directory._calculate_byte_size_and_file_count(update_statements)
+        # the own numbers of every directory are carried up the ancestor chain, and summed
+        # per directory, to get the total numbers of each directory.
+        sql_corrections = """
+            with recursive own_sizes as (
+                select d.id, coalesce(sum(f.byte_size), 0) as byte_size, count(f.id) as file_count
+                from metax_api_directory d
+                left join metax_api_file f on f.parent_directory_id = d.id and f.removed = false
+                where d.project_identifier = %s
+                and d.active = true and d.removed = false
+                group by d.id
+            ),
+            ancestors(id, byte_size, file_count) as (
+                select id, byte_size, file_count from own_sizes
+                union all
+                select d.parent_directory_id, a.byte_size, a.file_count
+                from ancestors a
+                join metax_api_directory d on d.id = a.id
+                where d.parent_directory_id is not null
+            ),
+            corrections as (
+                select
+                    d.id,
+                    d.directory_path,
+                    d.byte_size as old_byte_size,
+                    totals.byte_size,
+                    d.file_count as old_file_count,
+                    totals.file_count
+                from (
+                    select id, sum(byte_size) as byte_size, sum(file_count) as file_count
+                    from ancestors
+                    group by id
+                ) as totals
+                join metax_api_directory d on d.id = totals.id
+                where d.byte_size <> totals.byte_size or d.file_count <> totals.file_count
+            )
+            """
 
-        if len(update_statements) > 0:
-            sql_update_all_directories = """
+        if dry_run:
+            sql_corrections += "select * from corrections"
+        else:
+            sql_corrections += """
                 update metax_api_directory as d set
-                    byte_size = results.byte_size,
-                    file_count = results.file_count
-                from (values
-                    %s
-                ) as results(byte_size, file_count, id)
-                where results.id = d.id;
-                """ % ",".join(
-                update_statements
+                    byte_size = c.byte_size,
+                    file_count = c.file_count
+                from corrections c
+                where c.id = d.id
+                returning c.*
+                """
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql_corrections, [self.project_identifier])
+            corrections = sorted(
+                (id, path, old_byte_size, int(byte_size), old_file_count, int(file_count))
+                for id, path, old_byte_size, byte_size, old_file_count, file_count in cursor
             )
 
-            with connection.cursor() as cursor:
-                cursor.execute(sql_update_all_directories)
+        if not dry_run:
+            for c in corrections:
+                if c[0] == self.id:
+                    self.byte_size, self.file_count = c[3], c[5]
 
         _logger.info(
-            "Project %s directory tree calculations complete. Total byte_size: "
-            "%d bytes (%.3f GB), total file_count: %d files"
+            "Project %s directory tree calculations complete. %s %d directories. "
+            "Total byte_size: %d bytes (%.3f GB), total file_count: %d files"
             % (
                 self.project_identifier,
+                "Found incorrect numbers in" if dry_run else "Corrected",
+                len(corrections),
                 self.byte_size,
                 self.byte_size / 1024 / 1024 / 1024,
                 self.file_count,
             )
         )
 
-    def _get_project_directory_tree(self, with_own_sizes=False):
+        return corrections
+
+    @staticmethod
+    def add_to_byte_sizes_and_file_counts(files, subtract=False):
         """
-        Get all project directories from DB in single query. Returns current directory with
-        subdirectories in directory.sub_dirs.
+        Incrementally update byte sizes and file counts of the parent directories of the given
+        files, and of all their ancestors, instead of re-calculating the entire project tree.
 
-        Optionally, annotate directories with total size and
-        count of files they contain as own_byte_size and own_file_count.
+        Parameter files is an iterable of (parent_directory_id, byte_size) pairs of the files
+        that were added to, or with subtract=True removed from, the directories. Returns the
+        number of updated directories.
         """
-        project_directories = Directory.objects.filter(
-            project_identifier=self.project_identifier
-        ).only("file_count", "byte_size", "parent_directory_id")
-
-        if with_own_sizes:
-            project_directories = project_directories.annotate(
-                own_byte_size=Sum("files__byte_size", filter=Q(files__removed=False)),
-                own_file_count=Count("files", filter=Q(files__removed=False)),
+        deltas = {}
+        for parent_directory_id, byte_size in files:
+            if parent_directory_id is None:
+                continue
+            delta = deltas.setdefault(parent_directory_id, [0, 0])
+            delta[0] += byte_size or 0
+            delta[1] += 1
+
+        if not deltas:
+            return 0
+
+        sign = -1 if subtract else 1
+
+        # the deltas of every directory are carried up the ancestor chain, and summed per
+        # directory, so that each affected directory is updated exactly once.
+        sql_update_directories = """
+            with recursive deltas(id, byte_size, file_count) as (
+                select * from unnest(%s::bigint[], %s::bigint[], %s::bigint[])
+            ),
+            ancestors(id, byte_size, file_count) as (
+                select id, byte_size, file_count from deltas
+                union all
+                select d.parent_directory_id, a.byte_size, a.file_count
+                from ancestors a
+                join metax_api_directory d on d.id = a.id
+                where d.parent_directory_id is not null
+            )
+            update metax_api_directory as d set
+                byte_size = d.byte_size + totals.byte_size,
+                file_count = d.file_count + totals.file_count
+            from (
+                select id, sum(byte_size) as byte_size, sum(file_count) as file_count
+                from ancestors
+                group by id
+            ) as totals
+            where totals.id = d.id
+            """
+
+        with connection.cursor() as cursor:
+            cursor.execute(
+                sql_update_directories,
+                [
+                    list(deltas.keys()),
+                    [sign * delta[0] for delta in deltas.values()],
+                    [sign * delta[1] for delta in deltas.values()],
+                ],
             )
+            return cursor.rowcount
 
-        # build directory tree from annotated directories
-        directories_by_id = {d.id: d for d in project_directories}
-        for d in project_directories:
-            d.sub_dirs = []
-        for d in project_directories:
-            if d.parent_directory_id is not None:
-                directories_by_id[d.parent_directory_id].sub_dirs.append(d)
-        annotated_root_directory = directories_by_id.get(self.id)
-        return annotated_root_directory
-
-    def _calculate_byte_size_and_file_count(self, update_statements):
+    @staticmethod
+    def calculate_byte_sizes_and_file_counts_for_cr(cr_id):
         """
-        Recursively traverse the entire directory tree and update total byte size and file count
-        for each directory. Accumulates a list of triplets for a big sql-update statement.
-        """
-        old_byte_size = self.byte_size
-        old_file_count = self.file_count
-        self.byte_size = 0
-        self.file_count = 0
-
-        if self.sub_dirs:
-            for sub_dir in self.sub_dirs:
-                sub_dir._calculate_byte_size_and_file_count(update_statements)
-
-            # sub dir numbers
-            self.byte_size = sum(d.byte_size for d in self.sub_dirs)
-            self.file_count = sum(d.file_count for d in self.sub_dirs)
-
-        # note: never actually saved using .save()
-        self.byte_size += self.own_byte_size or 0
-        self.file_count += self.own_file_count or 0
+        Calculate total byte sizes and file counts of directories in the context of a specific
+        catalog record. The files of the catalog record are aggregated per parent directory, and
+        the directory trees of the projects of those files are retrieved, both in a single query,
+        after which the numbers are accumulated bottom-up in memory.
 
-        # add updated values if changed
-        if self.byte_size != old_byte_size or self.file_count != old_file_count:
-            update_statements.append("(%d, %d, %d)" % (self.byte_size, self.file_count, self.id))
-
-    def calculate_byte_size_and_file_count_for_cr(self, cr_id, directory_data):
-        """
-        Calculate total byte sizes and file counts for a directory tree in the context of
-        selected directories and a specific catalog record, and store total byte size and
-        file count for each directory into parameter directory_data. Intended to be called
-        for the top-level directories of a project in a dataset.
+        Returns a dict which looks like:
+        {
+            id1: [byte_size, file_count],
+            id2: [byte_size, file_count],
+            ...
+        }
+        Directories which do not contain any files of the catalog record are left out. When
+        browsing files for a given cr, total byte size and file count for a directory are
+        retrieved from this lookup table.
         """
-        _logger.debug(
-            "Calculating directory byte sizes and file counts for project %s, directory %s..."
-            % (self.project_identifier, self.directory_path)
-        )
-
         stats = (
             File.objects.filter(record__pk=cr_id)
-            .values_list("parent_directory_id")
+            .values_list("parent_directory_id", "project_identifier")
             .annotate(Sum("byte_size"), Count("id"))
+            .order_by()
         )
 
-        grouped_by_dir = {
-            parent_id: (byte_size, file_count) for parent_id, byte_size, file_count in stats
-        }
-
-        directory_tree = self._get_project_directory_tree()
-        directory_tree._calculate_byte_size_and_file_count_for_cr(
-            grouped_by_dir, directory_data
-        )
-
-    def _calculate_byte_size_and_file_count_for_cr(self, grouped_by_dir, directory_data):
-        """
-        Recursively traverse the sub dirs, and accumulate values from grouped_by_dir, and
-        store into the CatalogRecord _directory_data dict. Once finished, directory_data will look like:
-        {
-            'id1': [byte_size, file_count],
-            'id2': [byte_size, file_count],
-            ...
-        }
-        When browsing files for a given cr, total byte size and file count for a directory
-        are retrieved from this lookup table.
-        """
-        self.byte_size = 0
-        self.file_count = 0
+        grouped_by_dir = {}
+        project_identifiers = set()
+        for parent_id, project_identifier, byte_size, file_count in stats:
+            grouped_by_dir[parent_id] = (byte_size or 0, file_count)
+            project_identifiers.add(project_identifier)
 
-        if self.sub_dirs:
-            for sub_dir in self.sub_dirs:
-                sub_dir._calculate_byte_size_and_file_count_for_cr(grouped_by_dir, directory_data)
+        if not grouped_by_dir:
+            return {}
 
-            # sub dir numbers
-            self.byte_size = sum(d.byte_size for d in self.sub_dirs)
-            self.file_count = sum(d.file_count for d in self.sub_dirs)
+        _logger.debug(
+            "Calculating directory byte sizes and file counts for cr %d in projects %s..."
+            % (cr_id, ", ".join(sorted(project_identifiers)))
+        )
 
-        current_dir = grouped_by_dir.get(self.id, [0, 0])
+        parent_ids = dict(
+            Directory.objects.filter(project_identifier__in=project_identifiers).values_list(
+                "id", "parent_directory_id"
+            )
+        )
 
-        # note: never actually saved using .save()
-        self.byte_size += current_dir[0]
-        self.file_count += current_dir[1]
+        # carry the numbers of each directory up the ancestor chain
+        directory_data = {}
+        for dir_id, (byte_size, file_count) in grouped_by_dir.items():
+            while dir_id is not None:
+                numbers = directory_data.setdefault(dir_id, [0, 0])
+                numbers[0] += byte_size
+                numbers[1] += file_count
+                dir_id = parent_ids.get(dir_id)
 
-        # the accumulated numbers that exist in the directory for given cr
-        directory_data[self.id] = [self.byte_size, self.file_count]
+        return directory_data
 
     def __repr__(self):
         return (
@@ -0,0 +1,56 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+from django.db import models
+from django.db.models import Expression
+
+
+class DatabaseDefault(Expression):
+
+    """
+    Compiles to DEFAULT, leaving the value of a column to the database.
+    """
+
+    def as_sql(self, compiler, connection):
+        return "DEFAULT", []
+
+
+class GeneratedFieldMixin:
+
+    """
+    A read-only field of a stored generated column, whose value the database computes from
+    other columns of the same row. The generated column itself is created in a migration.
+
+    Inserts and updates always write DEFAULT into the column, so that the value can never
+    get out of sync with the columns it is computed from, regardless of how the row is saved.
+    The computed value is read back into the instance after inserts. After updates, the
+    instance has to be reloaded to see the new value.
+    """
+
+    db_returning = True
+
+    def __init__(self, *args, **kwargs):
+        kwargs["editable"] = False
+        kwargs["null"] = True
+        super().__init__(*args, **kwargs)
+
+    def deconstruct(self):
+        name, path, args, kwargs = super().deconstruct()
+        del kwargs["editable"]
+        del kwargs["null"]
+        return name, path, args, kwargs
+
+    def get_db_prep_save(self, value, connection):
+        return DatabaseDefault()
+
+
+class GeneratedBigIntegerField(GeneratedFieldMixin, models.BigIntegerField):
+    pass
+
+
+class GeneratedTextField(GeneratedFieldMixin, models.TextField):
+    pass
@@ -73,6 +73,13 @@ class File(Common):
             models.Index(fields=["identifier"]),
             models.Index(fields=["parent_directory"]),
             models.Index(fields=["project_identifier"]),
+            # for looking up files of directories by path prefix within a project, regardless of
+            # the collation of the database. see lookup path_startswith
+            models.Index(
+                fields=["project_identifier", "file_path"],
+                name="file_project_path_pattern_idx",
+                opclasses=["varchar_ops", "text_pattern_ops"],
+            ),
         ]
 
     objects = FileManager()
@@ -0,0 +1,43 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+from django.db import models
+from django.db.models import Lookup
+
+# matches strings starting with the given prefix, as the byte-wise range of strings between the
+# prefix itself, and the prefix with its last character incremented by one. unlike LIKE, the
+# range can be looked up from an index using text_pattern_ops also when the prefix is not a
+# constant, e.g. when it is a column of an outer query. characters % and _ are not special.
+SQL_STARTSWITH_RANGE = (
+    "({value} ~>=~ {prefix} "
+    "and {value} ~<~ (left({prefix}, -1) || chr(ascii(right({prefix}, 1)) + 1)))"
+)
+
+
+def get_startswith_range(prefix):
+    """
+    Return the range of strings starting with prefix, as a (from, to) tuple, for comparison using
+    the byte-wise operators ~>=~ and ~<~. Same as SQL_STARTSWITH_RANGE, for constant prefixes.
+    """
+    return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+
+@models.TextField.register_lookup
+class PathStartsWith(Lookup):
+
+    """
+    A startswith lookup for file and directory paths, which compares the path to a range of
+    strings instead of a LIKE pattern. See SQL_STARTSWITH_RANGE.
+    """
+
+    lookup_name = "path_startswith"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        sql = SQL_STARTSWITH_RANGE.format(value=lhs, prefix=rhs)
+        return sql, (lhs_params + rhs_params) * 2 + rhs_params
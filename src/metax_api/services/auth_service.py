@@ -7,6 +7,7 @@
 
 import json
 import logging
+import os
 
 from django.conf import settings
 from django.http import Http404
@@ -71,34 +72,82 @@ class AuthService:
 
         return user_projects
 
-    @staticmethod
-    def get_additional_user_projects_from_file(username):
+    # the parsed additional user projects file, and the stat of the file it was parsed from
+    _additional_projects_cache = (None, {})
+
+    @classmethod
+    def get_additional_user_projects_from_file(cls, username):
         """
         Check if user has additional projects in a specific file on disk and return them.
         On local file values must be a list of strings.
+
+        The file is parsed only when it has changed since it was last read, and the returned
+        frozenset of projects is shared between calls.
         """
-        user_projects = set()
-        additional_projects = None
+        additional_projects = cls._get_additional_projects()
+
+        user_projects = additional_projects.get(username, None)
 
+        if user_projects is None:
+            _logger.info("No projects for user '%s' on local file" % username)
+            return frozenset()
+        elif user_projects is False:
+            _logger.error("Projects on file are not list of strings")
+            return frozenset()
+
+        return user_projects
+
+    @classmethod
+    def _get_additional_projects(cls):
+        """
+        Return a dict of { username: frozenset of projects } from the additional user projects
+        file. Users whose projects on file are not a list of strings are mapped to False.
+        """
         try:
-            with open(settings.ADDITIONAL_USER_PROJECTS_PATH, "r") as file:
-                additional_projects = json.load(file)
+            stat = os.stat(settings.ADDITIONAL_USER_PROJECTS_PATH)
         except FileNotFoundError:  # noqa
             _logger.info("No local file for user projects")
+            return {}
         except Exception as e:
             _logger.error(e)
+            return {}
 
-        if additional_projects:
-            if not additional_projects.get(username, False):
-                _logger.info("No projects for user '%s' on local file" % username)
-            elif not isinstance(additional_projects[username], list) or not isinstance(
-                additional_projects[username][0], str
-            ):
-                _logger.error("Projects on file are not list of strings")
-            else:
-                user_projects.update(p for p in additional_projects[username])
+        file_signature = (
+            settings.ADDITIONAL_USER_PROJECTS_PATH,
+            stat.st_ino,
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+        cached_signature, cached_projects = cls._additional_projects_cache
 
-        return user_projects
+        if file_signature == cached_signature:
+            return cached_projects
+
+        additional_projects = {}
+
+        try:
+            with open(settings.ADDITIONAL_USER_PROJECTS_PATH, "r") as file:
+                file_contents = json.load(file)
+        except FileNotFoundError:  # noqa
+            _logger.info("No local file for user projects")
+            return {}
+        except Exception as e:
+            _logger.error(e)
+        else:
+            if isinstance(file_contents, dict):
+                for username, projects in file_contents.items():
+                    if not projects:
+                        continue
+                    elif not isinstance(projects, list) or not isinstance(projects[0], str):
+                        additional_projects[username] = False
+                    else:
+                        additional_projects[username] = frozenset(projects)
+            elif file_contents:
+                _logger.error("Additional user projects file does not contain an object")
+
+        cls._additional_projects_cache = (file_signature, additional_projects)
+
+        return additional_projects
 
     @classmethod
     def check_user_groups_against_groups(cls, request, group_list):
@@ -534,8 +534,7 @@ class CatalogRecordService(CommonService, ReferenceDataMixin):
         if request and request.user.is_metax_v3:
             return # Accept all reference data values from Metax V3
 
-        reference_data = cls.get_reference_data(cache)
-        # ic(reference_data)
+        reference_data = cls.get_reference_data_index(cache)
         refdata = reference_data["reference_data"]
         orgdata = reference_data["organization_data"]["organization"]
         errors = defaultdict(list)
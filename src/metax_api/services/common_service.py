@@ -6,11 +6,16 @@
 # :license: MIT
 
 import logging
+from copy import deepcopy
 from json import load as json_load
+from os import path
 from typing import List
+from urllib.parse import urljoin
 
 from django.db.models import Q
 from django.utils import timezone
+from jsonschema import FormatChecker, RefResolver
+from jsonschema.validators import validator_for
 from rest_framework import status
 from rest_framework.request import Request
 from rest_framework.serializers import ValidationError
@@ -24,6 +29,15 @@ from metax_api.utils import (
 
 _logger = logging.getLogger(__name__)
 
+# json schemas are read from disk and compiled into validators once per process. the cached
+# schemas are shared between requests, so they must never be modified.
+_json_schemas = {}
+
+# id(schema) -> (schema, path of the schema file), for every cached or derived schema
+_json_schema_files = {}
+
+_json_schema_validators = {}
+
 
 class CommonService:
     @staticmethod
@@ -218,7 +232,26 @@ class CommonService:
         It can be given due to different api versions have different schema paths.
         For datasets, a data catalog prefix can be given, in which case it will
         be the prefix for the schema file name.
+
+        Each schema is read only once per process. The returned schema is shared,
+        and must not be modified.
         """
+        key = (path.abspath(schema_folder_path), model_name, data_catalog_prefix or None)
+
+        if key not in _json_schemas:
+            schema_file_path, schema = CommonService._load_json_schema(*key)
+
+            # different parameters may end up with the same file, e.g. the default dataset schema
+            if schema_file_path not in _json_schemas:
+                CommonService._register_json_schema(schema, schema_file_path)
+                _json_schemas[schema_file_path] = schema
+
+            _json_schemas[key] = _json_schemas[schema_file_path]
+
+        return _json_schemas[key]
+
+    @staticmethod
+    def _load_json_schema(schema_folder_path, model_name, data_catalog_prefix):
         schema_name = ""
 
         if model_name == "dataset":
@@ -231,16 +264,79 @@ class CommonService:
 
         schema_name += "%s_schema.json" % model_name
 
+        schema_file_path = "%s/%s" % (schema_folder_path, schema_name)
+
         try:
-            with open("%s/%s" % (schema_folder_path, schema_name), encoding="utf-8") as f:
-                return json_load(f)
+            with open(schema_file_path, encoding="utf-8") as f:
+                return schema_file_path, json_load(f)
         except IOError as e:
             if model_name != "dataset":
                 # only datasets have a default schema
                 raise
             _logger.warning(e)
-            with open("%s/ida_dataset_schema.json" % schema_folder_path, encoding="utf-8") as f:
-                return json_load(f)
+            schema_file_path = "%s/ida_dataset_schema.json" % schema_folder_path
+            with open(schema_file_path, encoding="utf-8") as f:
+                return schema_file_path, json_load(f)
+
+    @staticmethod
+    def _register_json_schema(schema, schema_file_path):
+        validator_for(schema).check_schema(schema)
+        _json_schema_files[id(schema)] = (schema, schema_file_path)
+
+    @staticmethod
+    def get_derived_json_schema(schema, name, derive):
+        """
+        Get a modified version of a schema returned by get_json_schema(). derive is called
+        with a copy of the schema only when the derived schema named name is first requested,
+        and the result is cached like the original schema.
+        """
+        schema_file_path = _json_schema_files[id(schema)][1]
+        key = (schema_file_path, name)
+
+        if key not in _json_schemas:
+            derived_schema = derive(deepcopy(schema))
+            CommonService._register_json_schema(derived_schema, schema_file_path)
+            _json_schemas[key] = derived_schema
+
+        return _json_schemas[key]
+
+    @staticmethod
+    def get_json_schema_validator(schema, format_checker=True):
+        """
+        Get a validator for a schema returned by get_json_schema() or get_derived_json_schema().
+        The validator is compiled only once per schema, and resolves references to other schema
+        files relative to the schema's own file.
+
+        Other schemas get a new validator on every call.
+        """
+        key = (id(schema), format_checker)
+
+        if key in _json_schema_validators:
+            return _json_schema_validators[key]
+
+        cached_schema, schema_file_path = _json_schema_files.get(id(schema), (None, None))
+
+        validator_class = validator_for(schema)
+
+        if schema_file_path:
+            # the schema's own id, if any, is resolved relative to the file as well
+            base_uri = "file:%s" % schema_file_path
+            resolver = RefResolver(
+                base_uri=base_uri,
+                referrer=schema,
+                store={urljoin(base_uri, validator_class.ID_OF(schema)): schema},
+            )
+        else:
+            resolver = RefResolver.from_schema(schema, id_of=validator_class.ID_OF)
+
+        validator = validator_class(
+            schema, resolver=resolver, format_checker=FormatChecker() if format_checker else None
+        )
+
+        if cached_schema is schema:
+            _json_schema_validators[key] = validator
+
+        return validator
 
     @classmethod
     def update_bulk(cls, request, model_obj, serializer_class, post_update_callback=None, **kwargs):
@@ -30,7 +30,7 @@ class DataCatalogService(ReferenceDataMixin):
         - label (usually to object's field 'pref_label')
         """
 
-        reference_data = cls.get_reference_data(cache)
+        reference_data = cls.get_reference_data_index(cache)
 
         refdata = reference_data["reference_data"]
         # ic(refdata.keys())
@@ -8,7 +8,6 @@ import logging
 import re
 from os.path import dirname, join
 
-import jsonschema
 import requests
 from datacite import DataCiteMDSClient, schema41 as datacite_schema41
 from django.conf import settings as django_settings
@@ -318,13 +317,10 @@ class _DataciteService(CommonService):
 
         if is_strict:
             try:
-                jsonschema.validate(
-                    datacite_json,
-                    self.get_json_schema(
-                        join(dirname(dirname(__file__)), "api/rest/base/schemas"),
-                        "datacite_4.1",
-                    ),
+                schema = self.get_json_schema(
+                    join(dirname(dirname(__file__)), "api/rest/base/schemas"), "datacite_4.1"
                 )
+                self.get_json_schema_validator(schema, format_checker=False).validate(datacite_json)
             except Exception as e:
                 _logger.error("Failed to validate catalog record against datacite schema")
                 raise DataciteException(e)
@@ -14,8 +14,8 @@ from uuid import NAMESPACE_DNS as UUID_NAMESPACE_DNS, uuid3
 
 from django.conf import settings
 from django.db import connection
-from django.db.models import Value, CharField, OuterRef, Exists
-from django.db.models.functions import Concat
+from django.db.models import Value, CharField, Count, OuterRef, Exists
+from django.db.models.functions import Concat, Length, Replace
 from django.http import Http404
 from rest_framework import status
 from rest_framework.response import Response
@@ -25,7 +25,7 @@ from metax_api.exceptions import Http400, Http403, Http503
 from metax_api.models import CatalogRecord, Directory, File, FileStorage
 from metax_api.services import AuthService
 from metax_api.services.pagination import DirectoryPagination
-from metax_api.utils.utils import DelayedLog, get_tz_aware_now_without_micros
+from metax_api.utils.utils import DelayedLog, datetime_to_str, get_tz_aware_now_without_micros
 
 from .callable_service import CallableService
 from .common_service import CommonService
@@ -59,10 +59,6 @@ def FileSerializer(*args, **kwargs):
     return FileSerializer(*args, **kwargs)
 
 
-class MaxRecursionDepthExceeded(Exception):
-    pass
-
-
 class FileService(CommonService, ReferenceDataMixin):
 
     dp = DirectoryPagination()
@@ -259,7 +255,8 @@ class FileService(CommonService, ReferenceDataMixin):
             from (values
                 %s
             ) as results(id, service_modified, parent_directory_id)
-            where results.id = file.id;
+            where results.id = file.id
+            returning file.parent_directory_id, file.byte_size;
             """ % ",".join(
             update_statements
         )
@@ -270,11 +267,10 @@ class FileService(CommonService, ReferenceDataMixin):
                 [request.user.username for i in range(len(file_details_list))],
             )
             affected_rows = cr.rowcount
+            Directory.add_to_byte_sizes_and_file_counts(cr.fetchall())
 
         _logger.info("Restored %d files in project %s" % (affected_rows, project_identifier))
 
-        cls.calculate_project_directory_byte_sizes_and_file_counts(project_identifier)
-
         return Response({"restored_files_count": affected_rows}, status=status.HTTP_200_OK)
 
     @classmethod
@@ -315,9 +311,7 @@ class FileService(CommonService, ReferenceDataMixin):
             """
 
         if get_pids:
-            noparams = noparams.replace(
-                "cr.identifier", "research_dataset->>'preferred_identifier'"
-            )
+            noparams = noparams.replace("cr.identifier", "cr.rd_preferred_identifier")
 
         files = """
             SELECT f.identifier, json_agg(cr.identifier)
@@ -389,7 +383,6 @@ class FileService(CommonService, ReferenceDataMixin):
 
         deleted_files_count, project_identifier = cls._mark_files_as_deleted([file.id])
         cls._delete_empy_dir_chain_above(file.parent_directory)
-        cls.calculate_project_directory_byte_sizes_and_file_counts(file.project_identifier)
         cls._mark_datasets_as_deprecated([file.id])
 
         CallableService.add_post_request_callable(
@@ -433,7 +426,6 @@ class FileService(CommonService, ReferenceDataMixin):
         deleted_files_count, project_identifier = cls._mark_files_as_deleted(file_ids)
 
         cls._find_and_delete_empty_directories(project_identifier)
-        cls.calculate_project_directory_byte_sizes_and_file_counts(project_identifier)
         cls._mark_datasets_as_deprecated(file_ids)
 
         file = File.objects_unfiltered.get(pk=file_ids[0])
@@ -475,7 +467,6 @@ class FileService(CommonService, ReferenceDataMixin):
         if file_ids:
             deleted_files_count = cls._mark_files_as_deleted(file_ids)[0]
             cls._find_and_delete_empty_directories(project_id)
-            cls.calculate_project_directory_byte_sizes_and_file_counts(project_id)
             cls._mark_datasets_as_deprecated(file_ids)
         else:
             _logger.info("Project %s contained no files" % project_id)
@@ -489,7 +480,8 @@ class FileService(CommonService, ReferenceDataMixin):
     @staticmethod
     def _mark_files_as_deleted(file_ids):
         """
-        Mark files designated by file_ids as deleted.
+        Mark files designated by file_ids as deleted, and subtract them from the byte sizes and
+        file counts of their directories.
         """
         _logger.info("Marking files as removed...")
 
@@ -500,7 +492,8 @@ class FileService(CommonService, ReferenceDataMixin):
                 date_modified = CURRENT_TIMESTAMP,
                 date_removed = CURRENT_TIMESTAMP
             where active = true and removed = false
-            and id in %s"""
+            and id in %s
+            returning parent_directory_id, byte_size"""
 
         sql_select_related_projects = (
             "select distinct(project_identifier) from metax_api_file where id in %s"
@@ -522,112 +515,199 @@ class FileService(CommonService, ReferenceDataMixin):
 
             cr.execute(sql_delete_files, [tuple(file_ids)])
             deleted_files_count = cr.rowcount
+            Directory.add_to_byte_sizes_and_file_counts(cr.fetchall(), subtract=True)
 
         return deleted_files_count, project_identifier
 
     @classmethod
     def _find_and_delete_empty_directories(cls, project_identifier):
         """
-        Find and delete, if feasible, all empty directories in a project. The only dir
-        found in the project without a parent dir, is considered to be the root.
+        Find and delete all empty directories in a project, i.e. directories which do not
+        contain any non-removed files anywhere in their subtree.
+
+        Directories that do contain files are found by walking up the tree from the parent
+        directories of the files, so the entire project is handled in a single query.
         """
         _logger.info("Finding and deleting empty directory chains...")
 
-        root_dir = Directory.objects.filter(
-            project_identifier=project_identifier, parent_directory_id=None
-        )
-
-        if root_dir.count() > 1:  # pragma: no cover
-            raise ValidationError(
-                {
-                    "detail": [
-                        "found more than one root dir (directories without parents: %s. unable to proceed"
-                        % ", ".join(dr.directory_path for dr in root_dir)
-                    ]
-                }
+        sql_select_empty_directories = """
+            with recursive non_empty_directories(id) as (
+                select distinct parent_directory_id
+                from metax_api_file
+                where project_identifier = %s
+                and parent_directory_id is not null
+                and active = true and removed = false
+                union
+                select d.parent_directory_id
+                from non_empty_directories ne
+                join metax_api_directory d on d.id = ne.id
+                where d.parent_directory_id is not null
             )
+            select id
+            from metax_api_directory
+            where project_identifier = %s
+            and id not in (select id from non_empty_directories)
+            """
+
+        with connection.cursor() as cr:
+            cr.execute(sql_select_empty_directories, [project_identifier, project_identifier])
+            empty_directory_ids = [row[0] for row in cr.fetchall()]
 
-        cls._delete_empty_directories(root_dir[0])
+        cls._delete_directories(empty_directory_ids)
 
     @classmethod
     def _delete_empy_dir_chain_above(cls, directory):
         """
         When deleting a single file, find out if directories above are empty, and delete them.
+
+        The chain of directories is retrieved in a single query, with information whether each
+        directory contains files, and how many sub directories it has. Starting from the bottom,
+        a directory is empty if it contains no files, and its only sub directory (if any) is
+        the directory below it, which was found empty.
         """
         if not directory:
             return
-        elif directory.files.exists():
-            return
-        elif directory.child_directories.exists():
-            return
-        parent_directory = directory.parent_directory
-        directory.delete()
-        if parent_directory:
-            cls._delete_empy_dir_chain_above(parent_directory)
 
-    @classmethod
-    def _delete_empty_directories(cls, dr):
-        """
-        Find and delete any empty sub directories, and the directory itself. If any of the
-        sub directories contained any files, directory is not deleted. This method is
-        intended to be called recursively.
+        sql_select_directory_chain = """
+            with recursive directory_chain(id, parent_directory_id, depth) as (
+                select id, parent_directory_id, 0
+                from metax_api_directory
+                where id = %s
+                union all
+                select d.id, d.parent_directory_id, dc.depth + 1
+                from directory_chain dc
+                join metax_api_directory d on d.id = dc.parent_directory_id
+            )
+            select
+                dc.id,
+                exists(
+                    select 1 from metax_api_file f
+                    where f.parent_directory_id = dc.id
+                    and f.active = true and f.removed = false
+                ) as has_files,
+                (
+                    select count(*) from metax_api_directory d
+                    where d.parent_directory_id = dc.id
+                    and d.active = true and d.removed = false
+                ) as sub_directory_count
+            from directory_chain dc
+            order by dc.depth
+            """
 
-        Returns True if the given directory, and its subdirs were deleted, and False,
-        if the directory or any of its sub directories contained files, preventing
-        deleting the directory.
-        """
-        sub_dirs_can_be_deleted = False
-        sub_dirs_are_empty = []
+        with connection.cursor() as cr:
+            cr.execute(sql_select_directory_chain, [directory.id])
+            directory_chain = cr.fetchall()
 
-        sub_dirs = dr.child_directories.all()
+        empty_directory_ids = []
+        for directory_id, has_files, sub_directory_count in directory_chain:
+            # the only sub directory allowed is the empty directory below, if any
+            if has_files or sub_directory_count > (1 if empty_directory_ids else 0):
+                break
+            empty_directory_ids.append(directory_id)
 
-        if sub_dirs.exists():
-            # start deleting directories from the bottom to up
-            for sub_dr in sub_dirs:
-                sub_dirs_are_empty.append(cls._delete_empty_directories(sub_dr))
+        cls._delete_directories(empty_directory_ids)
 
-            if all(sub_dirs_are_empty):
-                # if even one sub dir needs to be preserved, the current directory must be preserved.
-                sub_dirs_can_be_deleted = True
-        else:
-            sub_dirs_can_be_deleted = True
+    @staticmethod
+    def _delete_directories(directory_ids):
+        """
+        Delete directories designated by directory_ids in bulk. Like when deleting directories
+        one by one, removed files left in the directories get parent_directory=None. Sub
+        directories of empty directories are always empty as well, and are expected to be
+        included in directory_ids.
+        """
+        if not directory_ids:
+            return
 
-        if dr.files.exists():
-            return False
-        elif sub_dirs_can_be_deleted:
-            dr.delete()
-            return True
-        else:
-            return False
+        _logger.info("Deleting %d empty directories..." % len(directory_ids))
+
+        with connection.cursor() as cr:
+            cr.execute(
+                "update metax_api_file set parent_directory_id = null "
+                "where parent_directory_id = any(%s)",
+                [directory_ids],
+            )
+            cr.execute("delete from metax_api_directory where id = any(%s)", [directory_ids])
 
     @staticmethod
     def _mark_datasets_as_deprecated(file_ids):
         """
         Get all CatalogRecords which have files set to them from file_ids,
         and set their deprecated flag to True. Then, publish update-messages to rabbitmq.
+
+        The records are deprecated in a single update. Only datasets whose access is managed
+        in REMS are deprecated one by one, since their REMS entities need to be closed.
         """
         _logger.info("Marking related datasets as deprecated...")
-        deprecated_records = []
+
+        from metax_api.api.rest.base.serializers import CatalogRecordSerializer
+        from metax_api.models.catalog_record import ACCESS_TYPES, RabbitMQPublishRecord
 
         current_time = get_tz_aware_now_without_micros()
 
-        records = (
-            CatalogRecord.objects.filter(files__in=file_ids, deprecated=False)
-            .exclude(data_catalog__catalog_json__identifier=settings.PAS_DATA_CATALOG_IDENTIFIER)
-            .distinct("id")
+        records = CatalogRecord.objects.filter(files__in=file_ids, deprecated=False).exclude(
+            data_catalog__catalog_json__identifier=settings.PAS_DATA_CATALOG_IDENTIFIER
         )
 
-        for cr in records:
-            cr.deprecate(current_time)
-            deprecated_records.append(cr)
-        if not deprecated_records:
+        deprecated_ids = []
+
+        if settings.REMS["ENABLED"]:
+            rems_records = records.filter(
+                data_catalog__catalog_json__identifier=settings.IDA_DATA_CATALOG_IDENTIFIER,
+                rd_access_type=ACCESS_TYPES["permit"],
+            ).distinct("id")
+
+            for cr in rems_records:
+                cr.deprecate(current_time)
+                deprecated_ids.append(cr.id)
+
+        record_ids = list(records.values_list("id", flat=True).distinct())
+
+        if record_ids:
+            sql_deprecate_records = """
+                update metax_api_catalogrecord set
+                    deprecated = true,
+                    date_deprecated = %s,
+                    date_modified = %s
+                where id = any(%s)
+                and deprecated = false
+                returning id, identifier
+                """
+
+            with connection.cursor() as cr:
+                cr.execute(sql_deprecate_records, [current_time, current_time, record_ids])
+                deprecated_records = cr.fetchall()
+
+            for cr_id, cr_identifier in deprecated_records:
+                deprecated_ids.append(cr_id)
+                CallableService.add_post_request_callable(
+                    DelayedLog(
+                        event="dataset_deprecated",
+                        catalogrecord={
+                            "identifier": cr_identifier,
+                            "date_deprecated": datetime_to_str(current_time),
+                        },
+                    )
+                )
+
+        if not deprecated_ids:
             _logger.info("Files were not associated with any datasets.")
             return
 
-        from metax_api.models.catalog_record import RabbitMQPublishRecord
+        _logger.info("Marked %d datasets as deprecated" % len(deprecated_ids))
 
-        for cr in deprecated_records:
-            cr.add_post_request_callable(RabbitMQPublishRecord(cr, "update"))
+        # drafts are not published to rabbitmq. the published records are retrieved in a
+        # single query, including the relations which are needed to serialize them, and
+        # serialized together.
+        published_records = list(
+            CatalogRecord.objects.filter(id__in=deprecated_ids, state=CatalogRecord.STATE_PUBLISHED)
+            .select_related("data_catalog", "contract", "preservation_dataset_origin_version")
+            .annotate(Count("dataset_version_set__records"))
+        )
+
+        serialized_records = CatalogRecordSerializer(published_records, many=True).data
+
+        for cr, cr_json in zip(published_records, serialized_records):
+            cr.add_post_request_callable(RabbitMQPublishRecord(cr, "update", cr_json=cr_json))
 
     @classmethod
     def get_directory_contents(
@@ -909,7 +989,6 @@ class FileService(CommonService, ReferenceDataMixin):
         request=None,
         recursive=False,
         max_depth=1,
-        depth=0,
         dirs_only=False,
         cr_id=None,
         not_cr_id=None,
@@ -936,31 +1015,34 @@ class FileService(CommonService, ReferenceDataMixin):
         for directories and files respectively.
         """
 
-        if recursive and max_depth != "*":
-            if depth > max_depth:
-                raise MaxRecursionDepthExceeded("max depth is %d" % max_depth)
-            depth += 1
+        if recursive:
+            return cls._get_directory_tree_contents(
+                directory_id,
+                max_depth=max_depth,
+                dirs_only=dirs_only,
+                cr_id=cr_id,
+                not_cr_id=not_cr_id,
+                directory_fields=directory_fields,
+                file_fields=file_fields,
+                file_name=file_name,
+                directory_name=directory_name,
+                file_ordering=file_ordering,
+                directory_ordering=directory_ordering,
+            )
 
         if cr_id or not_cr_id:
-            try:
-                dirs, files = cls._get_directory_contents_for_catalog_record(
-                    directory_id,
-                    cr_id,
-                    not_cr_id,
-                    file_name=file_name,
-                    directory_name=directory_name,
-                    recursive=recursive,
-                    dirs_only=dirs_only,
-                    directory_fields=directory_fields,
-                    file_fields=file_fields,
-                    file_ordering=file_ordering,
-                    directory_ordering=directory_ordering,
-                )
-
-            except Http404:
-                if recursive:
-                    return {"directories": []}
-                raise
+            dirs, files = cls._get_directory_contents_for_catalog_record(
+                directory_id,
+                cr_id,
+                not_cr_id,
+                file_name=file_name,
+                directory_name=directory_name,
+                dirs_only=dirs_only,
+                directory_fields=directory_fields,
+                file_fields=file_fields,
+                file_ordering=file_ordering,
+                directory_ordering=directory_ordering,
+            )
         else:
             # browsing from ALL files, not cr specific
             dirs = (
@@ -985,7 +1067,7 @@ class FileService(CommonService, ReferenceDataMixin):
                 if file_name:
                     files = files.filter(file_name__icontains=file_name)
 
-        if paginate and not recursive:
+        if paginate:
             dirs, files = cls.dp.paginate_directory_data(dirs, files, request)
 
         from metax_api.api.rest.base.serializers import LightDirectorySerializer
@@ -999,36 +1081,166 @@ class FileService(CommonService, ReferenceDataMixin):
 
             contents["files"] = LightFileSerializer.serialize(files)
 
-        if recursive:
-            for directory in contents["directories"]:
-                try:
-                    sub_dir_contents = cls._get_directory_contents(
-                        directory["id"],
-                        recursive=recursive,
-                        max_depth=max_depth,
-                        depth=depth,
-                        dirs_only=dirs_only,
-                        cr_id=cr_id,
-                        not_cr_id=not_cr_id,
-                        directory_fields=directory_fields,
-                        file_fields=file_fields,
-                        file_name=file_name,
-                        directory_name=directory_name,
-                        paginate=paginate,
-                        request=request,
-                        file_ordering=file_ordering,
-                        directory_ordering=directory_ordering,
-                    )
-                except MaxRecursionDepthExceeded:
+        return contents
+
+    @classmethod
+    def _get_directory_tree_contents(
+        cls,
+        directory_id,
+        max_depth=1,
+        dirs_only=False,
+        cr_id=None,
+        not_cr_id=None,
+        directory_fields=[],
+        file_fields=[],
+        file_name=None,
+        directory_name=None,
+        file_ordering=["file_path"],
+        directory_ordering=["directory_path"],
+    ):
+        """
+        Recursive variant of _get_directory_contents.
+
+        Instead of querying the contents of each subdirectory separately, all directories of the
+        tree are retrieved with one query by their path prefix, and the files of the directories
+        with one more query. The nested directory structure is then assembled in memory.
+
+        Directories at most max_depth levels below the directory are expanded: their subdirectories
+        are listed in key 'directories', and their files are included in the flat list of files,
+        in the same depth-first order as when browsing the tree one directory at a time.
+        """
+        from metax_api.api.rest.base.serializers import (
+            LightDirectorySerializer,
+            LightFileSerializer,
+        )
+
+        root = Directory.objects.values("directory_path", "project_identifier").get(id=directory_id)
+        cr = cr_id or not_cr_id
+
+        if cr and not dirs_only:
+            # only the file list is of interest. every directory is traversed, whether the
+            # directory name matches or not, and whether it has files in the record or not
+            fields = ["id"]
+            directory_name = None
+        elif cr:
+            from metax_api.api.rest.base.serializers import DirectorySerializer
+
+            allowed_fields = set(DirectorySerializer.Meta.fields)
+            fields = [
+                field
+                for field in directory_fields
+                if field in allowed_fields
+                or (
+                    field.startswith("parent_directory__")
+                    and field.split("parent_directory__")[1] in allowed_fields
+                )
+            ]
+        else:
+            fields = list(directory_fields)
+
+        # values required for assembling the tree, removed from results if not requested
+        tree_fields = [f for f in ("id", "directory_path") if f not in fields]
+
+        dirs = Directory.objects.filter(project_identifier=root["project_identifier"]).exclude(
+            id=directory_id
+        )
+        if root["directory_path"] != "/":
+            dirs = dirs.filter(directory_path__startswith="%s/" % root["directory_path"])
+
+        if max_depth != "*":
+            # directories one level below the deepest expanded directories are listed too.
+            # the depth of a path is its number of slashes, except for the root "/"
+            root_depth = 0 if root["directory_path"] == "/" else root["directory_path"].count("/")
+            dirs = dirs.annotate(
+                path_depth=Length("directory_path")
+                - Length(Replace("directory_path", Value("/"), Value("")))
+            ).filter(path_depth__lte=root_depth + max_depth + 1)
+
+        if directory_name:
+            # a directory whose name does not match is omitted together with its subdirectories.
+            # subdirectories of omitted directories are left out when assembling the tree
+            dirs = dirs.filter(directory_name__icontains=directory_name)
+
+        dirs = dirs.order_by(*directory_ordering).values(
+            "parent_directory_id", *fields, *tree_fields
+        )
+
+        dir_rows = list(dirs)
+        tree_values = []
+        for row in dir_rows:
+            values = {f: row[f] for f in ("parent_directory_id", "id", "directory_path")}
+            for f in ["parent_directory_id"] + tree_fields:
+                del row[f]
+            tree_values.append(values)
+
+        sub_dirs = defaultdict(list)
+        for values, directory in zip(tree_values, LightDirectorySerializer.serialize(dir_rows)):
+            sub_dirs[values["parent_directory_id"]].append(
+                (values["id"], values["directory_path"], directory)
+            )
+
+        if cr and dirs_only:
+            # list only directories which contain files of the record somewhere below them
+            dirs_with_files = cls._get_paths_of_directories_with_files_in_cr(
+                root, cr, exclude=bool(not_cr_id)
+            )
+        else:
+            dirs_with_files = None
+
+        expanded_dir_ids = [directory_id]
+
+        def _assemble(parent_directory_id, level):
+            directories = []
+            for dir_id, dir_path, directory in sub_dirs.get(parent_directory_id, []):
+                if dirs_with_files is not None and dir_path not in dirs_with_files:
                     continue
+                directories.append(directory)
+                if max_depth == "*" or level < max_depth:
+                    expanded_dir_ids.append(dir_id)
+                    directory["directories"] = _assemble(dir_id, level + 1)
+            return directories
 
-                directory["directories"] = sub_dir_contents["directories"]
+        contents = {"directories": _assemble(directory_id, 0)}
 
-                if "files" in sub_dir_contents:
-                    contents["files"] += sub_dir_contents["files"]
+        if dirs_only:
+            return contents
 
+        files = File.objects.filter(parent_directory_id__in=expanded_dir_ids)
+        if cr_id:
+            files = files.filter(record__pk=cr_id)
+        elif not_cr_id:
+            files = files.exclude(record__pk=not_cr_id)
+        if file_name:
+            files = files.filter(file_name__icontains=file_name)
+
+        dir_files = defaultdict(list)
+        for row in files.order_by(*file_ordering).values("parent_directory_id", *file_fields):
+            dir_files[row.pop("parent_directory_id")].append(row)
+
+        contents["files"] = LightFileSerializer.serialize(
+            [row for dir_id in expanded_dir_ids for row in dir_files.get(dir_id, [])]
+        )
         return contents
 
+    @staticmethod
+    def _get_paths_of_directories_with_files_in_cr(root, cr_id, exclude=False):
+        """
+        Return paths of all directories below root, which contain files that belong to the
+        given record somewhere in their subtree. If exclude is True, look for files that do not
+        belong to the record instead.
+        """
+        files = File.objects.filter(project_identifier=root["project_identifier"])
+        if root["directory_path"] != "/":
+            files = files.filter(file_path__startswith="%s/" % root["directory_path"])
+        files = files.exclude(record=cr_id) if exclude else files.filter(record=cr_id)
+
+        paths = set()
+        for path in files.values_list("parent_directory__directory_path", flat=True).distinct():
+            while path not in paths and path not in ("/", root["directory_path"]):
+                paths.add(path)
+                path = dirname(path)
+        return paths
+
     @classmethod
     def _get_directory_contents_for_catalog_record(
         cls,
@@ -1037,7 +1249,6 @@ class FileService(CommonService, ReferenceDataMixin):
         not_cr_id,
         file_name,
         directory_name,
-        recursive,
         dirs_only=False,
         directory_fields=[],
         file_fields=[],
@@ -1059,9 +1270,6 @@ class FileService(CommonService, ReferenceDataMixin):
             cr = cr_id or not_cr_id
             exclude = bool(not_cr_id)
 
-            if recursive and not dirs_only:
-                return Directory.objects.filter(parent_directory_id=directory_id).values("id")
-
             from metax_api.api.rest.base.serializers import DirectorySerializer
 
             allowed_fields = set(DirectorySerializer.Meta.fields)
@@ -1088,7 +1296,7 @@ class FileService(CommonService, ReferenceDataMixin):
             dirs = child_dirs.filter(
                 Exists(
                     files.filter(
-                        file_path__startswith=Concat(
+                        file_path__path_startswith=Concat(
                             OuterRef("directory_path"), Value("/"), output_field=CharField()
                         ),
                     )
@@ -1221,8 +1429,8 @@ class FileService(CommonService, ReferenceDataMixin):
             **kwargs,
         )
 
-        cls.calculate_project_directory_byte_sizes_and_file_counts(
-            initial_data["project_identifier"]
+        Directory.add_to_byte_sizes_and_file_counts(
+            [(res[0]["parent_directory"]["id"], res[0].get("byte_size"))]
         )
 
         CallableService.add_post_request_callable(
@@ -1283,12 +1491,12 @@ class FileService(CommonService, ReferenceDataMixin):
 
         _logger.info("Creating files...")
 
-        cls._create_files(common_info, file_list_with_dirs, results, serializer_class, **kwargs)
-
-        cls.calculate_project_directory_byte_sizes_and_file_counts(
-            initial_data_list[0]["project_identifier"]
+        created_files = cls._create_files(
+            common_info, file_list_with_dirs, results, serializer_class, **kwargs
         )
 
+        Directory.add_to_byte_sizes_and_file_counts(created_files)
+
         CallableService.add_post_request_callable(
             DelayedLog(
                 event="files_created",
@@ -1303,19 +1511,48 @@ class FileService(CommonService, ReferenceDataMixin):
 
         _logger.info("Created %d new files" % len(results.get("success", [])))
 
+    @staticmethod
+    def _get_existing_file_paths(project_identifier, file_paths, chunk_size=1000):
+        """
+        Return those of the given file_paths that already exist in the project. Only the received
+        paths are looked up, chunk_size paths at a time, so that the memory used depends on the
+        size of the request instead of the number of files in the project.
+        """
+        sql_select_existing_file_paths = """
+            select file_path
+            from metax_api_file
+            where project_identifier = %s
+            and file_path = any(%s)
+            and active = true
+            and removed = false
+        """
+
+        existing_file_paths = set()
+        with connection.cursor() as cr:
+            for i in range(0, len(file_paths), chunk_size):
+                cr.execute(
+                    sql_select_existing_file_paths,
+                    [project_identifier, file_paths[i : i + chunk_size]],
+                )
+                existing_file_paths.update(row[0] for row in cr.fetchall())
+
+        return existing_file_paths
+
     @classmethod
     def _create_files(cls, common_info, initial_data_list, results, serializer_class, **kwargs):
         """
         The actual part where the list is iterated and objects validated, and created.
+
+        Returns (parent_directory_id, byte_size) pairs of the created files.
         """
         project_identifier = initial_data_list[0]["project_identifier"]
 
-        # pre-fetch all file_paths in the project, to spare an individual db fetch for each file
-        # in serializer.save(), where they otherwise would check for path presence.
-        project_file_paths = File.objects.filter(project_identifier=project_identifier).values_list(
-            "file_path", flat=True
+        # pre-fetch those received file_paths that already exist in the project, to spare an
+        # individual db fetch for each file in serializer.is_valid(), where they otherwise would
+        # check for path presence.
+        existing_file_paths = cls._get_existing_file_paths(
+            project_identifier, [f["file_path"] for f in initial_data_list]
         )
-        project_file_paths = set(project_file_paths)
 
         project_dir_paths = set(dirname(f["file_path"]) for f in initial_data_list)
 
@@ -1328,6 +1565,7 @@ class FileService(CommonService, ReferenceDataMixin):
         file_storage_id = None
         file_storage_identifier = None
         entries = []
+        created_files = []
 
         def to_model_format(entry, common_info):
             """
@@ -1374,7 +1612,7 @@ class FileService(CommonService, ReferenceDataMixin):
 
             serializer = serializer_class(data=row, **kwargs)
 
-            if row["file_path"] not in project_file_paths:
+            if row["file_path"] not in existing_file_paths:
                 # saves a fetch to db in serializer.is_valid()
                 serializer.file_path_checked = True
             else:
@@ -1406,6 +1644,7 @@ class FileService(CommonService, ReferenceDataMixin):
                 entry = serializer.initial_data
                 to_model_format(entry, common_info)
                 entries.append(File(**entry))
+                created_files.append((entry["parent_directory_id"], entry.get("byte_size")))
                 file_storage_id = entry["file_storage_id"]  # re-used for following loops
 
                 if file_storage_identifier is None:
@@ -1462,6 +1701,8 @@ class FileService(CommonService, ReferenceDataMixin):
                 % (len(initial_data_list), (end - start))
             )
 
+        return created_files
+
     @classmethod
     def update_bulk(cls, request, model_obj, serializer_class, **kwargs):
         return super().update_bulk(
@@ -1604,37 +1845,102 @@ class FileService(CommonService, ReferenceDataMixin):
         """
         Create to db directory hierarchy from directories extracted from the received file list.
 
-        Save created paths/id's to existing_dirs dict, so the results can be efficiently re-used
-        by other dirs being created, and later by the files that are created.
+        Directories are inserted level by level using bulk_create, so that parent directories
+        always exist before their children, and the ids of the parents are known. Save created
+        paths/id's to existing_dirs dict, so the results can be efficiently re-used by other dirs
+        being created, and later by the files that are created.
 
         It is possible, that no new directories are created at all, when appending files to an
         existing dir.
         """
         _logger.info("Creating directories...")
         python_process_pid = str(getpid())
+        time_ms = int(round(time() * 1000))
 
+        directories = []
         for i, path in enumerate(new_dir_paths):
+            directories.append(
+                {
+                    "directory_path": path,
+                    "directory_name": basename(path) if path != "/" else "/",
+                    # identifier: uuid3 as hex, using as salt time in ms, idx of loop, and python process id
+                    "identifier": uuid3(
+                        UUID_NAMESPACE_DNS, "%d%d%s" % (time_ms, i, python_process_pid)
+                    ).hex,
+                }
+            )
 
-            directory = {
-                "directory_path": path,
-                "directory_name": basename(path) if path != "/" else "/",
-                # identifier: uuid3 as hex, using as salt time in ms, idx of loop, and python process id
-                "identifier": uuid3(
-                    UUID_NAMESPACE_DNS,
-                    "%d%d%s" % (int(round(time() * 1000)), i, python_process_pid),
-                ).hex,
-                "project_identifier": project_identifier,
-            }
+        common_fields = cls._validate_new_directories(
+            directories, common_info, project_identifier, **kwargs
+        )
+
+        levels = defaultdict(list)
+        for directory in directories:
+            path = directory["directory_path"]
+            levels[0 if path == "/" else path.count("/")].append(directory)
+
+        for depth in sorted(levels.keys()):
+            new_dirs = []
+            for directory in levels[depth]:
+                if directory["directory_path"] != "/":
+                    cls._find_parent_dir_from_previously_created_dirs(directory, existing_dirs)
+                    directory["parent_directory_id"] = directory.pop("parent_directory")
+                new_dirs.append(Directory(**directory, **common_fields))
+
+            # ids of the created directories are returned by postgres
+            for dr in Directory.objects.bulk_create(new_dirs, batch_size=1000):
+                existing_dirs[dr.directory_path] = dr.id
+
+        _logger.info("Created %d directories" % len(directories))
+
+    @staticmethod
+    def _validate_new_directories(directories, common_info, project_identifier, **kwargs):
+        """
+        Validate directories to be created in bulk. The fields of the new directories only differ
+        by path and identifier, so the complete serializer validation is made for one of them, and
+        the paths and identifiers of all of them are checked with one query each.
+
+        Returns the validated fields that are common to all of the new directories.
+        """
+        data = {**common_info, **directories[0], "project_identifier": project_identifier}
+        serializer = DirectorySerializer(data=data, **kwargs)
+        serializer.is_valid(raise_exception=True)
 
-            directory.update(common_info)
+        existing_path = (
+            Directory.objects.filter(
+                project_identifier=project_identifier,
+                directory_path__in=[dr["directory_path"] for dr in directories],
+            )
+            .values_list("directory_path", flat=True)
+            .first()
+        )
+        if existing_path is not None:
+            raise ValidationError(
+                {
+                    "directory_path": [
+                        "directory path %s already exists in project %s scope. Are you trying to "
+                        "freeze same directory again?" % (existing_path, project_identifier)
+                    ]
+                }
+            )
 
-            if path != "/":
-                cls._find_parent_dir_from_previously_created_dirs(directory, existing_dirs)
+        existing_identifier = (
+            Directory.objects_unfiltered.filter(
+                identifier__in=[dr["identifier"] for dr in directories]
+            )
+            .values_list("identifier", flat=True)
+            .first()
+        )
+        if existing_identifier is not None:  # pragma: no cover
+            raise ValidationError(
+                {"identifier": ["directory with this identifier already exists."]}
+            )
 
-            serializer = DirectorySerializer(data=directory, **kwargs)
-            serializer.is_valid(raise_exception=True)
-            serializer.save()
-            existing_dirs[serializer.data["directory_path"]] = serializer.data["id"]
+        return {
+            field: value
+            for field, value in serializer.validated_data.items()
+            if field not in directories[0]
+        }
 
     @classmethod
     def _assign_parents_to_files(cls, existing_dirs, sorted_data):
@@ -1682,7 +1988,10 @@ class FileService(CommonService, ReferenceDataMixin):
     @staticmethod
     def calculate_project_directory_byte_sizes_and_file_counts(project_identifier):
         """
-        (Re-)calculate directory byte sizes and file counts in this project.
+        (Re-)calculate directory byte sizes and file counts in this project from scratch.
+
+        Creating, deleting and restoring files keep the numbers up to date incrementally, so this
+        is only needed to verify and repair the numbers of an entire project.
         """
         try:
             project_root_dir = Directory.objects.get(
@@ -1696,14 +2005,14 @@ class FileService(CommonService, ReferenceDataMixin):
 
     @classmethod
     def validate_file_characteristics_reference_data(cls, file_characteristics, cache):
-        reference_data = cls.get_reference_data(cache).get("reference_data", None)
+        reference_data = cls.get_reference_data_index(cache)
         errors = defaultdict(list)
 
         if "file_format" in file_characteristics:
             ff = file_characteristics["file_format"]
             fv = file_characteristics.get("format_version", "")
             versions = cls._validate_file_format_and_get_versions_from_reference_data(
-                reference_data["file_format_version"], ff, errors
+                reference_data["file_format_version_by_input_file_format"], ff, errors
             )
 
             # If the given file_format is a valid value, proceed to checking the given format_version value
@@ -1738,21 +2047,33 @@ class FileService(CommonService, ReferenceDataMixin):
         return a list of all possible output_format_version values for the particular input_file_format.
 
         The input_file_format should be found from the reference data, otherwise it is an error.
+
+        file_format_version_refdata can be either the list of file_format_version entries, or the
+        entries grouped by input_file_format from the reference data lookup index.
         """
+        if isinstance(file_format_version_refdata, dict):
+            try:
+                entries = file_format_version_refdata.get(input_file_format, [])
+            except TypeError:
+                entries = []
+        else:
+            entries = [
+                entry
+                for entry in file_format_version_refdata
+                if input_file_format == entry["input_file_format"]
+            ]
+
         versions = []
-        iff_found = False
-        for entry in file_format_version_refdata:
-            if input_file_format == entry["input_file_format"]:
-                iff_found = True
-                ofv = entry.get("output_format_version")
-                if ofv is not None:
-                    if isinstance(ofv, list):
-                        for e in ofv:
-                            versions.append(e)
-                    else:
-                        versions.append(entry["output_format_version"])
-
-        if not iff_found:
+        for entry in entries:
+            ofv = entry.get("output_format_version")
+            if ofv is not None:
+                if isinstance(ofv, list):
+                    for e in ofv:
+                        versions.append(e)
+                else:
+                    versions.append(entry["output_format_version"])
+
+        if not entries:
             errors["file_characteristics.file_format"].append(
                 "Value for file_format '%s' not found in reference data" % input_file_format
             )
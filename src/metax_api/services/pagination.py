@@ -1,4 +1,10 @@
-from rest_framework.pagination import LimitOffsetPagination
+from django.db.models import BooleanField, DateTimeField, Expression, F, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, CursorPagination, LimitOffsetPagination
+
+from metax_api.exceptions import Http400
 
 
 class DirectoryPagination(LimitOffsetPagination):
@@ -70,3 +76,161 @@ class DirectoryPagination(LimitOffsetPagination):
                 )
 
         return count
+
+
+class RowComparison(Expression):
+
+    """
+    Compiles to a comparison of two rows, e.g. (date_modified, id) > (%s, %s), which compares the
+    values in order, and is true when the first unequal value of the left row compares true.
+    """
+
+    output_field = BooleanField()
+
+    def __init__(self, lhs, operator, rhs):
+        super().__init__()
+        self.lhs = list(lhs)
+        self.operator = operator
+        self.rhs = list(rhs)
+
+    def get_source_expressions(self):
+        return self.lhs + self.rhs
+
+    def set_source_expressions(self, exprs):
+        self.lhs, self.rhs = exprs[: len(self.lhs)], exprs[len(self.lhs) :]
+
+    def as_sql(self, compiler, connection):
+        params = []
+        rows = []
+        for row in (self.lhs, self.rhs):
+            sqls = []
+            for expr in row:
+                sql, expr_params = compiler.compile(expr)
+                sqls.append(sql)
+                params.extend(expr_params)
+            rows.append("(%s)" % ", ".join(sqls))
+        return "%s %s %s" % (rows[0], self.operator, rows[1]), params
+
+
+class KeysetPagination(CursorPagination):
+
+    """
+    Opt-in alternative to limit/offset pagination for list apis, used when the query parameter
+    cursor is given. Pages are fetched by filtering on the ordering key of the last (or for the
+    previous page, the first) returned object, so that deep pages do not need the database to
+    scan and discard all preceding rows.
+
+    The ordering key is id by default. With ?ordering=date_modified or date_created, optionally
+    descending, the key is (date, id), where a missing date_modified falls back to date_created.
+    Ties are always ordered by id in the same direction. Other orderings are not supported in
+    cursor mode, since a keyset needs a unique, non-null key.
+    """
+
+    page_size_query_param = "limit"
+
+    # ordering parameter -> date expression of the ordering key
+    keyset_dates = {
+        "date_created": F("date_created"),
+        "date_modified": Coalesce("date_modified", "date_created"),
+    }
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.keyset_date, descending = self._get_keyset_ordering(request)
+        self.cursor = self.decode_cursor(request)
+        reverse = bool(self.cursor and self.cursor.reverse)
+
+        key = ["id"]
+        if self.keyset_date is not None:
+            queryset = queryset.annotate(keyset_date=self.keyset_dates[self.keyset_date])
+            key = ["keyset_date", "id"]
+
+        # the previous page is fetched in reverse order, and then turned around
+        descending = descending != reverse
+        queryset = queryset.order_by(*(("-%s" if descending else "%s") % f for f in key))
+
+        if self.cursor and self.cursor.position is not None:
+            queryset = queryset.filter(
+                RowComparison(
+                    (F(f) for f in key),
+                    "<" if descending else ">",
+                    self._decode_position(self.cursor.position),
+                )
+            )
+
+        results = list(queryset[: self.page_size + 1])
+        has_more = len(results) > self.page_size
+        self.page = results[: self.page_size]
+        has_cursor_position = bool(self.cursor and self.cursor.position is not None)
+
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = has_cursor_position, has_more
+        else:
+            self.has_next, self.has_previous = has_more, has_cursor_position
+
+        if self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        position = self._encode_position(self.page[-1])
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        position = self._encode_position(self.page[0])
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def _get_keyset_ordering(self, request):
+        """
+        Return a tuple of (date field of the ordering key or None, descending)
+        """
+        ordering = [
+            field.strip()
+            for field in request.query_params.get("ordering", "").split(",")
+            if field.strip()
+        ]
+        fields = [field for field in ordering if field.lstrip("-") != "id"]
+
+        if not fields:
+            return None, ordering[:1] == ["-id"]
+
+        if len(fields) == 1 and fields[0].lstrip("-") in self.keyset_dates:
+            return fields[0].lstrip("-"), fields[0].startswith("-")
+
+        raise Http400(
+            {
+                "detail": [
+                    "Ordering %s is not supported with cursor pagination. Supported orderings "
+                    "are: id, date_created, date_modified" % ",".join(ordering)
+                ]
+            }
+        )
+
+    def _encode_position(self, instance):
+        if self.keyset_date is None:
+            return str(instance.id)
+        return "%s,%d" % (instance.keyset_date.isoformat(), instance.id)
+
+    def _decode_position(self, position):
+        try:
+            if self.keyset_date is None:
+                return [Value(int(position))]
+
+            date, id = position.split(",")
+            date = parse_datetime(date)
+            if date is None:
+                raise ValueError
+            return [Value(date, output_field=DateTimeField()), Value(int(id))]
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
@@ -7,16 +7,19 @@
 
 import logging
 import random
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 from json import dumps as json_dumps, loads
 from time import sleep
 
 import pika
+from pika.exceptions import AMQPConnectionError, ChannelClosed
 from django.conf import settings
 from django.core import serializers
 from django.core.serializers.json import DjangoJSONEncoder
-from django.db import DatabaseError
 
+from metax_api.exceptions import Http503
 from metax_api.models import ApiError
 from metax_api.utils.utils import (
     datetime_to_str,
@@ -37,11 +40,13 @@ class _RabbitMQService:
         )
         self._hosts = self._settings["HOSTS"]
 
+        # the publishing connection and channel are kept open for the lifetime of the process,
+        # one per thread, since BlockingConnection is not thread-safe.
+        self._local = threading.local()
+
     def _connect(self):
         """
-        Creates and returns a new BlockingConnection for the caller. Creating a new connection enables multiple
-        threads (i.e. requests) to access RabbitMQ in parallel using synchronous connection. Even though initializing
-        a new connection for each request is slow and has some overhead, thread-safety is more important.
+        Creates and returns a new BlockingConnection for the caller.
         """
 
         # Connection retries are needed as long as there is no load balancer in front of rabbitmq-server VMs
@@ -79,6 +84,9 @@ class _RabbitMQService:
         """
         Publish a message to an exchange, which might or might not have queues bound to it.
 
+        If a batch has been started using batch(), the messages are only queued, and published
+        once the batch ends.
+
         body: body of the message. can be a list of messages, in which case each message is published
               individually.
         routing_key: in direct-type exchanges, publish message to a specific route, which
@@ -89,70 +97,192 @@ class _RabbitMQService:
                     otherwise messages not retrieved by clients before restart will be lost.
                     (still is not 100 % guaranteed to persist!)
         """
-        connection = self._connect()
-        channel = connection.channel()
         self._validate_publish_params(routing_key, exchange)
 
-        additional_args = {}
-        if persistent:
-            additional_args["properties"] = pika.BasicProperties(delivery_mode=2)
-
         if isinstance(body, list):
             messages = body
         else:
             messages = [body]
 
+        queued_messages = []
+        for message in messages:
+            if isinstance(message, dict):
+                message = json_dumps(message, cls=DjangoJSONEncoder)
+            queued_messages.append((message, routing_key, exchange, persistent))
+
+        if getattr(self._local, "batch", None) is not None:
+            self._local.batch.extend(queued_messages)
+            return
+
         try:
-            for message in messages:
-                if isinstance(message, dict):
-                    message = json_dumps(message, cls=DjangoJSONEncoder)
-                channel.basic_publish(
-                    body=message,
-                    routing_key=routing_key,
-                    exchange=exchange,
-                    **additional_args,
-                )
+            self._publish_messages(queued_messages)
         except Exception as e:
             _logger.error(e)
             _logger.error("Unable to publish message to RabbitMQ")
             raise
+
+    @contextmanager
+    def batch(self):
+        """
+        Queue all messages published inside the with-block, and publish them together in one go
+        when the block exits, using the channel of the current thread. If the block raises an
+        exception, the queued messages are discarded.
+
+        Used to publish all messages produced by the post request callables of a request at once,
+        and only when all of the callables succeeded.
+        """
+        if getattr(self._local, "batch", None) is not None:
+            # already inside a batch, the outermost one publishes the messages
+            yield
+            return
+
+        self._local.batch = []
+        try:
+            yield
+            messages = self._local.batch
         finally:
-            connection.close()
+            self._local.batch = None
 
-    def consume_api_errors(self):
+        if not messages:
+            return
+
+        try:
+            self._publish_messages(messages)
+        except Exception:
+            _logger.exception("Publishing rabbitmq messages failed")
+            raise Http503(
+                {"detail": ["failed to publish updates to rabbitmq. request is aborted."]}
+            )
+
+    def _publish_messages(self, messages):
+        """
+        Publish a list of (body, routing_key, exchange, persistent) tuples. The channel is in
+        confirm mode, so every message has been accepted by the broker when this returns.
+
+        If the connection turns out to be broken, for example because the server closed it while
+        it was idle, a new connection is opened once, and the messages not yet confirmed are
+        published again.
+        """
+        published = 0
+        for attempt in range(2):
+            channel = self._get_channel()
+            try:
+                for body, routing_key, exchange, persistent in messages[published:]:
+                    channel.basic_publish(
+                        body=body,
+                        routing_key=routing_key,
+                        exchange=exchange,
+                        properties=pika.BasicProperties(delivery_mode=2) if persistent else None,
+                    )
+                    published += 1
+            except (AMQPConnectionError, ChannelClosed) as e:
+                self._close_channel()
+                if attempt > 0:
+                    raise
+                _logger.warning(
+                    "RabbitMQ connection lost (%s), reconnecting to publish remaining %d messages"
+                    % (str(e), len(messages) - published)
+                )
+            else:
+                _logger.info("Published %d messages to RabbitMQ" % len(messages))
+                return
+
+    def _get_channel(self):
+        """
+        Return the publishing channel of the current thread, after checking that its connection
+        is still alive. A new connection and channel are opened when needed.
+        """
+        channel = getattr(self._local, "channel", None)
+        if channel is not None and channel.is_open and channel.connection.is_open:
+            try:
+                # services heartbeats, and raises if the server has closed the connection
+                channel.connection.process_data_events(time_limit=0)
+            except Exception as e:
+                _logger.info("RabbitMQ connection failed health check: %s" % str(e))
+            else:
+                if channel.is_open:
+                    return channel
+
+        self._close_channel()
         connection = self._connect()
         channel = connection.channel()
+        channel.confirm_delivery()
+        self._local.channel = channel
+        return channel
+
+    def _close_channel(self):
+        channel = getattr(self._local, "channel", None)
+        self._local.channel = None
+        if channel is None:
+            return
+        try:
+            if channel.connection.is_open:
+                channel.connection.close()
+        except Exception as e:
+            _logger.info("Error while closing RabbitMQ connection: %s" % str(e))
+
+    def consume_api_errors(self, batch_size=1000):
+        """
+        Consume all messages from queue metax-apierrors, and write the ApiErrors into files in
+        ERROR_FILES_PATH, at most batch_size errors per file. Messages are acknowledged only after
+        the file containing them has been written, so that they are redelivered if writing fails.
 
+        Returns the number of consumed messages.
+        """
+        connection = self._connect()
+        channel = connection.channel()
+        channel.basic_qos(prefetch_count=batch_size)
+
+        delivered = 0
+        consumed = 0
         try:
             errors = []
+            unacked_tag = None
+            file_count = 0
             for method, _, body in channel.consume("metax-apierrors", inactivity_timeout=1):
                 if method is None and body is None:
-                    channel.cancel()
                     break
+                delivered += 1
+                unacked_tag = method.delivery_tag
                 try:
                     error_payload = loads(body)
                     error = ApiError(identifier=error_payload["identifier"], error=error_payload)
                     errors.append(error)
                 except Exception as e:
                     _logger.error(e)
-                finally:
-                    channel.basic_ack(method.delivery_tag)
-            try:
-                # ApiError.objects.bulk_create(errors, batch_size=5000)
-                now = datetime.now()
-                tz_aware = parse_timestamp_string_to_tz_aware_datetime(datetime_to_str(now))
-                with open(f"{settings.ERROR_FILES_PATH}{tz_aware}.log", 'w') as out:
-                    serializers.serialize("json", errors, stream=out)
-            except DatabaseError as e:
-                _logger.error("cannot create API Error. Discarding..")
-                _logger.error(f"error: {e}")
+
+                if len(errors) >= batch_size:
+                    self._write_api_errors(errors, file_count)
+                    channel.basic_ack(unacked_tag, multiple=True)
+                    consumed = delivered
+                    unacked_tag = None
+                    file_count += 1
+                    errors = []
+
+            channel.cancel()
+
+            if unacked_tag is not None:
+                if errors:
+                    self._write_api_errors(errors, file_count)
+                channel.basic_ack(unacked_tag, multiple=True)
+                consumed = delivered
 
         except Exception as e:
             _logger.error(e)
         finally:
-            _logger.info("All ApiErrors were handled")
+            _logger.info("Consumed %d ApiErrors" % consumed)
             connection.close()
 
+        return consumed
+
+    @staticmethod
+    def _write_api_errors(errors, file_count):
+        now = datetime.now()
+        tz_aware = parse_timestamp_string_to_tz_aware_datetime(datetime_to_str(now))
+        suffix = f"-{file_count}" if file_count else ""
+        with open(f"{settings.ERROR_FILES_PATH}{tz_aware}{suffix}.log", "w") as out:
+            serializers.serialize("json", errors, stream=out)
+
     def init_exchanges(self):
         """
         Declare the exchanges specified in settings. Re-declaring existing exchanges does no harm, but
@@ -218,11 +348,15 @@ class _RabbitMQServiceDummy:
         msg = {"body":body, "routing_key":routing_key, "exchange":exchange, "persistent":persistent}
         self.messages.append(msg)
 
+    @contextmanager
+    def batch(self):
+        yield
+
     def init_exchanges(self, *args, **kwargs):
         pass
 
-    def consume_api_errors(self):
-        pass
+    def consume_api_errors(self, batch_size=1000):
+        return 0
 
 if executing_test_case():
     RabbitMQService = _RabbitMQServiceDummy()
@@ -9,6 +9,7 @@ import logging
 from pickle import dumps as pickle_dumps, loads as pickle_loads
 from random import choice as random_choice
 from typing import Any
+from zlib import compress as zlib_compress, decompress as zlib_decompress
 
 import redis
 from django.conf import settings, settings as django_settings
@@ -23,6 +24,10 @@ d = logging.getLogger(__name__).debug
 
 
 class RedisClient(object):
+
+    # marks values that were compressed before storing. pickled data never starts with this
+    COMPRESSED_PREFIX = b"zlib:"
+
     def __init__(self, db=0):
         if settings.REDIS_USE_PASSWORD is True:
             self.client = redis.Redis(
@@ -41,8 +46,14 @@ class RedisClient(object):
             f"RedisClient created with host:{settings.REDIS['HOST']} port:{settings.REDIS['PORT']}"
         )
 
-    def set(self, key, value, **kwargs):
+    def set(self, key, value, compress=False, **kwargs):
+        """
+        Pickle and store value. Large values, such as reference data, can be compressed with
+        compress=True. Compressed values are decompressed transparently in get().
+        """
         pickled_data = pickle_dumps(value)
+        if compress:
+            pickled_data = self.COMPRESSED_PREFIX + zlib_compress(pickled_data)
         return self.client.set(key, pickled_data, **kwargs)
 
     def get_or_set(self, key, value, **kwargs):
@@ -63,7 +74,11 @@ class RedisClient(object):
             value = self.client.get(key)
         except KeyError as e:
             _logger.error(f"Redis has no {key} as key: {e}")
-        return pickle_loads(value) if value is not None else None
+        if value is None:
+            return None
+        if value.startswith(self.COMPRESSED_PREFIX):
+            value = zlib_decompress(value[len(self.COMPRESSED_PREFIX) :])
+        return pickle_loads(value)
 
     def delete(self, *keys):
         self.client.delete(*keys)
@@ -6,7 +6,7 @@
 # :license: MIT
 
 import logging
-from time import sleep
+from time import monotonic, sleep, time
 
 from django.conf import settings as django_settings
 
@@ -29,6 +29,16 @@ class ReferenceDataMixin:
 
     process_cached_reference_data = None
 
+    # version info of the reference data in the process, see ReferenceDataLoader
+    process_cached_reference_data_version = None
+
+    # monotonic time of the latest version check against the cache
+    process_cached_reference_data_checked_at = 0
+
+    process_cached_reference_data_stats = {}
+
+    process_cache_client = None
+
     @staticmethod
     def check_ref_data(
         ref_data_type,
@@ -47,21 +57,33 @@ class ReferenceDataMixin:
         If the value is not found and value_not_found_is_error is True, an error is appended to the 'errors' dict.
 
         params:
-        ref_data_type:  the ES datatype to search from
+        ref_data_type:  the ES datatype to search from. Either a lookup table from the reference data
+                        lookup index (see get_reference_data_index()), or a plain list of entries
         field_to_check: the field value being checked
         relation_name:  the full relation path to the field to hand out in case of errors
         """
-        try:
-            return next(
-                entry for entry in ref_data_type if field_to_check in (entry["uri"], entry["code"])
+        if isinstance(ref_data_type, dict):
+            try:
+                ref_entry = ref_data_type.get(field_to_check, None)
+            except TypeError:
+                # unhashable value, can not be an identifier
+                ref_entry = None
+        else:
+            ref_entry = next(
+                (
+                    entry
+                    for entry in ref_data_type
+                    if field_to_check in (entry["uri"], entry["code"])
+                ),
+                None,
             )
-        except StopIteration:
-            if value_not_found_is_error:
-                _logger.error("Identifier '%s' not found in reference data" % field_to_check)
-                errors[relation_name].append(
-                    "Identifier '%s' not found in reference data" % field_to_check
-                )
-        return None
+
+        if ref_entry is None and value_not_found_is_error:
+            _logger.error("Identifier '%s' not found in reference data" % field_to_check)
+            errors[relation_name].append(
+                "Identifier '%s' not found in reference data" % field_to_check
+            )
+        return ref_entry
 
     @classmethod
     def get_reference_data(cls, cache):
@@ -71,18 +93,26 @@ class ReferenceDataMixin:
         seconds, and give up.
 
         Once reference data has been loaded once, it is stored in the process itself, so it does not
-        need to be reloaded from the distributed cache again. Reference data does not change actively
-        during normal operation, so saving it in the process should be safe.
+        need to be reloaded from the distributed cache on every request. Instead, the small key
+        reference_data_version is checked at most every REFERENCE_DATA_VERSION_CHECK_INTERVAL
+        seconds, and the reference data is downloaded again only when its version has changed.
+
+        cache: a RedisClient instance. Views pass the RedisClient class itself, in which case a
+        client shared by the process is used.
         """
-        cache = RedisClient()
+        if not isinstance(cache, RedisClient):
+            cache = cls._get_process_cache_client()
+
         if cls.process_cached_reference_data is not None:
-            return cls.process_cached_reference_data
+            if not cls._reference_data_version_check_due():
+                return cls.process_cached_reference_data
+            return cls._refresh_process_cached_reference_data(cache)
 
-        ref_data = cache.get("reference_data")
-        # ref_data += cache.get('reference-data')
+        version = cache.get("reference_data_version")
+        ref_data, load_time = cls._download_reference_data(cache)
 
         if ref_data:
-            cls.process_cached_reference_data = ref_data
+            cls._set_process_cached_reference_data(ref_data, version, load_time)
             return cls.process_cached_reference_data
         else:
             _logger.info("reference_data missing from cache - attempting to reload")
@@ -96,10 +126,11 @@ class ReferenceDataMixin:
 
             # when ref data was just populated, always retrieve from master to ensure
             # data is found, since there is a delay in data flow to slaves
-            ref_data = cache.get("reference_data", master=True)
+            version = cache.get("reference_data_version", master=True)
+            ref_data, load_time = cls._download_reference_data(cache, master=True)
 
             if ref_data:
-                cls.process_cached_reference_data = ref_data
+                cls._set_process_cached_reference_data(ref_data, version, load_time)
                 return cls.process_cached_reference_data
             elif state == "reload_started_by_other" and retry < cls.REF_DATA_RELOAD_MAX_RETRIES:
                 sleep(1)
@@ -113,6 +144,118 @@ class ReferenceDataMixin:
                     " since key reference_data is still missing"
                 )
 
+    @classmethod
+    def get_reference_data_cache_stats(cls):
+        """
+        Return information about the reference data kept in the process, for monitoring.
+        """
+        stats = dict(cls.process_cached_reference_data_stats)
+        loaded_at = stats.pop("loaded_at", None)
+        stats["age"] = round(time() - loaded_at, 1) if loaded_at else None
+        stats["cached_in_process"] = cls.process_cached_reference_data is not None
+        return stats
+
+    @classmethod
+    def _get_process_cache_client(cls):
+        if cls.process_cache_client is None:
+            ReferenceDataMixin.process_cache_client = RedisClient()
+        return cls.process_cache_client
+
+    @classmethod
+    def _reference_data_version_check_due(cls):
+        return (
+            monotonic() - cls.process_cached_reference_data_checked_at
+            >= django_settings.REFERENCE_DATA_VERSION_CHECK_INTERVAL
+        )
+
+    @classmethod
+    def _refresh_process_cached_reference_data(cls, cache):
+        """
+        Compare the version of the reference data in the process against the version in the cache,
+        and replace the process cached reference data if the version has changed. Any problem
+        with the cache is not fatal: the reference data already in the process is then returned, and
+        the version is checked again after the next interval.
+        """
+        ReferenceDataMixin.process_cached_reference_data_checked_at = monotonic()
+
+        try:
+            version = cache.get("reference_data_version")
+        except Exception as e:
+            _logger.warning("Failed to check reference data version: %s" % e)
+            return cls.process_cached_reference_data
+
+        current_version = cls.process_cached_reference_data_version or {}
+        if version is None or version.get("version") == current_version.get("version"):
+            return cls.process_cached_reference_data
+
+        _logger.info(
+            "event='reference_data_version_changed',old_version=%s,new_version=%s"
+            % (
+                current_version.get("version"),
+                version.get("version"),
+            )
+        )
+
+        try:
+            ref_data, load_time = cls._download_reference_data(cache)
+        except Exception as e:
+            _logger.warning("Failed to download changed reference data: %s" % e)
+            ref_data = None
+
+        if ref_data:
+            cls._set_process_cached_reference_data(ref_data, version, load_time)
+        else:
+            # possibly a reload is in progress. keep using current data, and try again after
+            # the next interval
+            _logger.info("reference_data missing from cache - using reference data in process")
+
+        return cls.process_cached_reference_data
+
+    @staticmethod
+    def _download_reference_data(cache, master=False):
+        """
+        Return reference data from cache, and the time it took to download and unpickle it.
+        """
+        started = monotonic()
+        ref_data = cache.get("reference_data", master=master)
+        return ref_data, monotonic() - started
+
+    @classmethod
+    def _set_process_cached_reference_data(cls, ref_data, version, load_time):
+        ReferenceDataMixin.process_cached_reference_data = ref_data
+        ReferenceDataMixin.process_cached_reference_data_version = version
+        ReferenceDataMixin.process_cached_reference_data_checked_at = monotonic()
+        ReferenceDataMixin.process_cached_reference_data_stats = {
+            "version": version.get("version") if version else None,
+            "payload_size": version.get("payload_size") if version else None,
+            "loaded_at": time(),
+            "load_time": round(load_time, 3),
+            "reload_count": cls.process_cached_reference_data_stats.get("reload_count", 0) + 1,
+        }
+        _logger.info(
+            "event='reference_data_cached_in_process',version=%s,payload_size=%s,load_time=%.3f"
+            % (
+                cls.process_cached_reference_data_stats["version"],
+                cls.process_cached_reference_data_stats["payload_size"],
+                load_time,
+            )
+        )
+
+    @classmethod
+    def get_reference_data_index(cls, cache):
+        """
+        Return lookup tables for the reference data, for finding reference data entries by uri or
+        code in constant time. Reference data loaded to cache by ReferenceDataLoader already contains
+        the lookup index. If it is missing for some reason (cache populated by some other means), it
+        is built once and stored with the process cached reference data.
+        """
+        reference_data = cls.get_reference_data(cache)
+        index = reference_data.get(ReferenceDataLoader.LOOKUP_INDEX_KEY, None)
+        if index is None:
+            index = ReferenceDataLoader.build_lookup_index(reference_data)
+            reference_data[ReferenceDataLoader.LOOKUP_INDEX_KEY] = index
+        return index
+
     def populate_from_ref_data(
         ref_entry, obj, uri_field="identifier", label_field=None, add_in_scheme=True
     ):
@@ -29,7 +29,7 @@ class StatisticService:
     @staticmethod
     def _get_access_types():
         sql_distinct_access_types = """
-            select distinct(research_dataset->'access_rights'->'access_type'->>'identifier')
+            select distinct(rd_access_type)
             from metax_api_catalogrecord
         """
 
@@ -64,7 +64,7 @@ class StatisticService:
         sql = """
             SELECT
                 count(cr.id) AS count,
-                COALESCE(SUM(COALESCE((research_dataset->>'total_files_byte_size')::bigint, 0)), 0) AS ida_byte_size
+                COALESCE(SUM(COALESCE(rd_total_files_byte_size, 0)), 0) AS ida_byte_size
             from metax_api_catalogrecord as cr
             join metax_api_datacatalog as dc on dc.id = cr.data_catalog_id
             where 1=1
@@ -85,7 +85,7 @@ class StatisticService:
 
         if access_type:
             where_args.append(
-                "and research_dataset->'access_rights'->'access_type'->>'identifier' = %s"
+                "and rd_access_type = %s"
             )
             sql_args.append(access_type)
 
@@ -168,7 +168,7 @@ class StatisticService:
             WITH cte AS (
                 SELECT
                     date_trunc('month', cr.date_created) AS mon,
-                    SUM(COALESCE((cr.research_dataset->>'total_files_byte_size')::bigint, 0)) AS mon_ida_byte_size
+                    SUM(COALESCE(cr.rd_total_files_byte_size, 0)) AS mon_ida_byte_size
                 FROM metax_api_catalogrecord cr
                 JOIN metax_api_datacatalog AS dc on dc.id = cr.data_catalog_id
                 WHERE 1=1
@@ -239,9 +239,8 @@ class StatisticService:
             except ValueError:
                 dc_params = {"catalog_json__identifier": data_catalog}
 
-            try:
-                dc = DataCatalog.objects.filter(**dc_params).values()
-            except:
+            dc = DataCatalog.objects.filter(**dc_params).values().first()
+            if dc is None:
                 raise Http400({"detail": ["Data catalog identifier %s not found" % data_catalog]})
 
             _logger.info(
@@ -253,91 +252,95 @@ class StatisticService:
             _logger.info("Retrieving total count and byte sizes for datasets in all catalogs")
             catalogs = DataCatalog.objects.all().values()
 
-        access_types = cls._get_access_types()
+        catalog_identifiers = {dc["id"]: dc["catalog_json"]["identifier"] for dc in catalogs}
+
+        grouped_by_catalog = cls._total_data_catalog_datasets(
+            from_date, to_date, list(catalog_identifiers.keys())
+        )
 
         results = {}
-        for dc in catalogs:
-            results[dc["catalog_json"]["identifier"]] = cls._total_data_catalog_datasets(
-                from_date, to_date, access_types, dc["id"]
-            )
+        for dc_id, identifier in catalog_identifiers.items():
+            results[identifier] = grouped_by_catalog.get(dc_id, {"total": []})
 
         _logger.info("Done retrieving total count and byte sizes")
 
         return results
 
     @classmethod
-    def _total_data_catalog_datasets(cls, from_date, to_date, access_types, dc_id):
+    def _total_data_catalog_datasets(cls, from_date, to_date, dc_ids):
+        """
+        Retrieve the monthly statistics of all given catalogs and all access types with one query,
+        which scans the catalog records only once. The access types are those that appear in any
+        catalog record, so that every catalog has statistics for every access type.
+
+        Returns a dict of { dc_id: { access_type: [monthly stats], 'total': [monthly stats] } }
+        """
         sql = """
-            WITH cte AS (
+            WITH stats AS (
                 SELECT
+                    cr.data_catalog_id,
+                    cr.rd_access_type AS access_type,
                     date_trunc('month', cr.date_created) AS mon,
-                    SUM(COALESCE((cr.research_dataset->>'total_files_byte_size')::bigint, 0)) AS mon_ida_byte_size
+                    count(cr.id) FILTER (WHERE cr.state = 'published') AS count,
+                    SUM(COALESCE(cr.rd_total_files_byte_size, 0))
+                        FILTER (WHERE cr.state = 'published') AS ida_byte_size
                 FROM metax_api_catalogrecord cr
-                JOIN metax_api_datacatalog as dc on dc.id = cr.data_catalog_id
-                where dc.id = %s
-                and state = 'published'
-                and cr.research_dataset->'access_rights'->'access_type'->>'identifier' = %s
-                GROUP BY mon
+                GROUP BY cr.data_catalog_id, access_type, mon
+            ),
+            access_types AS (
+                SELECT DISTINCT access_type FROM stats WHERE access_type IS NOT NULL
             )
             SELECT
-                to_char(mon, 'YYYY-MM') as month,
-                COALESCE(count, 0) as count,
-                COALESCE(SUM(cr.count) over (partition by to_char(mon, 'YYYY') ORDER BY mon), 0)
-                    AS count_cumulative,
-                COALESCE(SUM(c.mon_ida_byte_size), 0) AS ida_byte_size,
-                COALESCE(SUM(c.mon_ida_byte_size) over (partition by to_char(mon, 'YYYY') ORDER BY mon), 0)
-                    AS ida_byte_size_cumulative
-            FROM generate_series(%s::date, %s::date, interval '1 month') AS mon
-            LEFT JOIN cte c USING (mon)
-            LEFT JOIN (
-                SELECT
-                    count(cr.id) AS count,
-                    date_trunc('month', cr.date_created) AS mon,
-                    reverse(
-                        split_part(reverse(cr.research_dataset->'access_rights'->'access_type'->>'identifier'), '/', 1)
-                        ) as access_type
-                FROM metax_api_catalogrecord AS cr
-                JOIN metax_api_datacatalog as dc on dc.id = cr.data_catalog_id
-                where dc.id = %s
-                and state = 'published'
-                and cr.research_dataset->'access_rights'->'access_type'->>'identifier' = %s
-                GROUP BY mon, access_type
-            ) cr USING (mon)
-            GROUP BY mon, c.mon_ida_byte_size, count, access_type
-            ORDER BY mon;
+                dc.id AS data_catalog_id,
+                at.access_type,
+                to_char(series.mon, 'YYYY-MM') as month,
+                COALESCE(s.count, 0) as count,
+                COALESCE(SUM(s.count) over w, 0) AS count_cumulative,
+                COALESCE(s.ida_byte_size, 0) AS ida_byte_size,
+                COALESCE(SUM(s.ida_byte_size) over w, 0) AS ida_byte_size_cumulative
+            FROM metax_api_datacatalog AS dc
+            CROSS JOIN access_types AS at
+            CROSS JOIN generate_series(%s::date, %s::date, interval '1 month') AS series(mon)
+            LEFT JOIN stats s
+                ON s.data_catalog_id = dc.id and s.access_type = at.access_type and s.mon = series.mon
+            WHERE dc.id = any(%s)
+            WINDOW w AS (
+                partition by dc.id, at.access_type, to_char(series.mon, 'YYYY') ORDER BY series.mon
+            )
+            ORDER BY dc.id, at.access_type, series.mon;
         """
 
-        # group results by access_type
-        grouped = {}
+        grouped_by_catalog = {}
 
         with connection.cursor() as cr:
-            for access_type in access_types:
-                cr.execute(sql, [dc_id, access_type, from_date, to_date, dc_id, access_type])
-                results = [
-                    dict(zip([col[0] for col in cr.description], row)) for row in cr.fetchall()
-                ]
-                grouped[access_type.split("/")[-1]] = results
-
-        total = []
-
-        # sum totals for this data catalog
-        for group in grouped.values():
-            for i, stats in enumerate(group):
-                try:
-                    last = total[i]
-                except IndexError:
-                    total.append(stats)
-                else:
-                    last["count"] += stats["count"]
-                    last["count_cumulative"] += stats["count_cumulative"]
-                    last["ida_byte_size"] += stats["ida_byte_size"]
-                    last["ida_byte_size_cumulative"] += stats["ida_byte_size_cumulative"]
-
-        grouped["total"] = total
-
-        _logger.info("Done retrieving total count and byte sizes")
-
-        return grouped
+            cr.execute(sql, [from_date, to_date, dc_ids])
+            columns = [col[0] for col in cr.description]
+            for row in cr.fetchall():
+                stats = dict(zip(columns, row))
+                dc_id = stats.pop("data_catalog_id")
+                access_type = stats.pop("access_type").split("/")[-1]
+                grouped = grouped_by_catalog.setdefault(dc_id, {})
+                grouped.setdefault(access_type, []).append(stats)
+
+        for grouped in grouped_by_catalog.values():
+            total = []
+
+            # sum totals for this data catalog
+            for group in grouped.values():
+                for i, stats in enumerate(group):
+                    try:
+                        last = total[i]
+                    except IndexError:
+                        total.append(dict(stats))
+                    else:
+                        last["count"] += stats["count"]
+                        last["count_cumulative"] += stats["count_cumulative"]
+                        last["ida_byte_size"] += stats["ida_byte_size"]
+                        last["ida_byte_size_cumulative"] += stats["ida_byte_size_cumulative"]
+
+            grouped["total"] = total
+
+        return grouped_by_catalog
 
     @classmethod
     def total_organization_datasets(cls, from_date, to_date, metadata_owner_org=None, latest=True, legacy=None, removed=None):
@@ -371,7 +374,7 @@ class StatisticService:
             WITH cte AS (
                 SELECT
                     date_trunc('month', cr.date_created) AS mon,
-                    SUM(COALESCE((cr.research_dataset->>'total_files_byte_size')::bigint, 0)) AS mon_ida_byte_size
+                    SUM(COALESCE(cr.rd_total_files_byte_size, 0)) AS mon_ida_byte_size
                 FROM metax_api_catalogrecord cr
                 JOIN metax_api_datacatalog as dc on dc.id = cr.data_catalog_id
                 where dc.id = %s
@@ -486,12 +489,12 @@ class StatisticService:
                     count(cr.id) AS count,
                     date_trunc('month', cr.date_created) AS mon,
                     reverse(
-                        split_part(reverse(cr.research_dataset->'access_rights'->'access_type'->>'identifier'), '/', 1)
+                        split_part(reverse(cr.rd_access_type), '/', 1)
                         ) as access_type
                 FROM metax_api_catalogrecord AS cr
                 JOIN metax_api_datacatalog as dc on dc.id = cr.data_catalog_id
                 where (dc.catalog_json->>'harvested')::boolean = true
-                and cr.research_dataset->'access_rights'->'access_type'->>'identifier' = %s
+                and cr.rd_access_type = %s
                 GROUP BY mon, access_type
             ) cr USING (mon)
             GROUP BY mon, count, access_type
@@ -644,6 +647,116 @@ class StatisticService:
             return file_query.aggregate(count=Count("id"), byte_size=Coalesce(Sum("byte_size"), 0)), list(file_query.values_list('identifier', flat=True))
         return file_query.aggregate(count=Count("id"), byte_size=Coalesce(Sum("byte_size"), 0))
 
+    @classmethod
+    def count_files_by_project_and_storage(cls, file_storages):
+        """
+        Get count and byte size of non-removed files which belong to some published dataset, and
+        preferred identifiers of the published datasets of those files, grouped by project and
+        file storage. Only files of the given file storages are included.
+        """
+        _logger.info("Retrieving file counts and byte sizes by project and file storage...")
+
+        sql = """
+            with published_files as (
+                select f.id, f.project_identifier, f.file_storage_id, f.byte_size, f.active
+                from metax_api_file as f
+                where f.removed = false
+                and f.file_storage_id = any(%s)
+                and exists (
+                    select
+                    from metax_api_catalogrecord_files as cr_f
+                    join metax_api_catalogrecord as cr on cr.id = cr_f.catalogrecord_id
+                    where cr_f.file_id = f.id
+                    and cr.state = 'published'
+                    and cr.removed = false
+                )
+            ),
+            file_stats as materialized (
+                select
+                    project_identifier,
+                    file_storage_id,
+                    count(id) as count,
+                    coalesce(sum(byte_size), 0) as byte_size
+                from published_files
+                group by project_identifier, file_storage_id
+            ),
+            dataset_pids as materialized (
+                select
+                    f.project_identifier,
+                    f.file_storage_id,
+                    array_agg(distinct cr.rd_preferred_identifier) as published_datasets
+                from (
+                    select distinct f.project_identifier, f.file_storage_id, cr_f.catalogrecord_id
+                    from published_files as f
+                    join metax_api_catalogrecord_files as cr_f on cr_f.file_id = f.id
+                    where f.active = true
+                ) as f
+                join metax_api_catalogrecord as cr on cr.id = f.catalogrecord_id
+                where cr.state = 'published'
+                and cr.active = true and cr.removed = false and cr.deprecated = false
+                group by f.project_identifier, f.file_storage_id
+            )
+            select fs.*, coalesce(dp.published_datasets, '{}') as published_datasets
+            from file_stats as fs
+            left join dataset_pids as dp
+                on dp.project_identifier = fs.project_identifier
+                and dp.file_storage_id = fs.file_storage_id
+        """
+
+        with connection.cursor() as cr:
+            cr.execute(sql, [[fs.id for fs in file_storages]])
+            results = [dict(zip([col[0] for col in cr.description], row)) for row in cr.fetchall()]
+
+        _logger.info("Done retrieving file counts and byte sizes")
+
+        return results
+
+    @classmethod
+    def count_datasets_by_organization_and_catalog(cls, latest=True, legacy=None, removed=None):
+        """
+        Get count and total byte size of published datasets, grouped by metadata provider
+        organization and data catalog.
+        """
+        _logger.info("Retrieving dataset counts and byte sizes by organization and data catalog...")
+
+        sql = """
+            select
+                cr.metadata_provider_org,
+                dc.catalog_json->>'identifier' as data_catalog,
+                count(cr.id) as count,
+                COALESCE(SUM(COALESCE(rd_total_files_byte_size, 0)), 0) AS ida_byte_size
+            from metax_api_catalogrecord as cr
+            join metax_api_datacatalog as dc on dc.id = cr.data_catalog_id
+            where state = 'published'
+            %s
+            group by cr.metadata_provider_org, dc.catalog_json->>'identifier'
+        """
+        where_args = []
+        sql_args = []
+
+        if latest:
+            where_args.append("and next_dataset_version_id is null")
+
+        if removed is not None:
+            where_args.append("and cr.removed = %s")
+            sql_args.append(removed)
+
+        if legacy is not None:
+            where_args.append(
+                ''.join(["and", " " if legacy else " NOT ", "dc.catalog_json->>'identifier'", " = ", "any(%s)"])
+            )
+            sql_args.append(settings.LEGACY_CATALOGS)
+
+        sql = sql % "\n".join(where_args)
+
+        with connection.cursor() as cr:
+            cr.execute(sql, sql_args)
+            results = [dict(zip([col[0] for col in cr.description], row)) for row in cr.fetchall()]
+
+        _logger.info("Done retrieving dataset counts and byte sizes")
+
+        return results
+
     @classmethod
     def projects_summary(cls, projects):
         stats_query = ProjectStatistics.objects.all()
@@ -56,6 +56,8 @@ env = environ.Env(
     ),
     OAI_BASE_URL=(str, "https://metax.fd-dev.csc.fi/oai/"),
     OAI_BATCH_SIZE=(int, 25),
+    OAI_METADATA_CACHE_ENABLED=(bool, True),
+    OAI_METADATA_CACHE_MAX_ENTRIES=(int, 200000),
     OAI_REPOSITORY_NAME=(str, "Metax"),
     PID_MS_CATALOGS_TO_MIGRATE=(
         list,
@@ -77,9 +79,12 @@ env = environ.Env(
     REDIS_PORT=(int, 6379),
     REDIS_TEST_DB=(int, 15),
     REDIS_USE_PASSWORD=(bool, False),
+    REFERENCE_DATA_VERSION_CHECK_INTERVAL=(int, 60),
     REMS_ENABLED=(bool, False),
     SERVER_DOMAIN_NAME=(str, "metax.fd-dev.csc.fi"),
     STATIC_ROOT=(str, join(BASE_DIR.parent, "static")),
+    TOKEN_VALIDATION_CACHE_MAX_ENTRIES=(int, 10000),
+    TOKEN_VALIDATION_CACHE_TTL=(int, 60),
     VALIDATE_TOKEN_URL=(str, "https://127.0.0.1/secure/validate_token"),
     WKT_FILENAME=(str, join(REFDATA_INDEXER_PATH, "resources", "uri_to_wkt.json")),
     SWAGGER_YAML_PATH=(str, join(BASE_DIR, "metax_api", "swagger")),
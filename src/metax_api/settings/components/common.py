@@ -32,6 +32,12 @@ LEGACY_CATALOGS = [
 ]
 
 VALIDATE_TOKEN_URL = env("VALIDATE_TOKEN_URL")
+# successfully validated bearer tokens, kept in process memory for TTL seconds at most,
+# and never after the token expires. TTL 0 disables the cache
+TOKEN_VALIDATION_CACHE = {
+    "MAX_ENTRIES": env("TOKEN_VALIDATION_CACHE_MAX_ENTRIES"),
+    "TTL": env("TOKEN_VALIDATION_CACHE_TTL"),
+}
 CHECKSUM_ALGORITHMS = ["SHA-256", "MD5", "SHA-512"]
 ERROR_FILES_PATH = env("ERROR_FILES_PATH")
 
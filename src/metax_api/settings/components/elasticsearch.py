@@ -9,5 +9,7 @@ ELASTICSEARCH = {
 ALWAYS_RELOAD_REFERENCE_DATA_ON_RESTART = env("ALWAYS_RELOAD_REFERENCE_DATA_ON_RESTART")
 # Used if ALWAYS_RELOAD_REFERENCE_DATA_ON_RESTART is False
 REFERENCE_DATA_RELOAD_INTERVAL = 86400
+# How often (seconds) processes check if reference data in cache has changed
+REFERENCE_DATA_VERSION_CHECK_INTERVAL = env("REFERENCE_DATA_VERSION_CHECK_INTERVAL")
 
 ES_CONFIG_DIR = env("ES_CONFIG_DIR")
@@ -15,6 +15,12 @@ OAI = {
         "ida_datasets": [IDA_DATA_CATALOG_IDENTIFIER],
         "att_datasets": [ATT_DATA_CATALOG_IDENTIFIER],
     },
+    # rendered oai_dc and datacite metadata of datasets, stored in redis
+    "METADATA_CACHE": {
+        "ENABLED": env("OAI_METADATA_CACHE_ENABLED"),
+        "MAX_ENTRIES": env("OAI_METADATA_CACHE_MAX_ENTRIES"),
+        "TTL": 14 * 24 * 3600,
+    },
 }
 DATACITE = {
     "USERNAME": env("DATACITE_USERNAME"),
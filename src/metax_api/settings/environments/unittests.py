@@ -76,6 +76,14 @@ REMS.update(
     }
 )
 
+from metax_api.settings.components.externals import OAI
+# cached metadata would leak between test cases, since test data is reloaded with the same identifiers
+OAI["METADATA_CACHE"]["ENABLED"] = False
+
+from metax_api.settings.components.common import TOKEN_VALIDATION_CACHE
+# token validation responses are mocked per test case
+TOKEN_VALIDATION_CACHE["TTL"] = 0
+
 from metax_api.settings.components.metax_v3 import METAX_V3
 METAX_V3["INTEGRATION_ENABLED"] = False
 METAX_V3["PROTOCOL"] = "http"
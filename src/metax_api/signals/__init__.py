@@ -2,4 +2,3 @@ from django.conf import settings
 
 if settings.ENABLE_SIGNALS:
     from .post_delete import *
-    from .request_finished import *
\ No newline at end of file
@@ -5,5 +5,6 @@
 # :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
 # :license: MIT
 
+from .metadata_cache import *
 from .minimal_api import *
 from .syke import *
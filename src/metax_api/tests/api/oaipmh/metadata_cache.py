@@ -0,0 +1,146 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+from oaipmh.error import CannotDisseminateFormatError
+
+from metax_api.api.oaipmh.base.metadata_cache import OAIMetadataCache
+from metax_api.api.oaipmh.base.metax_oai_server import (
+    CACHED_MDPREFIXES,
+    OAI_DATACITE_MDPREFIX,
+    OAI_DC_MDPREFIX,
+    MetaxOAIServer,
+)
+from metax_api.models import CatalogRecord
+
+
+class FakeRedisClient:
+    """
+    Stands in for RedisClient, including the sorted set operations of its master node
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.index = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, **kwargs):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+    def get_master(self):
+        return self
+
+    def zadd(self, name, mapping):
+        self.index.update(mapping)
+
+    def zcard(self, name):
+        return len(self.index)
+
+    def zpopmin(self, name, count):
+        popped = sorted(self.index.items(), key=lambda item: item[1])[:count]
+        for key, _ in popped:
+            del self.index[key]
+        return popped
+
+    def zrem(self, name, *keys):
+        for key in keys:
+            self.index.pop(key, None)
+
+
+class CountingOAIServer(MetaxOAIServer):
+    def __init__(self, cache, error=None):
+        self._metadata_cache = cache
+        self.error = error
+        self.render_count = 0
+
+    def _render_metadata_for_record(self, record, metadataPrefix):
+        self.render_count += 1
+        if self.error:
+            raise CannotDisseminateFormatError(self.error)
+        return {"title": [f"{metadataPrefix} of {record.id}"]}
+
+
+@override_settings(
+    OAI=dict(settings.OAI, METADATA_CACHE={"ENABLED": True, "MAX_ENTRIES": 3, "TTL": 60})
+)
+class OAIMetadataCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = OAIMetadataCache(client=FakeRedisClient())
+        self.date_created = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+    def _get_record(self, id, date_modified=None):
+        return CatalogRecord(
+            id=id, date_created=self.date_created, date_modified=date_modified, research_dataset={}
+        )
+
+    def test_metadata_is_rendered_once(self):
+        server = CountingOAIServer(self.cache)
+        record = self._get_record(1)
+
+        first = server._get_metadata_for_record(record, OAI_DC_MDPREFIX)
+        second = server._get_metadata_for_record(record, OAI_DC_MDPREFIX)
+
+        self.assertEqual(first, second)
+        self.assertEqual(server.render_count, 1)
+
+    def test_modified_record_is_rendered_again(self):
+        server = CountingOAIServer(self.cache)
+        server._get_metadata_for_record(self._get_record(1), OAI_DC_MDPREFIX)
+
+        modified = self._get_record(1, date_modified=self.date_created + timedelta(days=1))
+        server._get_metadata_for_record(modified, OAI_DC_MDPREFIX)
+        server._get_metadata_for_record(modified, OAI_DC_MDPREFIX)
+
+        self.assertEqual(server.render_count, 2)
+
+    def test_dissemination_error_is_cached(self):
+        server = CountingOAIServer(self.cache, error="not datacite compatible")
+        record = self._get_record(1)
+
+        for _ in range(2):
+            with self.assertRaises(CannotDisseminateFormatError):
+                server._get_metadata_for_record(record, OAI_DATACITE_MDPREFIX)
+
+        self.assertEqual(server.render_count, 1)
+
+    def test_update_metadata_cache(self):
+        server = CountingOAIServer(self.cache)
+        record = self._get_record(1)
+
+        server.update_metadata_cache(record)
+        server.update_metadata_cache(record)
+        self.assertEqual(server.render_count, len(CACHED_MDPREFIXES))
+
+        server.update_metadata_cache(record, refresh=True)
+        self.assertEqual(server.render_count, 2 * len(CACHED_MDPREFIXES))
+
+    def test_oldest_entries_are_evicted(self):
+        for id in range(1, 6):
+            self.cache.set(self._get_record(id), OAI_DC_MDPREFIX, metadata={})
+
+        self.assertEqual(len(self.cache.client.data), 3)
+        self.assertIsNone(self.cache.get(self._get_record(1), OAI_DC_MDPREFIX))
+        self.assertIsNotNone(self.cache.get(self._get_record(5), OAI_DC_MDPREFIX))
+
+    def test_redis_errors_are_ignored(self):
+        class BrokenClient:
+            def __getattr__(self, name):
+                raise ConnectionError("redis is down")
+
+        server = CountingOAIServer(OAIMetadataCache(client=BrokenClient()))
+        metadata = server._get_metadata_for_record(self._get_record(1), OAI_DC_MDPREFIX)
+
+        self.assertEqual(metadata, {"title": ["oai_dc of 1"]})
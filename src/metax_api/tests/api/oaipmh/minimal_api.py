@@ -8,6 +8,7 @@
 import lxml.etree
 from django.conf import settings
 from django.core.management import call_command
+from django.test import override_settings
 from lxml.etree import Element
 from oaipmh import common
 from rest_framework import status
@@ -164,6 +165,46 @@ class OAIPMHReadTests(APITestCase, TestClassUtils):
         records = self._get_results(response.content, "//o:header")
         self.assertTrue(len(records) == len(allRecords), len(records))
 
+    def _harvest(self, verb, params):
+        """
+        Follow resumption tokens until the end, and return the number of pages and the
+        identifiers of all harvested headers.
+        """
+        pages = 0
+        identifiers = []
+        url = f"/oai/?verb={verb}&{params}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            identifiers.extend(
+                e.text for e in self._get_results(response.content, "//o:header/o:identifier")
+            )
+            pages += 1
+            tokens = self._get_results(response.content, "//o:resumptionToken")
+            url = f"/oai/?verb={verb}&resumptionToken={tokens[0].text}" if tokens else None
+        return pages, identifiers
+
+    @override_settings(OAI=dict(settings.OAI, BATCH_SIZE=4))
+    def test_list_identifiers_harvest_all_pages(self):
+        all_identifiers = CatalogRecord.objects.filter(
+            data_catalog__catalog_json__identifier__in=MetaxOAIServer._get_default_set_filter()
+        ).values_list("identifier", flat=True)
+
+        pages, identifiers = self._harvest("ListIdentifiers", "metadataPrefix=oai_dc")
+
+        self.assertEqual(sorted(identifiers), sorted(all_identifiers))
+        self.assertEqual(pages, -(-len(all_identifiers) // 4))
+
+    @override_settings(OAI=dict(settings.OAI, BATCH_SIZE=4))
+    def test_list_records_harvest_all_pages(self):
+        all_identifiers = CatalogRecord.objects.filter(
+            data_catalog__catalog_json__identifier__in=[ATT_CATALOG]
+        ).values_list("identifier", flat=True)
+
+        pages, identifiers = self._harvest("ListRecords", "metadataPrefix=oai_dc&set=att_datasets")
+
+        self.assertEqual(sorted(identifiers), sorted(all_identifiers))
+
     # VERB: ListRecords
 
     def test_list_records(self):
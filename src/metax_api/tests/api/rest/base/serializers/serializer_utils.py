@@ -9,11 +9,13 @@ from django.core.management import call_command
 from rest_framework.serializers import ValidationError
 from rest_framework.test import APITestCase
 
-from metax_api.api.rest.base.serializers import validate_json
+from metax_api.api.rest.base.serializers import CatalogRecordSerializer, validate_json
 from metax_api.models import CatalogRecord
+from metax_api.services import CommonService as CS
 from metax_api.tests.utils import TestClassUtils, get_json_schema, test_data_file_path
 
 schema = get_json_schema("ida_dataset")
+schema_dir = CatalogRecordSerializer._schemas_directory_path
 
 
 class ValidateJsonTests(APITestCase, TestClassUtils):
@@ -97,3 +99,65 @@ class ValidateJsonTests(APITestCase, TestClassUtils):
         rd["modified"] = "2018-09-29 20:20:20+03:00"
         with self.assertRaises(ValidationError):
             validate_json(rd, schema)
+
+
+class JsonSchemaCacheTests(APITestCase, TestClassUtils):
+
+    """
+    Test that json schemas and their validators are created only once per process.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        call_command("loaddata", test_data_file_path, verbosity=0)
+        super().setUpClass()
+
+    def test_schema_and_validator_are_cached(self):
+        cached_schema = CS.get_json_schema(schema_dir, "dataset")
+        self.assertIs(CS.get_json_schema(schema_dir + "/", "dataset", "ida"), cached_schema)
+        self.assertIs(CS.get_json_schema(schema_dir, "dataset", "nonexisting"), cached_schema)
+        self.assertEqual(cached_schema, schema)
+
+        validator = CS.get_json_schema_validator(cached_schema)
+        self.assertIs(CS.get_json_schema_validator(cached_schema), validator)
+        self.assertIsNot(
+            CS.get_json_schema_validator(cached_schema, format_checker=False), validator
+        )
+
+        # schemas not loaded through the cache get a new validator every time
+        self.assertIsNot(CS.get_json_schema_validator(schema), CS.get_json_schema_validator(schema))
+
+    def test_cached_validator_checks_formats(self):
+        cached_schema = CS.get_json_schema(schema_dir, "dataset")
+        rd = CatalogRecord.objects.values("research_dataset").get(pk=1)["research_dataset"]
+
+        rd["issued"] = "2018-09-29"
+        validate_json(rd, cached_schema)
+
+        rd["issued"] = "2018-09-29T20:20:20+03:00"
+        with self.assertRaises(ValidationError):
+            validate_json(rd, cached_schema)
+
+    def test_derived_schema_is_cached(self):
+        cached_schema = CS.get_json_schema(schema_dir, "dataset")
+        calls = []
+
+        def derive(schema_copy):
+            calls.append(schema_copy)
+            schema_copy.pop("allOf")
+            return schema_copy
+
+        derived_schema = CS.get_derived_json_schema(
+            cached_schema, "test_no_research_dataset", derive
+        )
+        self.assertIs(
+            CS.get_derived_json_schema(cached_schema, "test_no_research_dataset", derive),
+            derived_schema,
+        )
+        self.assertEqual(len(calls), 1)
+        self.assertNotIn("allOf", derived_schema)
+        self.assertIn("allOf", cached_schema)
+
+        validate_json({}, derived_schema)
+        with self.assertRaises(ValidationError):
+            validate_json({}, cached_schema)
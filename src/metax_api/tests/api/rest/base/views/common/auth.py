@@ -8,11 +8,16 @@
 import json
 import logging
 import os
+from time import time
+from unittest.mock import patch
 
 import responses
 from django.conf import settings
+from django.test import override_settings
 from rest_framework import status
 
+from metax_api.middleware.identifyapicaller import token_validation_cache
+from metax_api.services import AuthService
 from metax_api.tests.api.rest.base.views.datasets.write import CatalogRecordApiWriteCommon
 from metax_api.tests.utils import get_test_oidc_token
 
@@ -180,6 +185,75 @@ class ApiEndUserAccessAuthorization(CatalogRecordApiWriteCommon):
         # ALLOWED_AUTH_METHODS
 
 
+@override_settings(TOKEN_VALIDATION_CACHE={"MAX_ENTRIES": 2, "TTL": 60})
+class ApiEndUserTokenValidationCache(CatalogRecordApiWriteCommon):
+
+    """
+    Test that successfully validated bearer tokens are not validated again on every request.
+    """
+
+    def setUp(self):
+        super().setUp()
+        token_validation_cache.clear()
+        self.addCleanup(token_validation_cache.clear)
+
+    def _use_token(self, **claims):
+        token = get_test_oidc_token()
+        token["exp"] = int(time()) + 3600
+        token.update(claims)
+        self._use_http_authorization(method="bearer", token=token)
+
+    @responses.activate
+    def test_validated_token_is_cached(self):
+        self._mock_token_validation_succeeds()
+        self._use_token()
+
+        for i in range(3):
+            response = self.client.get("/rest/datasets/1")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.assertEqual(len(responses.calls), 1)
+
+        stats = token_validation_cache.stats()
+        self.assertEqual(stats["hits"], 2)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["validations"], 1)
+
+    @responses.activate
+    def test_failed_validation_is_not_cached(self):
+        self._mock_token_validation_fails()
+        self._use_token()
+
+        for i in range(2):
+            response = self.client.get("/rest/datasets/1")
+            self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_expired_token_is_not_cached(self):
+        self._mock_token_validation_succeeds()
+        self._use_token(exp=int(time()) - 1)
+
+        for i in range(2):
+            self.client.get("/rest/datasets/1")
+
+        self.assertEqual(len(responses.calls), 2)
+
+    @responses.activate
+    def test_cache_size_is_limited(self):
+        self._mock_token_validation_succeeds()
+
+        for user in ("user1", "user2", "user3", "user1"):
+            self._use_token(CSCUserName=user)
+            response = self.client.get("/rest/datasets/1")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # user1 was evicted by user3
+        self.assertEqual(len(responses.calls), 4)
+        self.assertEqual(token_validation_cache.stats()["entries"], 2)
+
+
 class ApiEndUserAdditionalProjects(CatalogRecordApiWriteCommon):
 
     """
@@ -257,3 +331,34 @@ class ApiEndUserAdditionalProjects(CatalogRecordApiWriteCommon):
 
         response = self.client.get("/rest/files?project_identifier=2001036", format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+    def test_file_is_parsed_only_when_changed(self):
+        """
+        The local file is parsed again only after it has been modified.
+        """
+
+        def write_testdata(testdata):
+            if os.path.exists(settings.ADDITIONAL_USER_PROJECTS_PATH):
+                os.remove(settings.ADDITIONAL_USER_PROJECTS_PATH)
+            with open(settings.ADDITIONAL_USER_PROJECTS_PATH, "w+") as testfile:
+                json.dump(testdata, testfile, indent=4)
+
+        write_testdata({"testuser": ["some_project", "project_x"]})
+
+        with patch("metax_api.services.auth_service.json.load", wraps=json.load) as json_load:
+            for i in range(3):
+                projects = AuthService.get_additional_user_projects_from_file("testuser")
+                self.assertEqual(projects, {"some_project", "project_x"})
+            self.assertEqual(AuthService.get_additional_user_projects_from_file("other"), set())
+            self.assertEqual(json_load.call_count, 1)
+
+            write_testdata({"testuser": ["project_y"], "other": ["project_z"]})
+
+            projects = AuthService.get_additional_user_projects_from_file("testuser")
+            self.assertEqual(projects, {"project_y"})
+            projects = AuthService.get_additional_user_projects_from_file("other")
+            self.assertEqual(projects, {"project_z"})
+            self.assertEqual(json_load.call_count, 2)
+
+        os.remove(settings.ADDITIONAL_USER_PROJECTS_PATH)
+        self.assertEqual(AuthService.get_additional_user_projects_from_file("testuser"), set())
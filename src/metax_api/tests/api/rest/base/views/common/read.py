@@ -142,6 +142,95 @@ class ApiReadPaginationTests(CatalogRecordApiReadCommon):
 
                 self.assertEqual(from_api, from_db)
 
+    def test_cursor_pagination(self):
+        ids = []
+        url = "/rest/datasets?cursor=&limit=4"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual("count" in response.data, False)
+            self.assertEqual(len(response.data["results"]) <= 4, True)
+            ids.extend(cr["id"] for cr in response.data["results"])
+            url = response.data["next"]
+
+        self.assertEqual(
+            ids, list(CatalogRecord.objects.order_by("id").values_list("id", flat=True))
+        )
+
+    def test_cursor_pagination_ordering(self):
+        response = self.client.get("/rest/files?cursor=&limit=5&ordering=-id")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first_page = [f["id"] for f in response.data["results"]]
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        second_page = [f["id"] for f in response.data["results"]]
+
+        from_db = list(File.objects.order_by("-id").values_list("id", flat=True)[:10])
+        self.assertEqual(first_page + second_page, from_db)
+
+    def test_cursor_pagination_invalid_cursor(self):
+        response = self.client.get("/rest/datasets?cursor=invalid")
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def _get_all_pages_using_cursor(self, url):
+        ids = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+            ids.extend(cr["id"] for cr in response.data["results"])
+            url = response.data["next"]
+        return ids
+
+    def test_cursor_pagination_ordering_date_modified(self):
+        """
+        Records without date_modified are ordered by date_created, and records with the same
+        timestamp by id, so that every record is returned exactly once.
+        """
+        ids = list(CatalogRecord.objects.order_by("id").values_list("id", flat=True))
+        timestamp = CatalogRecord.objects.get(pk=ids[0]).date_created
+        CatalogRecord.objects.filter(pk__in=ids[:3]).update(date_modified=None)
+        CatalogRecord.objects.filter(pk__in=ids[3:8]).update(date_modified=timestamp)
+        CatalogRecord.objects.filter(pk__in=ids[8:10]).update(
+            date_modified=timestamp + timedelta(days=1)
+        )
+
+        records = CatalogRecord.objects.values_list("id", "date_modified", "date_created")
+        expected = [
+            id
+            for id, date_modified, date_created in sorted(
+                records, key=lambda cr: (cr[1] or cr[2], cr[0])
+            )
+        ]
+
+        ids = self._get_all_pages_using_cursor(
+            "/rest/datasets?cursor=&limit=3&ordering=date_modified"
+        )
+        self.assertEqual(ids, expected)
+
+        ids = self._get_all_pages_using_cursor(
+            "/rest/datasets?cursor=&limit=3&ordering=-date_modified"
+        )
+        self.assertEqual(ids, list(reversed(expected)))
+
+    def test_cursor_pagination_previous(self):
+        response = self.client.get("/rest/datasets?cursor=&limit=3&ordering=date_created")
+        first_page = [cr["id"] for cr in response.data["results"]]
+        self.assertEqual(response.data["previous"], None)
+
+        response = self.client.get(response.data["next"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        response = self.client.get(response.data["previous"])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual([cr["id"] for cr in response.data["results"]], first_page)
+        self.assertEqual(response.data["previous"], None)
+
+    def test_cursor_pagination_unsupported_ordering(self):
+        response = self.client.get("/rest/datasets?cursor=&ordering=preservation_state")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+
+
 class ApiReadHTTPHeaderTests(CatalogRecordApiReadCommon):
     #
     # header if-modified-since tests, single
@@ -8,8 +8,9 @@ import copy
 
 import responses
 from django.core.management import call_command
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.models import Count, Sum
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
@@ -241,6 +242,41 @@ class DirectoryApiReadFileBrowsingTests(DirectoryApiReadCommon):
         self.assertEqual("directories" in response.data, True)
         self.assertEqual("directories" in response.data["directories"][0], True)
 
+    def test_read_directory_recursively_query_count_does_not_depend_on_depth(self):
+        """
+        The directory tree is retrieved with a fixed number of queries, instead of querying
+        the contents of each subdirectory separately.
+        """
+        query_counts = []
+        for depth in (1, "*"):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(
+                    "/rest/directories/2/files?recursive=true&depth=%s" % depth
+                )
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            query_counts.append(len(queries))
+
+        self.assertEqual(query_counts[0], query_counts[1])
+
+    def test_read_directory_recursively_files_in_depth_first_order(self):
+        """
+        Files of a directory are followed by files of its subdirectories, same as when browsing
+        the tree one directory at a time.
+        """
+        response = self.client.get("/rest/directories/2/files?recursive=true&depth=*")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        expected = []
+
+        def _collect_files(dir_id):
+            data = self.client.get("/rest/directories/%d/files" % dir_id).data
+            expected.extend(f["id"] for f in data["files"])
+            for sub_dir in data["directories"]:
+                _collect_files(sub_dir["id"])
+
+        _collect_files(2)
+        self.assertEqual([f["id"] for f in response.data], expected)
+
     def test_read_directory_return_directories_only(self):
         response = self.client.get("/rest/directories/3/files?directories_only")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
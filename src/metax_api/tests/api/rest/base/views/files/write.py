@@ -6,15 +6,19 @@
 # :license: MIT
 
 from copy import deepcopy
-from os.path import dirname
+from os.path import basename, dirname
+from unittest.mock import patch
 
 import responses
 from django.core.management import call_command
+from django.db import connection
 from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
 from rest_framework import status
 from rest_framework.test import APITestCase
 
 from metax_api.models import CatalogRecord, Directory, File
+from metax_api.services import FileService, RabbitMQService
 from metax_api.services.redis_cache_service import RedisClient
 from metax_api.tests.utils import TestClassUtils, get_test_oidc_token, test_data_file_path
 
@@ -445,6 +449,29 @@ class FileApiWriteCreateTests(FileApiWriteCommon):
             "The error should have been about an already existing identifier",
         )
 
+    def test_create_file_list_error_file_path_exists(self):
+        existing_file = File.objects.get(pk=1)
+        self.test_new_data["identifier"] = "urn:nbn:fi:csc-thisisanewurn"
+        self.test_new_data["project_identifier"] = existing_file.project_identifier
+        self.test_new_data["file_path"] = existing_file.file_path
+        self.second_test_new_data["identifier"] = "urn:nbn:fi:csc-thisisanewurnalso"
+        self.second_test_new_data["project_identifier"] = existing_file.project_identifier
+        self._change_file_path(self.second_test_new_data, "two_file.txt")
+
+        response = self.client.post(
+            "/rest/files",
+            [self.test_new_data, self.second_test_new_data],
+            format="json",
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self.assertEqual(len(response.data["success"]), 1, response.data)
+        self.assertEqual(len(response.data["failed"]), 1, response.data)
+        self.assertEqual(
+            "file_path" in response.data["failed"][0]["errors"],
+            True,
+            "The error should have been about an already existing file_path",
+        )
+
     def test_parameter_ignore_already_exists_errors(self):
         newly_created_file_name = "newly_created_file_name"
         self.test_new_data["file_name"] = newly_created_file_name
@@ -569,6 +596,31 @@ class FileApiWriteCreateDirectoriesTests(FileApiWriteCommon):
         dirs_dict = self._assert_directory_parent_dirs("project_y")
         self._assert_file_parent_dirs(dirs_dict, response)
 
+    def test_create_file_hierarchy_inserts_directories_one_level_at_a_time(self):
+        """
+        New directories are bulk inserted per directory level, instead of one by one.
+        """
+        experiment_1_file_list = self._form_complex_list_from_test_file()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post("/rest/files", experiment_1_file_list, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        dirs = Directory.objects.filter(project_identifier="project_y")
+        levels = set(0 if d.directory_path == "/" else d.directory_path.count("/") for d in dirs)
+        dir_inserts = [
+            q for q in queries if q["sql"].startswith('INSERT INTO "metax_api_directory"')
+        ]
+        self.assertEqual(len(dir_inserts), len(levels))
+        self.assertEqual(len(set(d.identifier for d in dirs)), len(dirs))
+        self.assertEqual(
+            all(d.directory_name == basename(d.directory_path) for d in dirs if d.directory_path != "/"),
+            True,
+        )
+
+        dirs_dict = self._assert_directory_parent_dirs("project_y")
+        self._assert_file_parent_dirs(dirs_dict, response)
+
     def test_create_file_hierarchy_from_file_list_with_existing_files(self):
         """
         Create a file hierarchy for a project which already has files or directories
@@ -1353,6 +1405,49 @@ class FileApiWriteDeleteTests(FileApiWriteCommon):
             "dir should have been deleted",
         )
 
+    def test_delete_files_prunes_only_empty_directories(self):
+        """
+        Deleting files should delete only those directories above them, which no longer
+        contain files anywhere in their subtree.
+        """
+        project_identifier = "project_z"
+        file_paths = ["/a/b/c1/x", "/a/b/c2/y", "/a/z"]
+        file_ids = []
+        for i, file_path in enumerate(file_paths):
+            test_data = deepcopy(self.test_new_data)
+            test_data["file_path"] = file_path
+            test_data["file_name"] = basename(file_path)
+            test_data["project_identifier"] = project_identifier
+            test_data["identifier"] = "prune_%d" % i
+            response = self.client.post("/rest/files", test_data, format="json")
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+            file_ids.append(response.data["id"])
+
+        def get_directory_paths():
+            return set(
+                Directory.objects.filter(project_identifier=project_identifier).values_list(
+                    "directory_path", flat=True
+                )
+            )
+
+        response = self.client.delete("/rest/files/%d" % file_ids[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(get_directory_paths(), {"/", "/a", "/a/b", "/a/b/c2"})
+        self.assertEqual(File.objects_unfiltered.get(pk=file_ids[0]).parent_directory_id, None)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.delete("/rest/files", [file_ids[1]], format="json")
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(get_directory_paths(), {"/", "/a"})
+        self.assertEqual(
+            len([q for q in ctx.captured_queries if "metax_api_directory" in q["sql"]]) < 10,
+            True,
+        )
+
+        response = self.client.delete("/rest/files", [file_ids[2]], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(get_directory_paths(), set())
+
     def _assert_files_available_and_removed(self, project_identifier, available, removed):
         """
         After deleting files, check qty of files retrievable by usual means is as expected,
@@ -1382,6 +1477,37 @@ class FileApiWriteDeleteTests(FileApiWriteCommon):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(CatalogRecord.objects.filter(deprecated=True).count(), datasets_with_file)
 
+    def test_deleting_files_publishes_deprecated_datasets(self):
+        """
+        Datasets are deprecated in bulk, and published to rabbitmq as if they were serialized
+        one by one.
+        """
+        RabbitMQService.messages = []
+        record_ids = set(
+            CatalogRecord.objects.filter(
+                files__id__in=[1, 2], deprecated=False, state="published"
+            ).values_list("id", flat=True)
+        )
+        self.assertEqual(len(record_ids) > 1, True)
+
+        response = self.client.delete("/rest/files", [1, 2], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+
+        messages = [
+            m["body"]
+            for m in RabbitMQService.messages
+            if m["routing_key"] == "update" and m["exchange"] == "datasets"
+        ]
+        self.assertEqual({m["id"] for m in messages}, record_ids)
+
+        for message in messages:
+            cr = CatalogRecord.objects.get(pk=message["id"])
+            self.assertEqual(cr.deprecated, True)
+            self.assertEqual(cr.date_deprecated, cr.date_modified)
+            expected = cr.serializer_class(cr).data
+            expected["data_catalog"] = {"catalog_json": cr.data_catalog.catalog_json}
+            self.assertEqual(message, expected)
+
 
 class FileApiWriteRestoreTests(FileApiWriteCommon):
     def test_restore_files_ok(self):
@@ -1465,6 +1591,81 @@ class FileApiWriteRestoreTests(FileApiWriteCommon):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
 
+class FileApiWriteDirectoryByteSizesTests(FileApiWriteCommon):
+    """
+    Directory byte sizes and file counts are updated incrementally when files are created,
+    deleted and restored. Verify the results against a full re-calculation of the project.
+    """
+
+    def _assert_directory_byte_sizes_and_file_counts(self, project_identifier):
+        def get_directories():
+            return {
+                d["id"]: d
+                for d in Directory.objects.filter(project_identifier=project_identifier).values(
+                    "id", "byte_size", "file_count"
+                )
+            }
+
+        directories = get_directories()
+        FileService.calculate_project_directory_byte_sizes_and_file_counts(project_identifier)
+        self.assertEqual(directories, get_directories())
+
+    def _get_new_files(self, count):
+        files = []
+        for i in range(count):
+            f = deepcopy(self.test_new_data)
+            f["identifier"] = "byte_sizes_%d" % i
+            f["byte_size"] = 100 + i
+            self._change_file_path(f, "file_%d" % i)
+            f["file_path"] = "/a/b%d/c%d/%s" % (i % 2, i % 3, f["file_name"])
+            files.append(f)
+        return files
+
+    def test_create_files(self):
+        files = self._get_new_files(6)
+        response = self.client.post("/rest/files", files[0], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self._assert_directory_byte_sizes_and_file_counts(files[0]["project_identifier"])
+
+        response = self.client.post("/rest/files", files[1:], format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        self._assert_directory_byte_sizes_and_file_counts(files[0]["project_identifier"])
+        self._check_project_root_byte_size_and_file_count(files[0]["project_identifier"])
+
+    def test_delete_and_restore_files(self):
+        files = self._get_new_files(6)
+        response = self.client.post("/rest/files", files, format="json")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+        ids = [File.objects.get(identifier=f["identifier"]).id for f in files]
+
+        response = self.client.delete("/rest/files/%d" % ids[0])
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self._assert_directory_byte_sizes_and_file_counts(files[0]["project_identifier"])
+
+        # an already deleted file included in the request must not be subtracted twice
+        response = self.client.delete("/rest/files", ids[:3], format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data["deleted_files_count"], 2, response.data)
+        self._assert_directory_byte_sizes_and_file_counts(files[0]["project_identifier"])
+
+        response = self.client.post(
+            "/rest/files/restore", [f["identifier"] for f in files[:3]], format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self._assert_directory_byte_sizes_and_file_counts(files[0]["project_identifier"])
+        self._check_project_root_byte_size_and_file_count(files[0]["project_identifier"])
+
+    def test_delete_does_not_recalculate_project(self):
+        with patch.object(Directory, "calculate_byte_size_and_file_count") as calculate:
+            response = self.client.delete("/rest/files/1")
+            self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+            calculate.assert_not_called()
+
+        self._assert_directory_byte_sizes_and_file_counts(
+            File.objects_unfiltered.get(pk=1).project_identifier
+        )
+
+
 class FileApiWriteXmlTests(FileApiWriteCommon):
     """
     /files/pid/xml related tests
@@ -39,9 +39,10 @@ class ApiErrorReadBasicTests(APITestCase, TestClassUtils):
         super(ApiErrorReadBasicTests, self).setUp()
         self._use_http_authorization(username="metax")
 
-    def mock_api_error_consume(self):
+    def mock_api_error_consume(self, batch_size=1000):
         """
-        ApiErrors are created when fetching Rabbitmq queue but when running testcases Rabbitmq is not available.
+        ApiErrors are created when consume_api_errors drains the Rabbitmq queue but when running testcases
+        Rabbitmq is not available.
         This mocks the consume part while the publishing part is actually not doing anything.
         """
         error = {
@@ -98,6 +99,7 @@ class ApiErrorReadBasicTests(APITestCase, TestClassUtils):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
         response = self.client.post("/rest/v2/datasets", cr_1, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        call_command("consume_api_errors")
 
         response = self.client.get("/rest/v2/apierrors")
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
@@ -114,6 +116,7 @@ class ApiErrorReadBasicTests(APITestCase, TestClassUtils):
 
         response = self.client.post("/rest/v2/datasets", cr_1, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        call_command("consume_api_errors")
 
         error = ApiError.objects.last()
 
@@ -135,6 +138,7 @@ class ApiErrorReadBasicTests(APITestCase, TestClassUtils):
 
         response = self.client.post("/rest/v2/datasets", cr_1, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        call_command("consume_api_errors")
 
         error = ApiError.objects.last()
 
@@ -156,6 +160,7 @@ class ApiErrorReadBasicTests(APITestCase, TestClassUtils):
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
         response = self.client.post("/rest/v2/datasets", cr_1, format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        call_command("consume_api_errors")
 
         # ensure something was produced...
         response = self.client.get("/rest/v2/apierrors")
@@ -177,6 +182,7 @@ class ApiErrorReadBasicTests(APITestCase, TestClassUtils):
         cr_1.pop("data_catalog")  # causes an error
         response = self.client.post("/rest/v2/datasets", [cr_1, cr_1], format="json")
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        call_command("consume_api_errors")
 
         response = self.client.get("/rest/v2/apierrors")
         self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
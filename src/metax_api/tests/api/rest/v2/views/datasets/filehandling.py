@@ -703,6 +703,65 @@ class CatalogRecordFileHandling(CatalogRecordApiWriteAssignFilesCommonV2):
         self.assertEqual(response.data.get("files_removed"), 3, response.data)
         self.assert_file_count(cr_id, 1)
 
+    def test_add_and_exclude_directories_in_order(self):
+        """
+        Directory add and exclude entries are processed in the order they are provided, and the
+        returned counts reflect the net effect of the request.
+        """
+        cr_id = self._create_draft()
+
+        file_changes = {}
+
+        self._add_directory(file_changes, "/TestExperiment/Directory_1")
+        self._exclude_directory(file_changes, "/TestExperiment/Directory_1/Group_1")
+        response = self.client.post(
+            "/rest/v2/datasets/%d/files" % cr_id, file_changes, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data.get("files_added"), 4, response.data)
+        self.assertEqual(response.data.get("files_removed"), 0, response.data)
+        self.assert_file_count(cr_id, 4)
+
+        file_changes = {}
+
+        self._exclude_directory(file_changes, "/TestExperiment/Directory_1")
+        response = self.client.post(
+            "/rest/v2/datasets/%d/files" % cr_id, file_changes, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        self.assertEqual(response.data.get("files_added"), 0, response.data)
+        self.assertEqual(response.data.get("files_removed"), 4, response.data)
+        self.assert_file_count(cr_id, 0)
+
+    def test_add_directories_not_found(self):
+        """
+        Adding directories which do not exist should return an error, which lists the missing
+        directory identifiers, when only some of the directories were found.
+        """
+        cr_id = self._create_draft()
+
+        file_changes = {"directories": [{"identifier": "doesnotexist"}]}
+        response = self.client.post(
+            "/rest/v2/datasets/%d/files" % cr_id, file_changes, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        self.assertEqual("no directories matched" in str(response.data), True, response.data)
+
+        file_changes = {}
+
+        self._add_directory(file_changes, "/TestExperiment/Directory_1")
+        file_changes["directories"].append({"identifier": "doesnotexist"})
+        file_changes["directories"].append({"identifier": "doesnotexist2", "exclude": True})
+        response = self.client.post(
+            "/rest/v2/datasets/%d/files" % cr_id, file_changes, format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
+        self.assertEqual(
+            "Some requested directories were not found" in str(response.data), True, response.data
+        )
+        self.assertEqual(response.data["data"], ["doesnotexist", "doesnotexist2"], response.data)
+        self.assert_file_count(cr_id, 0)
+
     def test_files_can_be_added_once_after_publishing(self):
         """
         First update from 0 to n files should be allowed even for a published dataset, and
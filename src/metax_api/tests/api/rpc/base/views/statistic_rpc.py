@@ -9,6 +9,8 @@ from copy import deepcopy
 
 from django.conf import settings
 from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
 from rest_framework import status
 from rest_framework.test import APITestCase
@@ -996,4 +998,56 @@ class StatisticRPCforOrganizationDatasetsCumulative(StatisticRPCCommon, CatalogR
 
         # latest=true should only return the latest version
         response = self.client.get(f"{self.url}?{self.dateparam_all}&latest=true").data
-        self.assertEqual(response["org_1"]["urn:nbn:fi:att:2955e904-e3dd-4d7e-99f1-3fed446f96d1"][0]["count"], 1)
\ No newline at end of file
+        self.assertEqual(response["org_1"]["urn:nbn:fi:att:2955e904-e3dd-4d7e-99f1-3fed446f96d1"][0]["count"], 1)
+
+
+class StatisticRPCforCatalogDatasetsCumulative(StatisticRPCCommon, CatalogRecordApiWriteCommon):
+    """
+    Test suite for catalog_datasets_cumulative
+    """
+
+    url = "/rpc/statistics/catalog_datasets_cumulative"
+    dateparam_all = "from_date=2018-06-01&to_date=2019-03-31"
+
+    def test_catalog_datasets_cumulative_total(self):
+        """
+        Total of a catalog should be the sum of its access types, and calculating it should not
+        change the access type specific statistics.
+        """
+        response = self.client.get(f"{self.url}?{self.dateparam_all}").data
+        self.assertTrue(
+            any(len(stats) > 2 for stats in response.values()),
+            "testdata should have a catalog with several access types",
+        )
+
+        for catalog, stats in response.items():
+            access_types = [key for key in stats if key != "total"]
+            self.assertEqual(len(stats["total"]), 10, catalog)
+
+            for i, month in enumerate(stats["total"]):
+                for key in ("count", "count_cumulative", "ida_byte_size", "ida_byte_size_cumulative"):
+                    self.assertEqual(
+                        month[key], sum(stats[at][i][key] for at in access_types), catalog
+                    )
+
+    def test_catalog_datasets_cumulative_single(self):
+        catalog_id = "urn:nbn:fi:att:2955e904-e3dd-4d7e-99f1-3fed446f96d1"
+        response_all = self.client.get(f"{self.url}?{self.dateparam_all}").data
+
+        with CaptureQueriesContext(connection) as queries_single:
+            response = self.client.get(
+                f"{self.url}?{self.dateparam_all}&data_catalog={catalog_id}"
+            ).data
+
+        self.assertEqual(list(response.keys()), [catalog_id])
+        self.assertEqual(response[catalog_id], response_all[catalog_id])
+
+        # statistics of all catalogs are calculated with the same number of queries
+        with CaptureQueriesContext(connection) as queries_all:
+            self.client.get(f"{self.url}?{self.dateparam_all}")
+
+        self.assertEqual(len(queries_all), len(queries_single))
+
+    def test_catalog_datasets_cumulative_unknown_catalog(self):
+        response = self.client.get(f"{self.url}?{self.dateparam_all}&data_catalog=nope")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, response.data)
@@ -9,7 +9,7 @@ import responses
 from django.conf import settings
 from rest_framework import status
 
-from metax_api.models import CatalogRecordV2, DataCatalog
+from metax_api.models import CatalogRecordV2, DataCatalog, File
 from metax_api.tests.api.rest.base.views.datasets.write import CatalogRecordApiWriteCommon
 from metax_api.tests.utils import get_test_oidc_token
 from metax_api.utils import get_tz_aware_now_without_micros
@@ -135,6 +135,26 @@ class CatalogRecordVersionHandling(CatalogRecordApiWriteCommon):
             response.data["identifier"],
         )
 
+    def test_create_new_version_copies_files(self):
+        """
+        Files of the previous version are copied to the new version, except removed files.
+        """
+        cr = CR.objects.get(pk=1)
+        file_ids = set(cr.files.values_list("id", flat=True))
+        removed_file_id = file_ids.pop()
+        File.objects.filter(pk=removed_file_id).update(removed=True)
+
+        response = self.client.post(
+            "/rpc/v2/datasets/create_new_version?identifier=1", format="json"
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED, response.data)
+
+        new_version = CR.objects.get(identifier=response.data["identifier"])
+        self.assertEqual(
+            set(new_version.files(manager="objects_unfiltered").values_list("id", flat=True)),
+            file_ids,
+        )
+
     def test_create_new_version_shares_permissions(self):
         """
         Ensure new version shares EditorPermissions with the original.
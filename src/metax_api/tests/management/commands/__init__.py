@@ -8,6 +8,7 @@
 from .create_missing_rems_items import *
 from .mark_files_removed import *
 from .loadinitialdata import *
+from .fix_file_counts import *
 from .fix_total_files_byte_size import *
 from .migrate_pids import *
-# from .statistics_summaries import * # test not working currently
+from .statistics_summaries import *
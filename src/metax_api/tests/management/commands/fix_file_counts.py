@@ -0,0 +1,47 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from metax_api.models import Directory
+from metax_api.tests.utils import test_data_file_path
+
+
+class FixFileCountsTest(TestCase):
+    def setUp(self):
+        call_command("loaddata", test_data_file_path, verbosity=0)
+
+    def _get_directories(self):
+        return {d["id"]: d for d in Directory.objects.values("id", "byte_size", "file_count")}
+
+    def test_command_output(self):
+        correct_directories = self._get_directories()
+        root_dir = Directory.objects.get(project_identifier="project_x", parent_directory_id=None)
+        sub_dir = Directory.objects.filter(parent_directory_id=root_dir.id).first()
+        Directory.objects.filter(id__in=[root_dir.id, sub_dir.id]).update(byte_size=1, file_count=2)
+
+        out = StringIO()
+        call_command("fix_file_counts", "--dry-run", stdout=out)
+        self.assertEqual(
+            out.getvalue().splitlines(),
+            [
+                "project_x %s: byte_size 1 -> %d, file_count 2 -> %d"
+                % (
+                    d.directory_path,
+                    correct_directories[d.id]["byte_size"],
+                    correct_directories[d.id]["file_count"],
+                )
+                for d in (root_dir, sub_dir)
+            ],
+        )
+        self.assertEqual(Directory.objects.get(pk=root_dir.id).byte_size, 1)
+
+        call_command("fix_file_counts", stdout=StringIO())
+        self.assertEqual(self._get_directories(), correct_directories)
@@ -1,3 +1,5 @@
+from io import StringIO
+
 from django.core.management import call_command
 from django.test import TestCase
 from django.db.models import Model
@@ -41,3 +43,21 @@ class FixTotalFilesByteSizeTest(TestCase):
         cr4 = CatalogRecord.objects.get(id=14)  # has no files
         self.assertEqual(cr4.files(manager="objects_unfiltered").count(), 0)
         self.assertIsNone(cr4.research_dataset.get("total_files_byte_size"))
+
+    def test_dry_run(self):
+        cr = CatalogRecord.objects.first()  # has 300 bytes of files
+        cr.research_dataset["total_files_byte_size"] = 1234567
+        Model.save(cr)
+
+        out = StringIO()
+        call_command("fix_total_files_byte_size", "--dry-run", stdout=out)
+        self.assertIn(
+            f"{cr.identifier}: total_files_byte_size 1234567 -> 300\n", out.getvalue()
+        )
+        cr.refresh_from_db()
+        self.assertEqual(cr.research_dataset["total_files_byte_size"], 1234567)
+
+        # datasets are processed in batches of consecutive ids
+        call_command("fix_total_files_byte_size", "--batch-size=3", stdout=StringIO())
+        cr.refresh_from_db()
+        self.assertEqual(cr.research_dataset["total_files_byte_size"], 300)
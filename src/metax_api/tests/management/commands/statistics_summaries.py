@@ -3,7 +3,7 @@ import logging
 from django.core.management import call_command
 from django.test import TestCase
 
-from metax_api.models import OrganizationStatistics, ProjectStatistics
+from metax_api.models import DataCatalog, FileStorage, OrganizationStatistics, ProjectStatistics
 from metax_api.tests.utils import test_data_file_path
 
 _logger = logging.getLogger(__name__)
@@ -14,26 +14,56 @@ class StatisticsSummariesTest(TestCase):
 		"""
 		Loaded only once for test cases inside this class.
 		"""
+		super(StatisticsSummariesTest, cls).setUpClass()
+
 		call_command("loaddata", test_data_file_path, verbosity=0)
-		call_command("create_statistic_report")
 
-		super(StatisticsSummariesTest, cls).setUpClass()
+		# the command looks up ida and pas file storages and data catalogs by identifier.
+		# identifiers are read-only on save(), so update them directly.
+		for model, field, pk, identifier in (
+			(FileStorage, "file_storage_json", 1, "urn:nbn:fi:att:file-storage-ida"),
+			(FileStorage, "file_storage_json", 2, "urn:nbn:fi:att:file-storage-pas"),
+			(DataCatalog, "catalog_json", 1, "urn:nbn:fi:att:data-catalog-ida"),
+			(DataCatalog, "catalog_json", 2, "urn:nbn:fi:att:data-catalog-att"),
+			(DataCatalog, "catalog_json", 3, "urn:nbn:fi:att:data-catalog-pas"),
+		):
+			json_field = getattr(model.objects.get(pk=pk), field)
+			json_field["identifier"] = identifier
+			model.objects.filter(pk=pk).update(**{field: json_field})
 
+		call_command("create_statistic_report")
 
 	def testProjectStatistics(self):
 		project_x_stats = ProjectStatistics.objects.get(project_identifier="project_x")
 		research_project_112_stats = ProjectStatistics.objects.get(project_identifier="research_project_112")
 
-		self.assertEqual(project_x_stats.count, 20)
-		self.assertEqual(project_x_stats.byte_size, 21000)
-		self.assertEqual(len(project_x_stats.published_datasets.split(",")), 20)
+		self.assertEqual(project_x_stats.ida_count, 20)
+		self.assertEqual(project_x_stats.ida_byte_size, 21000)
+		self.assertEqual(len(project_x_stats.ida_published_datasets.split(",")), 12)
 
-		self.assertEqual(research_project_112_stats.count, 88)
-		self.assertEqual(research_project_112_stats.byte_size, 625000)
-		self.assertEqual(len(research_project_112_stats.published_datasets.split(",")), 88)
+		self.assertEqual(research_project_112_stats.ida_count, 88)
+		self.assertEqual(research_project_112_stats.ida_byte_size, 625000)
+		self.assertEqual(research_project_112_stats.pas_count, 0)
+		self.assertEqual(research_project_112_stats.pas_published_datasets, "")
+		self.assertEqual(len(research_project_112_stats.ida_published_datasets.split(",")), 1)
 
 	def testOrganizationStatistics(self):
 		org_stats = OrganizationStatistics.objects.get(organization="abc-org-123")
 
-		self.assertEqual(org_stats.count, 28)
-		self.assertEqual(org_stats.byte_size, 710800)
\ No newline at end of file
+		self.assertEqual(org_stats.count_total, 28)
+		self.assertEqual(org_stats.byte_size_total, 710800)
+		self.assertEqual(org_stats.count_ida, 13)
+		self.assertEqual(org_stats.count_pas, 1)
+		self.assertEqual(org_stats.count_att, 1)
+		self.assertEqual(org_stats.count_other, 13)
+
+	def testStatisticsAreReplaced(self):
+		ProjectStatistics(project_identifier="removed_project", ida_count=1, ida_byte_size=1, ida_published_datasets="").save()
+		OrganizationStatistics(organization="removed-org", count_total=1).save()
+
+		call_command("create_statistic_report")
+
+		self.assertFalse(ProjectStatistics.objects.filter(project_identifier="removed_project").exists())
+		self.assertFalse(OrganizationStatistics.objects.filter(organization="removed-org").exists())
+		self.assertEqual(ProjectStatistics.objects.count(), 2)
+		self.assertEqual(OrganizationStatistics.objects.count(), 1)
@@ -5,11 +5,18 @@
 # :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
 # :license: MIT
 
+import json
+from unittest.mock import patch
+
+import responses
+from django.test import SimpleTestCase
 from django.utils import timezone
 from pytz import timezone as tz
+from requests.exceptions import ConnectionError
 from rest_framework import status
 from rest_framework.test import APITestCase
 
+from metax_api.middleware.metrics_tracking import _MetricsEmitter
 from metax_api.tests.api.rest.base.views.datasets.write import CatalogRecordApiWriteCommon
 from metax_api.tests.utils import TestClassUtils
 from metax_api.utils import parse_timestamp_string_to_tz_aware_datetime
@@ -205,3 +212,73 @@ class ApiStreamHttpResponse(CatalogRecordApiWriteCommon):
         response = self.client.get("/rest/files?pagination=false&stream=true")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(response.streaming, True)
+
+    @patch("metax_api.api.rest.base.views.common_view.STREAM_CHUNK_SIZE", 3)
+    def test_streamed_list_equals_unstreamed_list(self):
+        for api in ("datasets", "files"):
+            expected = self.client.get(f"/rest/{api}?pagination=false").json()
+
+            response = self.client.get(f"/rest/{api}?pagination=false&stream=true")
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response.streaming, True)
+            self.assertEqual(response["X-Count"], str(len(expected)))
+
+            streamed = json.loads(b"".join(response.streaming_content))
+            self.assertEqual(streamed, expected)
+
+    def test_streamed_list_with_filters(self):
+        response = self.client.get(
+            "/rest/files?pagination=false&stream=true&project_identifier=project_x&ordering=-id"
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        streamed = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(len(streamed), 20)
+        self.assertEqual(
+            [f["id"] for f in streamed], sorted((f["id"] for f in streamed), reverse=True)
+        )
+        self.assertEqual(all(f["project_identifier"] == "project_x" for f in streamed), True)
+
+
+class MetricsEmitterTests(SimpleTestCase):
+
+    api = "https://metrics.example.com"
+
+    @responses.activate
+    def test_events_are_sent_in_background(self):
+        responses.add(responses.POST, f"{self.api}/report", status=200)
+        emitter = _MetricsEmitter()
+
+        for i in range(3):
+            emitter.emit(self.api, {"scope": "V1 / GET / DATASETS", "token": "abc"})
+        emitter.flush()
+
+        self.assertEqual(len(responses.calls), 3)
+        self.assertEqual(emitter.stats(), {"queue_depth": 0, "sent": 3, "failed": 0, "dropped": 0})
+
+    @responses.activate
+    def test_failed_connection_fails_rest_of_batch(self):
+        responses.add(responses.POST, f"{self.api}/report", body=ConnectionError("refused"))
+        emitter = _MetricsEmitter()
+
+        with patch.object(emitter, "_ensure_worker"):
+            for i in range(3):
+                emitter.emit(self.api, {"scope": "V1 / GET / DATASETS"})
+
+        emitter._ensure_worker()
+        emitter.flush()
+
+        self.assertEqual(len(responses.calls), 1)
+        self.assertEqual(emitter.stats()["failed"], 3)
+
+    def test_events_are_dropped_when_queue_is_full(self):
+        with patch.object(_MetricsEmitter, "MAX_QUEUE_SIZE", 2):
+            emitter = _MetricsEmitter()
+
+        # no worker consumes the queue
+        with patch.object(emitter, "_ensure_worker"):
+            for i in range(5):
+                emitter.emit(self.api, {"scope": "V1 / GET / DATASETS"})
+
+        self.assertEqual(emitter.stats()["queue_depth"], 2)
+        self.assertEqual(emitter.stats()["dropped"], 3)
@@ -13,5 +13,5 @@ from .catalog_record import (
 from .common import *
 from .data_catalog import DataCatalogModelTests
 from .directory import DirectoryModelTests
-from .file import FileModelBasicTest, FileManagerTests
+from .file import FileModelBasicTest, FileManagerTests, FilePathPrefixTests
 from .signals import SignalTests
@@ -104,6 +104,37 @@ class CatalogRecordModelTests(TestCase, TestClassUtils):
             "preservation_state_modified should be automatically updated if changed",
         )
 
+    def test_research_dataset_columns_are_generated(self):
+        """
+        Values of the rd_* columns are always computed from research_dataset by the database,
+        no matter how the record is saved.
+        """
+
+        def _assert_columns_match_research_dataset(cr):
+            rd = cr.research_dataset
+            self.assertEqual(cr.rd_access_type, rd["access_rights"]["access_type"]["identifier"])
+            self.assertEqual(cr.rd_metadata_version_identifier, rd["metadata_version_identifier"])
+            self.assertEqual(cr.rd_preferred_identifier, rd["preferred_identifier"])
+            self.assertEqual(cr.rd_total_files_byte_size, rd.get("total_files_byte_size"))
+
+        for cr in CatalogRecord.objects_unfiltered.all():
+            _assert_columns_match_research_dataset(cr)
+
+        rd = self.cr.research_dataset
+        rd["preferred_identifier"] = "updated:pid"
+        rd["access_rights"]["access_type"]["identifier"] = "updated:access_type"
+        rd["total_files_byte_size"] += 1
+        CatalogRecord.objects.filter(pk=self.cr.pk).update(research_dataset=rd)
+        _assert_columns_match_research_dataset(CatalogRecord.objects.get(pk=self.cr.pk))
+
+        cr = CatalogRecord.objects.get(pk=self.cr.pk)
+        cr.rd_preferred_identifier = "ignored:pid"
+        cr.research_dataset["title"]["en"] = "updated title"
+        cr.save()
+        cr.refresh_from_db()
+        self.assertEqual(cr.rd_preferred_identifier, "updated:pid")
+        _assert_columns_match_research_dataset(cr)
+
 
 class CatalogRecordManagerTests(TestCase, TestClassUtils):
     @classmethod
@@ -9,7 +9,7 @@ from django.core.management import call_command
 from django.db.models import Sum
 from rest_framework.test import APITestCase
 
-from metax_api.models import Directory, File
+from metax_api.models import CatalogRecord, Directory, File
 from metax_api.tests.utils import TestClassUtils, test_data_file_path
 
 
@@ -47,3 +47,30 @@ class DirectoryModelTests(APITestCase, TestClassUtils):
     def test_disallow_calculate_byte_size_and_file_count_for_non_root(self):
         with self.assertRaises(Exception):
             Directory.objects.get(pk=3).calculate_byte_size_and_file_count()
+
+    def test_calculate_byte_sizes_and_file_counts_for_cr(self):
+        """
+        Verify the numbers calculated for every directory in the context of each catalog record
+        match to the files of the catalog record in the directory and its sub-directories, and
+        that the numbers are calculated using a fixed number of queries.
+        """
+        for cr in CatalogRecord.objects.filter(files__isnull=False).distinct():
+            with self.assertNumQueries(2):
+                directory_data = Directory.calculate_byte_sizes_and_file_counts_for_cr(cr.id)
+
+            self.assertTrue(directory_data, "cr %d should have directory data" % cr.id)
+
+            for dr in Directory.objects.filter(id__in=directory_data.keys()):
+                files = cr.files.filter(
+                    project_identifier=dr.project_identifier,
+                    file_path__startswith="%s/" % dr.directory_path.rstrip("/"),
+                )
+                self.assertEqual(
+                    directory_data[dr.id],
+                    [files.aggregate(Sum("byte_size"))["byte_size__sum"], files.count()],
+                    "cr %d, path: %s" % (cr.id, dr.directory_path),
+                )
+
+    def test_calculate_byte_sizes_and_file_counts_for_cr_without_files(self):
+        cr = CatalogRecord.objects.filter(files__isnull=True).first()
+        self.assertEqual(Directory.calculate_byte_sizes_and_file_counts_for_cr(cr.id), {})
@@ -6,10 +6,11 @@
 # :license: MIT
 
 from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
 from rest_framework.serializers import ValidationError
 
-from metax_api.models import File
+from metax_api.models import CatalogRecord, File
 from metax_api.tests.utils import TestClassUtils, test_data_file_path
 
 d = print
@@ -118,3 +119,85 @@ class FileManagerTests(TestCase, TestClassUtils):
             False,
             "get with using_dict should have not returned a result because an identifier field is missing",
         )
+
+
+class FilePathPrefixTests(TestCase, TestClassUtils):
+
+    """
+    Verify that file path prefixes are matched using index file_project_path_pattern_idx.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        call_command("loaddata", test_data_file_path, verbosity=0)
+        super(FilePathPrefixTests, cls).setUpClass()
+
+    def setUp(self):
+        # copy a file into other directories of the same project, so that the project has
+        # enough files for the planner to prefer the index over scanning the project
+        columns = ", ".join(
+            f.column for f in File._meta.concrete_fields if f.column not in ("id", "file_path")
+        )
+        sql_copy_files = """
+            insert into metax_api_file (file_path, {columns})
+            select '/prj_112_root/other_data/' || i || '/' || f.file_name, {columns}
+            from metax_api_file f, generate_series(1, 5000) as i
+            where f.id = %s
+            """.format(
+            columns=columns
+        )
+        file = File.objects.filter(project_identifier="research_project_112").first()
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql_copy_files, [file.id])
+            cursor.execute("analyze metax_api_file")
+
+    def _explain(self, sql, params):
+        with connection.cursor() as cursor:
+            cursor.execute("explain " + sql, params)
+            return "\n".join(row[0] for row in cursor.fetchall())
+
+    def test_path_startswith_lookup(self):
+        files = File.objects.filter(
+            project_identifier="research_project_112",
+            file_path__startswith="/prj_112_root/science_data_C/",
+        )
+        files_by_range = File.objects.filter(
+            project_identifier="research_project_112",
+            file_path__path_startswith="/prj_112_root/science_data_C/",
+        )
+        self.assertTrue(files.exists())
+        self.assertEqual(sorted(f.id for f in files), sorted(f.id for f in files_by_range))
+
+        sql, params = files_by_range.query.sql_with_params()
+        self.assertIn("file_project_path_pattern_idx", self._explain(sql, params))
+
+    def test_files_with_path_prefixes(self):
+        prefixes = [
+            ("research_project_112", "/prj_112_root/science_data_A/"),
+            ("research_project_112", "/prj_112_root/science_data_C/"),
+        ]
+        sql_prefixes, params = CatalogRecord._get_sql_files_with_path_prefixes(prefixes)
+        sql = "select f.id from metax_api_file f where %s" % sql_prefixes
+
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            file_ids = sorted(row[0] for row in cursor.fetchall())
+
+        expected_file_ids = sorted(
+            File.objects.filter(
+                project_identifier="research_project_112",
+                file_path__regex=r"^/prj_112_root/science_data_[AC]/",
+            ).values_list("id", flat=True)
+        )
+        self.assertTrue(expected_file_ids)
+        self.assertEqual(file_ids, expected_file_ids)
+        self.assertIn("file_project_path_pattern_idx", self._explain(sql, params))
+
+    def test_files_with_path_prefixes_wildcards_are_literal(self):
+        sql_prefixes, params = CatalogRecord._get_sql_files_with_path_prefixes(
+            [("research_project_112", "/prj_112_root/science_data_%/")]
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("select count(*) from metax_api_file f where %s" % sql_prefixes, params)
+            self.assertEqual(cursor.fetchone()[0], 0)
@@ -5,4 +5,9 @@
 # :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
 # :license: MIT
 
-from .reference_data_mixin import ReferenceDataMixinTests
+from .reference_data_mixin import (
+    ReferenceDataLookupIndexTests,
+    ReferenceDataMixinTests,
+    ReferenceDataProcessCacheTests,
+)
+from .rabbitmq_service import RabbitMQServiceTests
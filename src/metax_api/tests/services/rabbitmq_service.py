@@ -0,0 +1,185 @@
+# This file is part of the Metax API service
+#
+# Copyright 2017-2018 Ministry of Education and Culture, Finland
+#
+# :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
+# :license: MIT
+
+from json import dumps, loads
+from os import listdir
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from pika.exceptions import AMQPConnectionError, StreamLostError
+
+from metax_api.exceptions import Http503
+from metax_api.services.rabbitmq_service import _RabbitMQService
+
+
+class FakeBroker:
+    """
+    Stands in for a RabbitMQ server, recording opened connections and published messages
+    """
+
+    def __init__(self):
+        self.connections = []
+        self.messages = []
+        self.queue = []
+        self.acked = 0
+        self.available = True
+        # number of published messages, after which the connection is dropped once
+        self.drop_connection_at = None
+
+    def connect(self, parameters):
+        if not self.available:
+            raise AMQPConnectionError("connection refused")
+        connection = FakeConnection(self)
+        self.connections.append(connection)
+        return connection
+
+
+class FakeConnection:
+    def __init__(self, broker):
+        self.broker = broker
+        self.is_open = True
+
+    def channel(self):
+        return FakeChannel(self)
+
+    def process_data_events(self, time_limit=None):
+        if not self.is_open:
+            raise StreamLostError("connection lost")
+
+    def close(self):
+        self.is_open = False
+
+
+class FakeChannel:
+    def __init__(self, connection):
+        self.connection = connection
+        self.confirm_mode = False
+
+    @property
+    def is_open(self):
+        return self.connection.is_open
+
+    def confirm_delivery(self):
+        self.confirm_mode = True
+
+    def basic_qos(self, prefetch_count=0):
+        pass
+
+    def consume(self, queue, inactivity_timeout=None):
+        for delivery_tag, body in enumerate(self.connection.broker.queue, start=1):
+            yield FakeMethod(delivery_tag), None, body
+        yield None, None, None
+
+    def basic_ack(self, delivery_tag, multiple=False):
+        self.connection.broker.acked = delivery_tag
+
+    def cancel(self):
+        pass
+
+    def basic_publish(self, body, routing_key, exchange, properties=None):
+        broker = self.connection.broker
+        if broker.drop_connection_at == len(broker.messages):
+            broker.drop_connection_at = None
+            self.connection.is_open = False
+            raise StreamLostError("connection lost")
+        broker.messages.append((exchange, routing_key, loads(body)))
+
+
+class FakeMethod:
+    def __init__(self, delivery_tag):
+        self.delivery_tag = delivery_tag
+
+
+class RabbitMQServiceTests(SimpleTestCase):
+    def setUp(self):
+        self.broker = FakeBroker()
+        patcher = patch("pika.BlockingConnection", self.broker.connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep_patcher = patch("metax_api.services.rabbitmq_service.sleep")
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.rabbitmq = _RabbitMQService()
+
+    def _publish(self, n, routing_key="create"):
+        self.rabbitmq.publish({"n": n}, routing_key=routing_key, exchange="datasets")
+
+    def test_connection_is_reused(self):
+        for n in range(3):
+            self._publish(n)
+
+        self.assertEqual(len(self.broker.connections), 1)
+        self.assertEqual(len(self.broker.messages), 3)
+        self.assertEqual(self.rabbitmq._local.channel.confirm_mode, True)
+
+    def test_closed_connection_is_replaced(self):
+        self._publish(1)
+        self.broker.connections[0].close()
+        self._publish(2)
+
+        self.assertEqual(len(self.broker.connections), 2)
+        self.assertEqual([m[2]["n"] for m in self.broker.messages], [1, 2])
+
+    def test_batch_is_published_when_it_ends(self):
+        with self.rabbitmq.batch():
+            self._publish(1)
+            self._publish(2, routing_key="update")
+            self.rabbitmq.publish({"n": 3}, exchange="TTV-datasets")
+            self.assertEqual(self.broker.messages, [])
+
+        self.assertEqual(
+            self.broker.messages,
+            [
+                ("datasets", "create", {"n": 1}),
+                ("datasets", "update", {"n": 2}),
+                ("TTV-datasets", "", {"n": 3}),
+            ],
+        )
+        self.assertEqual(len(self.broker.connections), 1)
+
+    def test_batch_is_discarded_on_error(self):
+        with self.assertRaises(ValueError):
+            with self.rabbitmq.batch():
+                self._publish(1)
+                raise ValueError("callable failed")
+
+        self.assertEqual(self.broker.messages, [])
+        self._publish(2)
+        self.assertEqual(len(self.broker.messages), 1)
+
+    def test_lost_connection_does_not_duplicate_messages(self):
+        self.broker.drop_connection_at = 2
+
+        with self.rabbitmq.batch():
+            for n in range(5):
+                self._publish(n)
+
+        self.assertEqual([m[2]["n"] for m in self.broker.messages], [0, 1, 2, 3, 4])
+        self.assertEqual(len(self.broker.connections), 2)
+
+    def test_failed_batch_raises_service_unavailable(self):
+        self.broker.available = False
+
+        with self.assertRaises(Http503):
+            with self.rabbitmq.batch():
+                self._publish(1)
+
+    def test_api_errors_are_consumed_in_batches(self):
+        self.broker.queue = [
+            dumps({"identifier": "error-%d" % n, "status_code": 400}) for n in range(5)
+        ]
+
+        with TemporaryDirectory() as error_files_path:
+            with override_settings(ERROR_FILES_PATH=error_files_path + "/"):
+                consumed = self.rabbitmq.consume_api_errors(batch_size=2)
+
+            error_files = listdir(error_files_path)
+
+        self.assertEqual(consumed, 5)
+        self.assertEqual(self.broker.acked, 5)
+        self.assertEqual(len(error_files), 3)
@@ -5,9 +5,10 @@
 # :author: CSC - IT Center for Science Ltd., Espoo Finland <servicedesk@csc.fi>
 # :license: MIT
 
+from collections import defaultdict
 from unittest.mock import patch
 
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 
 from metax_api.services import ReferenceDataMixin as RDM
 from metax_api.services.redis_cache_service import RedisClient
@@ -32,6 +33,27 @@ class MockRedisCacheService(RedisClient):
         return super(MockRedisCacheService, self).get(*args, **kwargs)
 
 
+class FakeRedis:
+    """
+    Stands in for the redis connection of RedisClient, counting reads per key
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.get_count = {}
+
+    def get(self, key):
+        self.get_count[key] = self.get_count.get(key, 0) + 1
+        return self.data.get(key)
+
+    def set(self, key, value, **kwargs):
+        self.data[key] = value
+
+    def delete(self, *keys):
+        for key in keys:
+            self.data.pop(key, None)
+
+
 class ReferenceDataMixinTests(TestCase, TestClassUtils):
     @classmethod
     def setUpClass(cls):
@@ -151,3 +173,195 @@ class ReferenceDataMixinTests(TestCase, TestClassUtils):
                 "organization_data": {"organization": ["stuff"]},
             },
         )
+
+
+class ReferenceDataProcessCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = RedisClient()
+        self.cache.client = FakeRedis()
+        self._reset_process_cache()
+        self._set_reference_data("fin")
+
+    def tearDown(self):
+        self._reset_process_cache()
+
+    def _reset_process_cache(self):
+        RDM.process_cached_reference_data = None
+        RDM.process_cached_reference_data_version = None
+        RDM.process_cached_reference_data_checked_at = 0
+        RDM.process_cached_reference_data_stats = {}
+
+    def _set_reference_data(self, code):
+        reference_data = {
+            "reference_data": {
+                "language": [{"uri": "http://lexvo.org/id/iso639-3/%s" % code, "code": code}]
+            },
+            "organization_data": {"organization": []},
+        }
+        self.cache.set("reference_data", reference_data, compress=True)
+        self.cache.set(
+            "reference_data_version", ReferenceDataLoader.get_reference_data_version(reference_data)
+        )
+
+    def test_compressed_value(self):
+        self.assertEqual(
+            self.cache.client.data["reference_data"].startswith(RedisClient.COMPRESSED_PREFIX), True
+        )
+        self.assertEqual(
+            self.cache.get("reference_data")["reference_data"]["language"][0]["code"], "fin"
+        )
+
+    @override_settings(REFERENCE_DATA_VERSION_CHECK_INTERVAL=3600)
+    def test_version_not_checked_during_interval(self):
+        RDM.get_reference_data(self.cache)
+        self._set_reference_data("swe")
+        ref_data = RDM.get_reference_data(self.cache)
+
+        self.assertEqual(ref_data["reference_data"]["language"][0]["code"], "fin")
+        self.assertEqual(self.cache.client.get_count["reference_data_version"], 1)
+        self.assertEqual(self.cache.client.get_count["reference_data"], 1)
+
+    @override_settings(REFERENCE_DATA_VERSION_CHECK_INTERVAL=0)
+    def test_reference_data_downloaded_only_when_version_changes(self):
+        for i in range(3):
+            RDM.get_reference_data(self.cache)
+        self.assertEqual(self.cache.client.get_count["reference_data"], 1)
+
+        # reloading identical data does not change the version
+        self._set_reference_data("fin")
+        RDM.get_reference_data(self.cache)
+        self.assertEqual(self.cache.client.get_count["reference_data"], 1)
+
+        self._set_reference_data("swe")
+        ref_data = RDM.get_reference_data(self.cache)
+
+        self.assertEqual(ref_data["reference_data"]["language"][0]["code"], "swe")
+        self.assertEqual(self.cache.client.get_count["reference_data"], 2)
+
+        stats = RDM.get_reference_data_cache_stats()
+        self.assertEqual(stats["reload_count"], 2)
+        self.assertEqual(stats["version"], self.cache.get("reference_data_version")["version"])
+
+    @override_settings(REFERENCE_DATA_VERSION_CHECK_INTERVAL=0)
+    def test_reference_data_kept_when_missing_from_cache(self):
+        RDM.get_reference_data(self.cache)
+        self._set_reference_data("swe")
+        self.cache.delete("reference_data")
+
+        ref_data = RDM.get_reference_data(self.cache)
+        self.assertEqual(ref_data["reference_data"]["language"][0]["code"], "fin")
+
+
+class ReferenceDataLookupIndexTests(SimpleTestCase):
+
+    reference_data = {
+        "reference_data": {
+            "language": [
+                {"uri": "http://lexvo.org/id/iso639-3/fin", "code": "fin"},
+                {"uri": "http://lexvo.org/id/iso639-3/swe", "code": "swe"},
+                # duplicate code, linear search would never return this entry by code
+                {"uri": "http://lexvo.org/id/iso639-3/fin2", "code": "fin"},
+            ],
+            "file_format_version": [
+                {
+                    "uri": "http://uri.suomi.fi/codelist/fairdata/file_format_version/code/text_csv",
+                    "code": "text_csv",
+                    "input_file_format": "text/csv",
+                    "output_format_version": None,
+                },
+                {
+                    "uri": "http://uri.suomi.fi/codelist/fairdata/file_format_version/code/pdf_1.4",
+                    "code": "pdf_1.4",
+                    "input_file_format": "application/pdf",
+                    "output_format_version": "1.4",
+                },
+                {
+                    "uri": "http://uri.suomi.fi/codelist/fairdata/file_format_version/code/pdf_1.5",
+                    "code": "pdf_1.5",
+                    "input_file_format": "application/pdf",
+                    "output_format_version": "1.5",
+                },
+            ],
+        },
+        "organization_data": {
+            "organization": [
+                {
+                    "uri": "http://uri.suomi.fi/codelist/fairdata/organization/code/01901",
+                    "code": "01901",
+                },
+            ]
+        },
+    }
+
+    def setUp(self):
+        self.index = ReferenceDataLoader.build_lookup_index(self.reference_data)
+
+    def test_lookup_returns_same_entries_as_linear_search(self):
+        for index_name, ref_data_types in self.reference_data.items():
+            for type_name, entries in ref_data_types.items():
+                for entry in entries:
+                    for value in (entry["uri"], entry["code"], "not-found"):
+                        self.assertIs(
+                            RDM.check_ref_data(
+                                self.index[index_name][type_name],
+                                value,
+                                "relation",
+                                errors=defaultdict(list),
+                            ),
+                            RDM.check_ref_data(
+                                entries, value, "relation", errors=defaultdict(list)
+                            ),
+                        )
+
+    def test_lookup_value_not_found(self):
+        errors = defaultdict(list)
+        ref_entry = RDM.check_ref_data(
+            self.index["reference_data"]["language"], "nope", "research_dataset.language", errors
+        )
+        self.assertEqual(ref_entry, None)
+        self.assertEqual(len(errors["research_dataset.language"]), 1)
+
+        errors = defaultdict(list)
+        RDM.check_ref_data(
+            self.index["reference_data"]["language"],
+            "nope",
+            "research_dataset.language",
+            errors,
+            value_not_found_is_error=False,
+        )
+        self.assertEqual(len(errors), 0)
+
+    def test_lookup_unhashable_value(self):
+        errors = defaultdict(list)
+        ref_entry = RDM.check_ref_data(
+            self.index["reference_data"]["language"], {"a": 1}, "relation", errors
+        )
+        self.assertEqual(ref_entry, None)
+        self.assertEqual(len(errors["relation"]), 1)
+
+    def test_file_format_versions_from_lookup_index(self):
+        from metax_api.services import FileService
+
+        lookup = self.index["file_format_version_by_input_file_format"]
+        entries = self.reference_data["reference_data"]["file_format_version"]
+
+        for iff in ("text/csv", "application/pdf"):
+            self.assertEqual(
+                FileService._validate_file_format_and_get_versions_from_reference_data(lookup, iff),
+                FileService._validate_file_format_and_get_versions_from_reference_data(
+                    entries, iff
+                ),
+            )
+
+        self.assertEqual(
+            FileService._validate_file_format_and_get_versions_from_reference_data(
+                lookup, "application/pdf"
+            ),
+            ["1.4", "1.5"],
+        )
+
+        errors = defaultdict(list)
+        FileService._validate_file_format_and_get_versions_from_reference_data(
+            lookup, "nope/nope", errors
+        )
+        self.assertEqual(len(errors["file_characteristics.file_format"]), 1)
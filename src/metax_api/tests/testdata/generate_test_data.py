@@ -203,9 +203,26 @@ def generate_files(test_file_storage_list, validate_json):
 
         file_test_data_list.append(new)
 
+    calculate_directory_byte_sizes_and_file_counts(file_test_data_list, directory_test_data_list)
+
     return file_test_data_list, directory_test_data_list
 
 
+def calculate_directory_byte_sizes_and_file_counts(file_list, directory_list):
+    """
+    Directory byte sizes and file counts are only updated incrementally by the api, so they must
+    be correct in the test data to begin with.
+    """
+    directories = {d["pk"]: d["fields"] for d in directory_list}
+
+    for f in file_list:
+        directory_id = f["fields"]["parent_directory"]
+        while directory_id is not None:
+            directories[directory_id]["byte_size"] += f["fields"]["byte_size"]
+            directories[directory_id]["file_count"] += 1
+            directory_id = directories[directory_id]["parent_directory"]
+
+
 def get_parent_directory_for_path(
     directories, file_path, directory_test_data_list, project_identifier
 ):
@@ -6,6 +6,9 @@
 # :license: MIT
 
 import logging
+from hashlib import sha1
+from pickle import dumps as pickle_dumps
+from time import time
 
 from django.conf import settings as django_settings
 
@@ -18,6 +21,10 @@ class ReferenceDataLoader:
 
     REF_DATA_LOAD_NUM = 0
 
+    # key under which lookup tables for the reference data are stored alongside the
+    # actual reference data. see build_lookup_index()
+    LOOKUP_INDEX_KEY = "lookup_index"
+
     """
     Should optimally be defined in /services/, but services __init__.py cant be loaded during app
     startup due to having imports from django app models, views etc
@@ -46,7 +53,17 @@ class ReferenceDataLoader:
             _logger.exception("Reference data fetch failed")
             raise
 
-        cache.set("reference_data", reference_data)
+        reference_data[cls.LOOKUP_INDEX_KEY] = cls.build_lookup_index(reference_data)
+
+        # the version key is written after the data itself, so that a process noticing a new
+        # version will always find the corresponding data from the cache
+        version = cls.get_reference_data_version(reference_data)
+        cache.set("reference_data", reference_data, compress=True)
+        cache.set("reference_data_version", version)
+        _logger.info(
+            "event='reference_data_version_set',version=%s,payload_size=%d"
+            % (version["version"], version["payload_size"])
+        )
 
         errors = None
         reference_data_check = cache.get("reference_data", master=True)
@@ -179,6 +196,58 @@ class ReferenceDataLoader:
 
         return reference_data
 
+    @staticmethod
+    def get_reference_data_version(reference_data):
+        """
+        Return version info to store in cache key reference_data_version. Processes keeping reference
+        data in memory compare the version against the version of the data they have, and download
+        the actual reference data again only when the version has changed. The version is a checksum
+        of the data, so reloading identical reference data does not make processes reload it.
+        """
+        pickled_data = pickle_dumps(reference_data)
+        return {
+            "version": sha1(pickled_data).hexdigest(),
+            "payload_size": len(pickled_data),
+            "created": time(),
+        }
+
+    @classmethod
+    def build_lookup_index(cls, reference_data):
+        """
+        Build lookup tables for reference data, so that entries can be found in constant time
+        instead of scanning the lists of entries. Returns a dict of the same shape as the reference
+        data itself, where each list of entries is replaced by a dict keyed by both the uri and
+        the code of the entries:
+
+        {
+            "reference_data": { "language": { "<uri>": entry, "<code>": entry, ... }, ... },
+            "organization_data": { "organization": { ... } },
+            "file_format_version_by_input_file_format": { "<input_file_format>": [entry, ...] },
+        }
+
+        The entries themselves are not copied, the lookup tables refer to the same objects as
+        the lists do. When several entries share a value, the first entry in the list wins, which
+        is the same result a linear search through the list would give.
+        """
+        index = {}
+        for index_name, ref_data_types in reference_data.items():
+            if index_name == cls.LOOKUP_INDEX_KEY:
+                continue
+            index[index_name] = {}
+            for type_name, entries in ref_data_types.items():
+                lookup = {}
+                for entry in entries:
+                    lookup.setdefault(entry["uri"], entry)
+                    lookup.setdefault(entry["code"], entry)
+                index[index_name][type_name] = lookup
+
+        file_formats = {}
+        for entry in reference_data.get("reference_data", {}).get("file_format_version", []):
+            file_formats.setdefault(entry.get("input_file_format"), []).append(entry)
+        index["file_format_version_by_input_file_format"] = file_formats
+
+        return index
+
     @staticmethod
     def get_connection_parameters(settings):
         """